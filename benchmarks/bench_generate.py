@@ -0,0 +1,195 @@
+"""
+出图基准测试
+以 cases 中的示例区域为基础，在不同地形分辨率、是否开启光照、是否叠加投点和多边形的组合下
+调用 MapGenerator.generate，记录各阶段耗时、峰值内存和输出文件大小，并与基线比较。
+高程使用本地合成网格（relief_grid），不需要联网
+
+用法：
+    python benchmarks/bench_generate.py                   # 运行并与基线比较
+    python benchmarks/bench_generate.py --save-baseline   # 运行并保存为新基线
+    python benchmarks/bench_generate.py --cases CN_NE --resolutions 05m
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_relief, synthetic_points, synthetic_polygons
+from src.core.batch import run_jobs
+
+# cases 中示例图对应的区域
+CASES = {
+    "CN_NE": [110, 155, 30, 55],
+    "Asia_NE": [100, 160, 20, 60],
+    "Pacific": [120, 240, -40, 40],
+    "South_China_Sea": [105, 125, 0, 25],
+    "Earth_AU": [110, 160, -45, -8],
+}
+
+DEFAULT_RESOLUTIONS = ("10m", "05m", "02m")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DATA_DIR = os.path.join(tempfile.gettempdir(), "quick_gmt_bench")
+
+# 相对基线变慢（或内存增大）超过该比例视为回归
+REGRESSION_THRESHOLD = 0.2
+# 耗时短于该值（秒）的阶段波动较大，不参与回归判断
+MIN_COMPARED_TIME = 0.05
+
+
+def run_case(case):
+    """子进程：生成一张地图并整理性能数据，每个用例独立进程以便准确记录峰值内存"""
+    from src.core.map_generator import MapGenerator
+
+    result = MapGenerator().generate(case["config"])
+    profile = result["profile"]
+    stages = {stage["name"]: stage["wall_time"] for stage in profile["stages"]}
+    return {
+        "total_time": stages["generate"],
+        "stages": stages,
+        "peak_rss": profile["peak_rss"],
+        "output_bytes": sum(os.path.getsize(path) for path in result["output_paths"]),
+    }
+
+
+def build_cases(names, resolutions, dpi, output_dir):
+    """
+    生成用例矩阵：区域 × 分辨率 × 光照 × 叠加图层
+
+    Returns:
+        list: {"id", "config"} 列表
+    """
+    cases = []
+    for name, resolution, topography, overlays in itertools.product(
+        names, resolutions, (True, False), (False, True)
+    ):
+        region = CASES[name]
+        case_id = f"{name}/{resolution}/{'shade' if topography else 'view'}/{'overlay' if overlays else 'base'}"
+        config = {
+            "elevation": True,
+            "topography": topography,
+            "coast_line": True,
+            "plot_polygons": overlays,
+            "plot_points": overlays,
+            "region": region,
+            "resolution": resolution,
+            "relief_grid": synthetic_relief(region, resolution, os.path.join(DATA_DIR, f"{name}_{resolution}.nc")),
+            "cmap": "gray" if topography else "geo",
+            "image_name": case_id.replace("/", "_"),
+            "image_format": "png",
+            "dpi": dpi,
+            "output_dir": output_dir,
+            "profile": True,
+            "render_cache": False,
+            "base_cache": False,
+            "show": False,
+        }
+        if overlays:
+            config["point_config"] = {
+                "file": synthetic_points(region, 200_000, os.path.join(DATA_DIR, f"{name}_points.csv")),
+                "style": "c0.05c",
+                "fill": "red",
+                "reduce": "thin",
+            }
+            config["polygon_config"] = {
+                "file": synthetic_polygons(region, 50, 2000, os.path.join(DATA_DIR, f"{name}_polygons.geojson")),
+                "pen_width": "1p",
+                "pen_color": "red",
+            }
+        cases.append({"id": case_id, "config": config})
+    return cases
+
+
+def compare(results, baseline, threshold):
+    """
+    与基线比较，返回回归列表
+
+    Args:
+        results (dict): 本次结果 {用例: 性能数据}
+        baseline (dict): 基线结果
+        threshold (float): 允许的相对增幅
+
+    Returns:
+        list: 回归描述
+    """
+    regressions = []
+    for case_id, current in results.items():
+        previous = baseline.get(case_id)
+        if not previous:
+            continue
+        pairs = [("total_time", previous["total_time"], current["total_time"])]
+        pairs += [
+            (f"stage {name}", previous["stages"][name], value)
+            for name, value in current["stages"].items()
+            if name in previous["stages"]
+        ]
+        if previous.get("peak_rss") and current.get("peak_rss"):
+            pairs.append(("peak_rss", previous["peak_rss"], current["peak_rss"]))
+        for metric, old, new in pairs:
+            if metric != "peak_rss" and old < MIN_COMPARED_TIME:
+                continue
+            if new > old * (1 + threshold):
+                regressions.append(f"{case_id} {metric}: {old:.3f} -> {new:.3f} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以 cases 区域为基础的出图性能基准")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--resolutions", nargs="+", default=list(DEFAULT_RESOLUTIONS))
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=1, help="并发进程数，默认 1 以免互相干扰计时")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", default=None, help="本次结果的 JSON 导出路径")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        cases = build_cases(args.cases, args.resolutions, args.dpi, output_dir)
+
+        def report(record):
+            case_id = cases[record["index"]]["id"]
+            if record["status"] == "ok":
+                result = record["result"]
+                print(f"{case_id:<40} {result['total_time']:>8.2f}s "
+                      f"{(result['peak_rss'] or 0) / 1024 ** 2:>8.0f}MB {result['output_bytes'] / 1024:>8.0f}KB")
+            else:
+                print(f"{case_id:<40} [{record['status']}] {record['error']}")
+
+        records = run_jobs(cases, run_case, workers=args.workers, on_result=report)
+
+    results = {case["id"]: record["result"] for case, record in zip(cases, records) if record["status"] == "ok"}
+    failed = len(records) - len(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"已保存基线：{args.baseline}")
+        sys.exit(1 if failed else 0)
+
+    if not os.path.exists(args.baseline):
+        print("没有基线，使用 --save-baseline 保存")
+        sys.exit(1 if failed else 0)
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    for regression in regressions:
+        print(f"回归：{regression}")
+    print(f"用例 {len(records)} 个，失败 {failed} 个，回归 {len(regressions)} 项（阈值 {args.threshold:.0%}）")
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+三维透视图网格抽稀基准
+用本地合成高程网格在不同分辨率下分别关闭和开启 view_lod 出图（不加光照、不画海岸线），
+比较 grdview 阶段的网格单元数、耗时和两张图的像素差异（需要 Pillow）
+
+用法：
+    python benchmarks/bench_grdview.py --resolutions 05m 02m 01m 30s --dpi 300 --output grdview.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_generate import CASES, DATA_DIR
+from benchmarks.synthetic import synthetic_relief
+from src.utils.constants import VIEW_PIXELS_PER_CELL
+
+
+def render(config):
+    """生成一张地图，返回 grdview 所用网格的单元数和各阶段耗时"""
+    from src.core.map_generator import MapGenerator
+
+    result = MapGenerator().generate(config)
+    stages = {stage["name"]: stage["wall_time"] for stage in result["profile"]["stages"]}
+    return {
+        "cells": result["resolution"]["view_cells"],
+        "factors": result["resolution"]["view_factors"],
+        "grdview_time": stages["elevation.grdview"],
+        "total_time": stages["generate"],
+        "output_path": result["output_path"],
+    }
+
+
+def image_rms(path_a, path_b):
+    """两张同尺寸图像的 RGB 均方根差（0-255），没有 Pillow 或尺寸不同时返回 None"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    with Image.open(path_a) as a, Image.open(path_b) as b:
+        if a.size != b.size:
+            return None
+        diff = np.asarray(a.convert("RGB"), dtype=np.float64) - np.asarray(b.convert("RGB"), dtype=np.float64)
+    return float(np.sqrt(np.mean(diff ** 2)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="grdview 网格抽稀前后的出图耗时对比")
+    parser.add_argument("--case", default="CN_NE", choices=list(CASES))
+    parser.add_argument("--resolutions", nargs="+", default=["05m", "02m", "01m", "30s"])
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--quality", type=float, default=1.0, help="view_quality 质量系数")
+    parser.add_argument("--output", default=None, help="结果的 JSON 导出路径")
+    args = parser.parse_args()
+
+    region = CASES[args.case]
+    output_dir = tempfile.mkdtemp(prefix="quick_gmt_grdview_")
+    results = []
+    print(f"{'resolution':>10} {'cells':>12} {'grdview(s)':>11} {'lod cells':>12} {'factors':>8} "
+          f"{'grdview(s)':>11} {'speedup':>8} {'rms diff':>9}")
+    for resolution in args.resolutions:
+        relief = synthetic_relief(region, resolution, os.path.join(DATA_DIR, f"{args.case}_{resolution}.nc"))
+        config = {
+            "elevation": True,
+            "topography": False,
+            "coast_line": False,
+            "plot_polygons": False,
+            "plot_points": False,
+            "region": region,
+            "resolution": resolution,
+            "relief_grid": relief,
+            "max_grid_cells": 10 ** 10,
+            "cmap": "geo",
+            "dpi": args.dpi,
+            "image_format": "png",
+            "output_dir": output_dir,
+            "show": False,
+            "profile": True,
+            "render_cache": False,
+            "base_cache": False,
+            "view_quality": args.quality,
+        }
+        before = render({**config, "image_name": f"{resolution}_full", "view_lod": False})
+        after = render({**config, "image_name": f"{resolution}_lod", "view_lod": True})
+        rms = image_rms(before["output_path"], after["output_path"])
+        results.append({"resolution": resolution, "before": before, "after": after, "image_rms_diff": rms})
+        print(f"{resolution:>10} {before['cells']:>12,} {before['grdview_time']:>11.3f} {after['cells']:>12,} "
+              f"{'x'.join(map(str, after['factors'])):>8} {after['grdview_time']:>11.3f} "
+              f"{before['grdview_time'] / after['grdview_time']:>8.2f} {'-' if rms is None else f'{rms:.2f}':>9}")
+
+    print(f"输出图像：{output_dir}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"case": args.case, "dpi": args.dpi, "quality": args.quality,
+                       "pixels_per_cell": VIEW_PIXELS_PER_CELL, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
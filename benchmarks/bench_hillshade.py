@@ -0,0 +1,117 @@
+"""
+光照计算基准
+比较 pygmt.grdgradient 和 NumPy 分块光照在不同网格规模下的耗时，
+并检查两者结果的差异是否在 HILLSHADE_TOLERANCE 之内；
+--save-reference 把一块小网格的 grdgradient 结果保存为测试用的参考数据（tests/test_hillshade.py）
+
+用法：
+    python benchmarks/bench_hillshade.py --sizes 500 1000 2000 4000 --output hillshade.json
+    python benchmarks/bench_hillshade.py --sizes 64 --save-reference tests/data/grdgradient_reference.npz
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pygmt
+import xarray as xr
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.hillshade import hillshade, HILLSHADE_TOLERANCE
+
+
+def synthetic_grid(size, seed=0):
+    """生成 size×size 的合成地形（多尺度正弦叠加噪声），范围 10°×10°"""
+    rng = np.random.default_rng(seed)
+    lon = np.linspace(110, 120, size)
+    lat = np.linspace(30, 40, size)
+    x, y = np.meshgrid(np.linspace(0, 1, size), np.linspace(0, 1, size))
+    z = np.zeros((size, size))
+    for octave in range(1, 7):
+        frequency = 2 ** octave
+        phase = rng.uniform(0, 2 * np.pi, 2)
+        z += 3000 / frequency * np.sin(frequency * np.pi * x + phase[0]) * np.cos(frequency * np.pi * y + phase[1])
+    grid = xr.DataArray(z.astype(np.float32), coords={"lat": lat, "lon": lon}, dims=("lat", "lon"), name="z")
+    grid.gmt.registration = 0
+    grid.gmt.gtype = 1
+    return grid
+
+
+def save_reference(path, size, radiance=(270, 30)):
+    """
+    保存 size×size 合成地形的 grdgradient 光照作为参考数据，同时记录与 NumPy 实现的实测差值
+
+    Returns:
+        dict: 实测的 rms 和最大差值
+    """
+    grid = synthetic_grid(size)
+    reference = pygmt.grdgradient(grid=grid, radiance=list(radiance))
+    diff = hillshade(grid, radiance=radiance).values.astype(np.float64) - reference.values
+    measured = {"rms_diff": float(np.sqrt(np.nanmean(diff ** 2))), "max_diff": float(np.nanmax(np.abs(diff)))}
+    with pygmt.clib.Session() as lib:
+        gmt_version = lib.info["version"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(
+        path, elevation=grid.values, lon=grid.lon.values, lat=grid.lat.values,
+        intensity=reference.values.astype(np.float32), radiance=np.array(radiance),
+        pygmt_version=pygmt.__version__, gmt_version=gmt_version,
+        **measured,
+    )
+    return measured
+
+
+def timed(func, repeat):
+    """多次运行取最短耗时"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="grdgradient 与 NumPy 分块光照的耗时和差异对比")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=None, help="结果的 JSON 导出路径，用于记录容差的实测依据")
+    parser.add_argument("--save-reference", metavar="NPZ", default=None,
+                        help="保存第一个网格规模的 grdgradient 结果作为测试参考数据后退出")
+    args = parser.parse_args()
+
+    if args.save_reference:
+        measured = save_reference(args.save_reference, args.sizes[0])
+        print(f"参考数据：{args.save_reference}，rms {measured['rms_diff']:.4f}，最大差值 {measured['max_diff']:.4f}")
+        return
+
+    print(f"{'cells':>12} {'grdgradient(s)':>15} {'numpy(s)':>10} {'speedup':>8} {'rms diff':>9} {'max diff':>9}")
+    failed = False
+    results = []
+    for size in args.sizes:
+        grid = synthetic_grid(size)
+        gmt_time, reference = timed(lambda: pygmt.grdgradient(grid=grid, radiance=[270, 30]), args.repeat)
+        numpy_time, result = timed(lambda: hillshade(grid, radiance=(270, 30), workers=args.workers), args.repeat)
+        diff = result.values.astype(np.float64) - reference.values
+        rms = float(np.sqrt(np.nanmean(diff ** 2)))
+        max_diff = float(np.nanmax(np.abs(diff)))
+        failed |= rms > HILLSHADE_TOLERANCE
+        results.append({"size": size, "grdgradient_time": gmt_time, "numpy_time": numpy_time,
+                        "rms_diff": rms, "max_diff": max_diff})
+        print(f"{size * size:>12,} {gmt_time:>15.3f} {numpy_time:>10.3f} {gmt_time / numpy_time:>8.2f} "
+              f"{rms:>9.4f} {max_diff:>9.4f}")
+
+    print(f"容差（rms）：{HILLSHADE_TOLERANCE}，{'未通过' if failed else '通过'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"tolerance": HILLSHADE_TOLERANCE, "pygmt_version": pygmt.__version__, "results": results},
+                      f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+启动耗时基准
+在全新的子进程中分别测量：
+- 界面可显示前需要的导入耗时（延迟加载 PyGMT 后）
+- 后台预热各步骤（导入 PyGMT、创建 GMT 会话、创建地图生成器）的耗时
+- 以前在显示界面前同步完成全部加载时的总耗时
+有图形环境时还会测量创建 Tk 窗口的耗时
+
+用法：
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中执行，保证每次测量都不受已导入模块的影响
+PROBE = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+result = {{}}
+start = time.perf_counter()
+from src.gui.config_gui import ConfigGUI
+from src.core.worker_pool import WorkerPool
+from src.core.warmup import warm_up
+result["gui_imports"] = time.perf_counter() - start
+if {with_window}:
+    try:
+        start = time.perf_counter()
+        app = ConfigGUI()
+        app.window.update()
+        result["window"] = time.perf_counter() - start
+        app.window.destroy()
+    except Exception:
+        pass
+_, timings = warm_up()
+result.update(timings)
+print(json.dumps(result))
+"""
+
+
+def probe(with_window):
+    """在子进程中测量一次，返回各步骤耗时"""
+    code = PROBE.format(root=PROJECT_ROOT, with_window=with_window)
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True, cwd=PROJECT_ROOT
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="界面启动和 GMT 预热耗时")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-window", action="store_true", help="不创建 Tk 窗口（无图形环境时使用）")
+    args = parser.parse_args()
+
+    with_window = not args.no_window and (sys.platform == "win32" or bool(os.environ.get("DISPLAY")))
+    runs = [probe(with_window) for _ in range(args.repeat)]
+    steps = list(dict.fromkeys(key for run in runs for key in run))
+    medians = {step: statistics.median(run[step] for run in runs if step in run) for step in steps}
+
+    for step in steps:
+        print(f"{step:<14} {medians[step] * 1000:>9.1f} ms")
+    warm = sum(medians[step] for step in ("import_pygmt", "gmt_session", "generator"))
+    visible = medians["gui_imports"] + medians.get("window", 0)
+    print(f"{'界面可见':<10} {visible * 1000:>9.1f} ms（预热在后台进行，另需 {warm * 1000:.1f} ms 后可出图）")
+    print(f"{'同步加载':<10} {(visible + warm) * 1000:>9.1f} ms（界面显示前完成全部加载时）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+基准测试用的合成数据
+按区域和分辨率生成确定性的高程网格、投点和多边形，不需要联网
+"""
+import json
+import os
+
+import numpy as np
+import xarray as xr
+
+from src.utils.constants import RESOLUTION_SECONDS
+
+
+def synthetic_relief(region, resolution, path, seed=0):
+    """
+    生成与 earth relief 同间距、同配准（网格线）的合成高程网格并保存为 netCDF
+
+    Args:
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        resolution (str): 地形分辨率，如 '05m'
+        path (str): 输出路径，已存在时直接复用
+        seed (int): 随机种子
+
+    Returns:
+        str: 网格文件路径
+    """
+    if os.path.exists(path):
+        return path
+    step = RESOLUTION_SECONDS[resolution] / 3600
+    lon = np.round(np.arange(region[0], region[1] + step / 2, step), 10)
+    lat = np.round(np.arange(region[2], region[3] + step / 2, step), 10)
+
+    # 按经纬度绝对位置叠加多个尺度的正弦，不同分辨率下地形一致
+    rng = np.random.default_rng(seed)
+    x = np.radians(lon)[None, :]
+    y = np.radians(lat)[:, None]
+    z = np.zeros((lat.size, lon.size), dtype=np.float32)
+    for octave in range(8):
+        frequency = 2 ** octave * 4
+        phase = rng.uniform(0, 2 * np.pi, 2)
+        z += (4000 / 2 ** octave * np.sin(frequency * x + phase[0]) * np.cos(frequency * y + phase[1])).astype(np.float32)
+    z -= 1000  # 让约一半的区域低于海平面
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    grid = xr.DataArray(z, coords={"lat": lat, "lon": lon}, dims=("lat", "lon"), name="z")
+    grid.to_netcdf(path)
+    return path
+
+
+def synthetic_points(region, count, path, seed=0):
+    """生成区域内均匀分布、带数值列的投点 CSV"""
+    if os.path.exists(path):
+        return path
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = np.column_stack([
+        rng.uniform(region[0], region[1], count),
+        rng.uniform(region[2], region[3], count),
+        rng.uniform(0, 100, count),
+    ])
+    np.savetxt(path, data, fmt="%.6f", delimiter=",", header="x,y,value", comments="")
+    return path
+
+
+def synthetic_polygons(region, count, vertices, path, seed=0):
+    """生成区域内 count 个各有 vertices 个顶点的不规则多边形 GeoJSON"""
+    if os.path.exists(path):
+        return path
+    rng = np.random.default_rng(seed)
+    span = min(region[1] - region[0], region[3] - region[2])
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    features = []
+    for _ in range(count):
+        center_x = rng.uniform(region[0] + span / 10, region[1] - span / 10)
+        center_y = rng.uniform(region[2] + span / 10, region[3] - span / 10)
+        radius = span / 20 * (1 + 0.3 * rng.standard_normal(vertices).clip(-2, 2))
+        ring = np.column_stack([center_x + radius * np.cos(angles), center_y + radius * np.sin(angles)])
+        ring = np.vstack([ring, ring[:1]])
+        features.append({
+            "type": "Feature",
+            "properties": {},
+            "geometry": {"type": "Polygon", "coordinates": [ring.round(6).tolist()]},
+        })
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+    return path
@@ -1,42 +1,115 @@
+import argparse
+import json
 import os
 import sys
-import tkinter as tk
-from tkinter import messagebox
 
 # 添加项目根目录到 Python 路径
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
+# 这里只导入不依赖 PyGMT 的模块，PyGMT 在后台线程或用到时再导入，界面可以立即显示
 from src.gui.config_gui import ConfigGUI
-from src.core.map_generator import MapGenerator
-from src.utils.constants import OUTPUT_DIR
+from src.core.worker_pool import WorkerPool
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Quick GMT 地图快速绘制工具")
+    parser.add_argument("--batch", metavar="MANIFEST", help="无界面批量出图，读取 JSON/YAML 任务清单")
+    parser.add_argument("--workers", type=int, default=None, help="批量出图的最大并发进程数，默认为 CPU 核数")
+    parser.add_argument("--timeout", type=float, default=None, help="单个任务的超时时间（秒）")
+    parser.add_argument("--warm-pool", action="store_true", help="批量出图时使用常驻进程池，每个进程只加载一次 GMT")
+    parser.add_argument("--summary", default=None, help="批量出图汇总文件路径，默认为 output/batch_summary.json")
+    parser.add_argument("--tiled", metavar="CONFIG", help="无界面分块并行出图，读取单个 JSON 配置")
+    parser.add_argument("--animate", metavar="SCHEDULE", help="无界面并行生成动画帧，读取 JSON 帧计划")
+    parser.add_argument("--grid", default="2x2", help="分块行列数，如 4x4")
+    parser.add_argument("--xyz", metavar="DIR", default=None, help="输出 z/x/y PNG 瓦片金字塔的目录")
+    parser.add_argument("--serve", action="store_true", help="启动本地 HTTP/JSON 出图服务")
+    parser.add_argument("--host", default=None, help="出图服务监听地址，默认为 127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="出图服务监听端口，默认为 8765")
+    parser.add_argument("--data-dir", default=None, help="出图服务请求可以引用的数据文件目录，默认为 data")
+    parser.add_argument("--zoom", default=None, help="瓦片金字塔缩放级别范围，如 3-8，默认到拼接图的原始精度")
+    return parser.parse_args()
 
 def main():
     """主程序入口函数"""
-    # 创建地图生成器实例
-    map_generator = MapGenerator()
+    args = parse_args()
+    if args.batch:
+        from src.core.batch import run_batch
+        summary = run_batch(
+            args.batch, workers=args.workers, timeout=args.timeout, summary_path=args.summary, warm=args.warm_pool
+        )
+        print(f"完成 {summary['succeeded']} 个，失败 {summary['failed']} 个，用时 {summary['wall_time']:.1f} 秒")
+        sys.exit(1 if summary["failed"] else 0)
+    if args.serve:
+        from src.core.service import serve
+        from src.utils.constants import SERVICE_HOST, SERVICE_PORT, SERVICE_DATA_DIR
+        serve(
+            args.host or SERVICE_HOST, args.port or SERVICE_PORT, workers=args.workers, timeout=args.timeout,
+            data_dir=args.data_dir or SERVICE_DATA_DIR
+        )
+        return
+    if args.animate:
+        from src.core.animation import load_schedule, render_animation
+        summary = render_animation(load_schedule(args.animate), workers=args.workers, timeout=args.timeout)
+        for error in summary["errors"]:
+            print(f"[{error['status']}] frame_{error['frame']:04d} {error['error']}")
+        print(f"完成 {summary['succeeded']}/{summary['frames']} 帧，出图 {summary['render_time']:.1f} 秒，"
+              f"{summary['frames_per_second']} 帧/秒，帧序列：{summary['output_dir']}")
+        sys.exit(1 if summary["errors"] else 0)
+    if args.tiled:
+        from src.core.tiling import render_tiled
+        with open(args.tiled, encoding="utf-8") as f:
+            config = json.load(f)
+        rows, columns = (int(n) for n in args.grid.lower().split("x"))
+        min_zoom, max_zoom = (int(n) for n in args.zoom.split("-")) if args.zoom else (0, None)
+        summary = render_tiled(
+            config, rows, columns, workers=args.workers, timeout=args.timeout,
+            xyz_dir=args.xyz, min_zoom=min_zoom, max_zoom=max_zoom
+        )
+        failed = [tile for tile in summary["tiles"] if tile["status"] != "ok"]
+        for tile in failed:
+            print(f"[{tile['status']}] tile_{tile['row']}_{tile['column']} {tile['error']}")
+        print(f"拼接结果：{summary['mosaic_path']}，用时 {summary['wall_time']:.1f} 秒")
+        sys.exit(1 if failed else 0)
+    
+    # 出图在一个常驻子进程中进行，子进程加载 GMT 完成前界面禁用运行和预览；
+    # 高程和光照缓存在多次出图之间保留，取消时只替换这个子进程
+    pool = WorkerPool(1).start()
     
-    def on_submit(config):
+    def on_submit(config, progress=None, cancel_event=None):
         """
-        提交配置的回调函数
+        提交配置的回调函数，由界面在后台线程中调用；出图在常驻子进程中进行，
+        取消时终止并替换该子进程，后台线程只负责等待和转发进度
         
         Args:
             config (dict): 地图生成配置
+            progress (callable): 进度回调
+            cancel_event (threading.Event): 取消标志
+        
+        Returns:
+            str: 输出图像路径，多个格式时以逗号分隔
+        """
+        result = pool.run({**config, "show": True}, progress=progress, cancel_event=cancel_event)
+        return ", ".join(result["output_paths"])
+    
+    def on_preview(config, progress=None, cancel_event=None):
+        """生成草图的回调函数，同样在常驻子进程中运行，返回预览图路径"""
+        result = pool.run(config, kind="preview", progress=progress, cancel_event=cancel_event)
+        return result["output_path"]
+    
+    def on_prefetch(config, cancel_event=None):
+        """
+        在出图子进程中预先读取高程数据（和光照），之后的出图直接使用该进程的缓存；
+        取消时只通知预取在下一个检查点停止，不终止子进程
         """
-        try:
-            map_generator.generate(config)
-            # 显示成功消息
-            messagebox.showinfo(
-                "成功", 
-                f"图像已成功保存到 {OUTPUT_DIR}/{config['image_name']}.{config['image_format']}"
-            )
-        except Exception as e:
-            # 显示错误消息
-            messagebox.showerror("错误", f"生成图像时发生错误：{str(e)}")
+        pool.run(config, kind="prefetch", cancel_event=cancel_event, terminate=False)
     
     # 创建并运行GUI
-    app = ConfigGUI(on_submit=on_submit)
+    app = ConfigGUI(
+        on_submit=on_submit, on_preview=on_preview, ready_event=pool.ready, on_prefetch=on_prefetch
+    )
     app.run()
+    pool.shutdown(wait=False, cancel_pending=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
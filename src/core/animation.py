@@ -0,0 +1,292 @@
+"""
+动画出图模块
+按帧计划（每帧的区域和/或投点时间范围）并行生成固定尺寸的 PNG 序列，可选合成 GIF/WebP。
+所有帧覆盖范围的高程只读取一次，保存为本地网格后由各进程只读共享
+"""
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.core.batch import with_defaults
+from src.core.hillshade import intensity_range
+from src.core.point_layer import load_points
+from src.core.relief_cache import ReliefTileCache
+from src.core.resolution import auto_resolution, uses_mercator
+from src.core.worker_pool import WorkerPool
+from src.utils.constants import AUTO_RESOLUTION, OUTPUT_DIR, OUTPUT_DPI, IMAGE_PROJECTION_WIDTH, VIEW_PROJECTION_WIDTH
+
+
+def load_schedule(path):
+    """
+    读取帧计划
+
+    Args:
+        path (str): JSON 文件路径，内容为：
+            - config (dict): 与界面生成的配置相同的基础配置
+            - frames (list): 每帧覆盖基础配置的字段，如 {"region": [...], "time_range": [0, 10]}
+            - pan (dict): 平移动画 {"from": 区域, "to": 区域, "frames": 帧数}
+            - time (dict): 时间序列 {"start", "end", "frames", "window"}，window 为空时逐帧累积显示
+            - fps (float): 动图帧率，默认 10
+            - gif / webp (str): 动图输出路径
+
+    Returns:
+        dict: 帧计划
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def pan_regions(start, end, count):
+    """在两个区域之间线性插值出 count 个区域"""
+    if count == 1:
+        return [list(start)]
+    return [
+        [a + (b - a) * i / (count - 1) for a, b in zip(start, end)]
+        for i in range(count)
+    ]
+
+
+def time_ranges(start, end, count, window=None):
+    """
+    时间序列每帧的时间范围
+
+    Args:
+        start (float): 起始时间
+        end (float): 结束时间
+        count (int): 帧数
+        window (float): 每帧显示的时间跨度，None 表示从 start 开始累积
+
+    Returns:
+        list: [起点, 终点] 列表
+    """
+    stops = [start + (end - start) * (i + 1) / count for i in range(count)]
+    return [[start if window is None else stop - window, stop] for stop in stops]
+
+
+def build_frames(schedule):
+    """
+    把帧计划展开为每帧的配置覆盖项
+
+    Returns:
+        list: 每帧的覆盖项字典
+    """
+    frames = [dict(frame) for frame in schedule.get("frames", [])]
+    generated = []
+    if schedule.get("pan"):
+        pan = schedule["pan"]
+        generated.append([{"region": region} for region in pan_regions(pan["from"], pan["to"], pan["frames"])])
+    if schedule.get("time"):
+        spec = schedule["time"]
+        generated.append([
+            {"time_range": time_range}
+            for time_range in time_ranges(spec["start"], spec["end"], spec["frames"], spec.get("window"))
+        ])
+    if generated:
+        count = max(len(items) for items in generated)
+        if frames:
+            count = max(count, len(frames))
+        # 帧数不同时较短的序列停在最后一帧
+        frames = [
+            {
+                **(frames[min(i, len(frames) - 1)] if frames else {}),
+                **{key: value for items in generated for key, value in items[min(i, len(items) - 1)].items()},
+            }
+            for i in range(count)
+        ]
+    if not frames:
+        raise ValueError("帧计划中没有帧：需要 frames、pan 或 time")
+    return frames
+
+
+def union_region(regions):
+    """多个区域的外包范围"""
+    return [
+        min(region[0] for region in regions),
+        max(region[1] for region in regions),
+        min(region[2] for region in regions),
+        max(region[3] for region in regions),
+    ]
+
+
+def _frame_config(config, frame, index, resolution, relief_grid, output_dir, shared):
+    """单帧配置"""
+    frame_config = {
+        **config,
+        **shared,
+        **{key: value for key, value in frame.items() if key != "time_range"},
+        "resolution": resolution,
+        "image_name": f"frame_{index:04d}",
+        "image_format": "png",
+        "exports": None,
+        "output_dir": output_dir,
+        "show": False,
+    }
+    if relief_grid:
+        frame_config["relief_grid"] = relief_grid
+    if "time_range" in frame and frame_config.get("point_config"):
+        frame_config["point_config"] = {**frame_config["point_config"], "time_range": frame["time_range"]}
+    return frame_config
+
+
+def _point_color_range(config):
+    """投点按列着色时，以全部时间的数据范围作为各帧共用的配色范围"""
+    point_config = config.get("point_config") or {}
+    if not (config.get("plot_points") and point_config.get("color_column")) or point_config.get("color_range"):
+        return None
+    color = load_points({**point_config, "time_range": None})["color"]
+    return [float(np.nanmin(color)), float(np.nanmax(color))] if color.size else None
+
+
+def _save_union_relief(regions, resolution, path, topography):
+    """
+    读取全部帧覆盖范围的高程并保存为 netCDF，由各进程只读共享
+
+    Returns:
+        dict: 开启光照时为光照归一化范围 shade_range（光照强度图的配色随之固定为 [-1, 1]），
+            否则为三维透视图的高程配色范围 cpt_series
+    """
+    grid = ReliefTileCache().load(resolution, union_region(regions))
+    grid.attrs["node_offset"] = int(grid.gmt.registration)
+    grid.to_netcdf(path)
+    # 固定配色和明暗范围，避免平移时各帧按各自的范围拉伸导致闪烁；
+    # 开启光照时绘制的是光照强度，高程范围用不上
+    if topography:
+        return {"shade_range": list(intensity_range(grid)), "gradient_engine": "numpy"}
+    return {"cpt_series": [float(np.nanmin(grid.values)), float(np.nanmax(grid.values))]}
+
+
+def _import_pillow():
+    """Pillow 是可选依赖，只在统一帧尺寸和合成动图时需要"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def fit_frames(paths):
+    """
+    各帧区域纬度不同时墨卡托投影下的高度会略有差别，居中补白到统一尺寸
+
+    Returns:
+        tuple: 统一后的宽和高，没有 Pillow 时返回 None
+    """
+    Image = _import_pillow()
+    if Image is None:
+        return None
+    sizes = []
+    for path in paths:
+        with Image.open(path) as image:
+            sizes.append(image.size)
+    size = (max(w for w, _ in sizes), max(h for _, h in sizes))
+    for path, frame_size in zip(paths, sizes):
+        if frame_size != size:
+            with Image.open(path) as image:
+                canvas = Image.new("RGB", size, "white")
+                canvas.paste(image.convert("RGB"), ((size[0] - frame_size[0]) // 2, (size[1] - frame_size[1]) // 2))
+            canvas.save(path)
+    return size
+
+
+def assemble(paths, output_path, fps=10):
+    """
+    把 PNG 序列合成为 GIF 或 WebP（按扩展名）
+
+    Args:
+        paths (list): 按顺序排列的帧路径
+        output_path (str): 动图路径
+        fps (float): 帧率
+    """
+    Image = _import_pillow()
+    if Image is None:
+        raise ImportError("合成动图需要安装 Pillow：pip install pillow")
+    frames = [Image.open(path).convert("RGB") for path in paths]
+    frames[0].save(
+        output_path,
+        save_all=True,
+        append_images=frames[1:],
+        duration=round(1000 / fps),
+        loop=0,
+    )
+    for frame in frames:
+        frame.close()
+
+
+def render_animation(schedule, workers=None, timeout=None, output_dir=None):
+    """
+    并行生成动画帧
+
+    Args:
+        schedule (dict): 帧计划，见 load_schedule
+        workers (int): 最大并发进程数，默认为 CPU 核数
+        timeout (float): 单帧的超时时间（秒）
+        output_dir (str): 帧序列目录，默认为 output/<图片名称>_frames
+
+    Returns:
+        dict: 汇总信息，包含每帧状态、帧序列路径、动图路径和吞吐量（帧/秒）
+    """
+    config = with_defaults(schedule.get("config", {}))
+    frames = build_frames(schedule)
+    output_dir = output_dir or os.path.join(config.get("output_dir", OUTPUT_DIR), f"{config['image_name']}_frames")
+    regions = [frame.get("region", config["region"]) for frame in frames]
+
+    start = time.perf_counter()
+    # 所有帧使用同一分辨率，避免相邻帧的地形细节跳变
+    resolution = config.get("resolution", "05m")
+    if resolution == AUTO_RESOLUTION:
+        width = config.get("width") or (
+            IMAGE_PROJECTION_WIDTH if config["elevation"] and config["topography"] else VIEW_PROJECTION_WIDTH
+        )
+        resolution = auto_resolution(regions[0], width, config.get("dpi", OUTPUT_DPI), uses_mercator(config))
+
+    color_range = _point_color_range(config)
+    if color_range:
+        config = {**config, "point_config": {**config["point_config"], "color_range": color_range}}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        relief_grid = config.get("relief_grid")
+        shared = {}
+        load_time = 0.0
+        if config["elevation"] and not relief_grid:
+            load_start = time.perf_counter()
+            relief_grid = os.path.join(tmpdir, "relief.nc")
+            shared = _save_union_relief(regions, resolution, relief_grid, config["topography"])
+            load_time = time.perf_counter() - load_start
+
+        configs = [
+            _frame_config(config, frame, index, resolution, relief_grid, output_dir, shared)
+            for index, frame in enumerate(frames)
+        ]
+        render_start = time.perf_counter()
+        # 常驻进程在帧之间复用 GMT 会话和内存中的网格缓存
+        with WorkerPool(workers, timeout=timeout) as pool:
+            records = pool.map(configs)
+        render_time = time.perf_counter() - render_start
+
+    paths = [record["result"]["output_path"] for record in records if record["status"] == "ok"]
+    summary = {
+        "frames": len(frames),
+        "succeeded": len(paths),
+        "resolution": resolution,
+        "relief_load_time": round(load_time, 3),
+        "render_time": round(render_time, 3),
+        "frames_per_second": round(len(paths) / render_time, 3) if render_time else None,
+        "frame_times": [record["wall_time"] for record in records],
+        "errors": [
+            {"frame": record["index"], "status": record["status"], "error": record["error"]}
+            for record in records if record["status"] != "ok"
+        ],
+        "output_dir": output_dir,
+        "frame_size": fit_frames(paths) if paths else None,
+        "animations": [],
+    }
+    if len(paths) == len(frames):
+        for key in ("gif", "webp"):
+            if schedule.get(key):
+                assemble(paths, schedule[key], schedule.get("fps", 10))
+                summary["animations"].append(schedule[key])
+    summary["wall_time"] = round(time.perf_counter() - start, 3)
+    return summary
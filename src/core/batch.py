@@ -0,0 +1,204 @@
+"""
+批量出图模块
+读取任务清单，在多个子进程中并行生成地图，每个子进程拥有独立的 GMT 会话
+"""
+import json
+import multiprocessing
+import os
+import queue
+import time
+from collections import deque
+
+from src.utils.constants import (
+    DEFAULT_IMAGE_NAME, DEFAULT_IMAGE_FORMAT, DEFAULT_REGION, OUTPUT_DIR
+)
+
+
+def load_manifest(path):
+    """
+    读取任务清单
+
+    Args:
+        path (str): JSON 或 YAML 文件路径，内容为配置字典列表（与界面生成的配置相同）
+
+    Returns:
+        list: 配置字典列表
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("读取 YAML 清单需要安装 PyYAML：pip install pyyaml") from e
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get("jobs", [])
+    if not isinstance(manifest, list):
+        raise ValueError("任务清单必须是配置字典列表")
+    return manifest
+
+
+def with_defaults(config, index=0):
+    """
+    为清单中省略的字段补充默认值
+
+    Args:
+        config (dict): 单个任务的配置
+        index (int): 任务序号，用于生成默认图片名称
+
+    Returns:
+        dict: 完整的地图生成配置
+    """
+    defaults = {
+        "elevation": True,
+        "topography": True,
+        "coast_line": True,
+        "plot_polygons": False,
+        "plot_points": False,
+        "region": [DEFAULT_REGION[k] for k in ("min_lon", "max_lon", "min_lat", "max_lat")],
+        "image_name": f"{DEFAULT_IMAGE_NAME}_{index}",
+        "image_format": DEFAULT_IMAGE_FORMAT,
+    }
+    return {**defaults, **config, "show": False}
+
+
+def render_config(config):
+    """
+    在当前进程中生成一张地图
+
+    Args:
+        config (dict): 地图生成配置
+
+    Returns:
+        dict: MapGenerator.generate 的生成结果
+    """
+    from src.core.map_generator import MapGenerator
+    return MapGenerator().generate(config)
+
+
+def _job_entry(target, job, index, result_queue):
+    """子进程入口：执行任务并把结果放回队列"""
+    try:
+        result_queue.put((index, "ok", target(job), None))
+    except Exception as e:
+        result_queue.put((index, "error", None, f"{type(e).__name__}: {e}"))
+
+
+def run_jobs(jobs, target, workers=None, timeout=None, on_result=None):
+    """
+    在进程池中并行执行任务，每个任务使用一个新的子进程，超时的子进程会被终止
+
+    Args:
+        jobs (list): 任务参数列表，每个元素作为 target 的唯一参数
+        target (callable): 模块级函数，在子进程中执行
+        workers (int): 最大并发进程数，默认为 CPU 核数
+        timeout (float): 单个任务的超时时间（秒），None 表示不限制
+        on_result (callable): 每个任务结束时的回调 on_result(record)
+
+    Returns:
+        list: 与 jobs 顺序一致的结果记录，包含 status、wall_time、result、error
+    """
+    workers = workers or os.cpu_count() or 1
+    # spawn 模式下子进程不会继承父进程中已初始化的 GMT 会话
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    pending = deque(enumerate(jobs))
+    running = {}
+    records = [None] * len(jobs)
+
+    def finish(index, status, result=None, error=None):
+        process, start = running.pop(index)
+        process.join()
+        records[index] = {
+            "index": index,
+            "status": status,
+            "wall_time": round(time.perf_counter() - start, 3),
+            "result": result,
+            "error": error,
+        }
+        if on_result:
+            on_result(records[index])
+
+    while pending or running:
+        while pending and len(running) < workers:
+            index, job = pending.popleft()
+            process = context.Process(target=_job_entry, args=(target, job, index, result_queue))
+            process.start()
+            running[index] = (process, time.perf_counter())
+
+        try:
+            index, status, result, error = result_queue.get(timeout=0.2)
+            if index in running:
+                finish(index, status, result, error)
+        except queue.Empty:
+            pass
+
+        now = time.perf_counter()
+        for index, (process, start) in list(running.items()):
+            if timeout and now - start > timeout:
+                process.terminate()
+                finish(index, "timeout", error=f"超过 {timeout} 秒")
+            elif not process.is_alive() and process.exitcode != 0:
+                finish(index, "crashed", error=f"子进程退出码 {process.exitcode}")
+
+    return records
+
+
+def run_batch(manifest_path, workers=None, timeout=None, summary_path=None, warm=False):
+    """
+    批量生成清单中的地图并写出汇总
+
+    Args:
+        manifest_path (str): 任务清单路径
+        workers (int): 最大并发进程数
+        timeout (float): 单个任务的超时时间（秒）
+        summary_path (str): 汇总文件路径，默认为 output/batch_summary.json
+        warm (bool): 是否使用常驻进程池（每个进程只加载一次 GMT，适合大量小图）
+
+    Returns:
+        dict: 汇总信息
+    """
+    configs = [with_defaults(config, i) for i, config in enumerate(load_manifest(manifest_path))]
+
+    def report(record):
+        detail = record["result"]["output_path"] if record["result"] else record["error"]
+        print(f"[{record['status']}] {configs[record['index']]['image_name']} "
+              f"{record['wall_time']:.1f}s {detail}")
+
+    start = time.perf_counter()
+    if warm:
+        from src.core.worker_pool import WorkerPool
+        with WorkerPool(workers, timeout=timeout) as pool:
+            records = pool.map(configs, on_result=report)
+    else:
+        records = run_jobs(configs, render_config, workers=workers, timeout=timeout, on_result=report)
+    summary = {
+        "manifest": manifest_path,
+        "warm_pool": warm,
+        "workers": workers or os.cpu_count() or 1,
+        "timeout": timeout,
+        "wall_time": round(time.perf_counter() - start, 3),
+        "succeeded": sum(record["status"] == "ok" for record in records),
+        "failed": sum(record["status"] != "ok" for record in records),
+        "jobs": [
+            {
+                "image_name": config["image_name"],
+                "status": record["status"],
+                "wall_time": record["wall_time"],
+                "output_path": record["result"]["output_path"] if record["result"] else None,
+                "output_paths": record["result"]["output_paths"] if record["result"] else [],
+                "error": record["error"],
+                "profile": record["result"]["profile"] if record["result"] else None,
+            }
+            for config, record in zip(configs, records)
+        ],
+    }
+
+    summary_path = summary_path or os.path.join(OUTPUT_DIR, "batch_summary.json")
+    os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
@@ -0,0 +1,160 @@
+"""
+海岸线模块
+按区域大小和地图宽度自动选择 GSHHG 海岸线精度；
+栅格输出时把裁剪到区域的海陆掩膜按 (区域, 精度, 网格尺寸) 缓存在磁盘上，
+同一区域再次出图时不再重新提取和裁剪海岸线，直接用 grdimage 绘制水域
+"""
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+import pygmt
+import xarray as xr
+
+from src.core.hillshade import METERS_PER_DEGREE
+from src.core.resolution import projected_y
+from src.utils.constants import (
+    COAST_RESOLUTIONS, COAST_DETAIL_MM, COAST_WATER_COLOR, COAST_CACHE_DIR, COAST_CACHE_MAX_BYTES
+)
+
+
+def coast_resolution(region, width_cm, detail_mm=COAST_DETAIL_MM):
+    """
+    选择能表现图上可见细节的最粗海岸线精度
+
+    Args:
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        width_cm (float): 地图宽度（cm）
+        detail_mm (float): 图上可分辨的最小尺寸（mm）
+
+    Returns:
+        str: 'crude'、'low'、'intermediate'、'high' 或 'full'
+    """
+    min_lon, max_lon, min_lat, max_lat = region
+    # 区域中纬度处地图宽度对应的地面距离（km）
+    ground_km = (max_lon - min_lon) * METERS_PER_DEGREE / 1000 * math.cos(math.radians((min_lat + max_lat) / 2))
+    detail_km = ground_km / (width_cm * 10) * detail_mm
+    for resolution, nominal_km in COAST_RESOLUTIONS:  # 从粗到细
+        if nominal_km <= detail_km:
+            return resolution
+    return COAST_RESOLUTIONS[-1][0]
+
+
+def mask_shape(region, width_cm, dpi, mercator=False):
+    """
+    海陆掩膜的像元数，经度方向与输出像素一一对应
+
+    Args:
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        width_cm (float): 地图宽度（cm）
+        dpi (int): 输出 dpi
+        mercator (bool): 是否为墨卡托投影，否则为 Miller 圆柱投影（南北方向都按纬度拉伸）
+
+    Returns:
+        tuple: (行数, 列数)
+    """
+    min_lon, max_lon, min_lat, max_lat = region
+    columns = max(int(math.ceil(width_cm / 2.54 * dpi)), 2)
+    aspect = float(projected_y(max_lat, mercator) - projected_y(min_lat, mercator)) / math.radians(max_lon - min_lon)
+    return max(int(math.ceil(columns * aspect)), 2), columns
+
+
+class CoastMaskCache:
+    """海陆掩膜磁盘缓存，超过容量上限时按最近最少使用淘汰"""
+
+    def __init__(self, cache_dir=COAST_CACHE_DIR, max_bytes=COAST_CACHE_MAX_BYTES):
+        """
+        初始化海陆掩膜缓存
+
+        Args:
+            cache_dir (str): 缓存目录
+            max_bytes (int): 缓存占用磁盘的上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def cpt_path(self):
+        """水域配色表：掩膜中的水域为 1，陆地为 NaN（绘制时透明）"""
+        path = os.path.join(self.cache_dir, "water.cpt")
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"0 {COAST_WATER_COLOR} 2 {COAST_WATER_COLOR}\nB {COAST_WATER_COLOR}\nF {COAST_WATER_COLOR}\n")
+        return path
+
+    def load(self, region, resolution, shape):
+        """
+        读取海陆掩膜，未命中时用 grdlandmask 生成并保存
+
+        Args:
+            region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+            resolution (str): 海岸线精度
+            shape (tuple): 掩膜的 (行数, 列数)
+
+        Returns:
+            xarray.DataArray: 像元配准的掩膜，水域为 1，陆地为 NaN
+        """
+        text = json.dumps({"region": list(region), "resolution": resolution, "shape": list(shape)})
+        path = os.path.join(self.cache_dir, f"{hashlib.sha256(text.encode('utf-8')).hexdigest()}.npz")
+        if os.path.exists(path):
+            self.stats["hits"] += 1
+            os.utime(path)  # 记录最近使用时间
+            with np.load(path) as data:
+                water, lon, lat = data["water"], data["lon"], data["lat"]
+        else:
+            self.stats["misses"] += 1
+            rows, columns = shape
+            land = pygmt.grdlandmask(
+                region=list(region),
+                spacing=f"{columns}+n/{rows}+n",
+                resolution=resolution,
+                registration="p",
+            ).sortby("lat").sortby("lon")
+            # grdlandmask 默认水域为 0，陆地为 1
+            water = (land.values == 0).astype(np.uint8)
+            lon, lat = land.lon.values, land.lat.values
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 先写临时文件再替换，避免并发进程读到写了一半的掩膜
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez_compressed(tmp_path, water=water, lon=lon, lat=lat)
+            os.replace(tmp_path, path)
+            self._evict(protected=path)
+
+        grid = xr.DataArray(
+            np.where(water == 1, np.float32(1), np.float32(np.nan)),
+            coords={"lat": lat, "lon": lon},
+            dims=("lat", "lon"),
+            name="water",
+        )
+        grid.gmt.registration = 1
+        grid.gmt.gtype = 1  # 地理坐标
+        return grid
+
+    def clear(self):
+        """删除全部缓存的掩膜"""
+        if os.path.exists(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def _evict(self, protected=None):
+        """超过容量上限时删除最久未使用的掩膜"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".npz") and ".tmp." not in name:
+                entries.append((os.path.getmtime(path), path, os.path.getsize(path)))
+
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == protected:
+                continue
+            os.remove(path)
+            total -= size
+            self.stats["evictions"] += 1
@@ -0,0 +1,164 @@
+"""
+光照计算模块
+用 NumPy 按行分块、带一行重叠（halo）并行计算 Lambertian 光照强度，
+可以替代单线程的 pygmt.grdgradient(radiance=[方位角, 高度角])
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import xarray as xr
+
+# 地球平均半径下一度对应的米数，与 GMT 地理网格的换算一致
+METERS_PER_DEGREE = 6371008.7714 * np.pi / 180
+
+# GMT grdgradient -E 的默认 Lambertian 参数
+DEFAULT_LIGHTING = {"ambient": 0.55, "diffuse": 0.6, "specular": 0.4, "shine": 10}
+
+# 与 grdgradient 结果比较时的验收容差（强度值的均方根差，强度范围为 [-1, 1]）。
+# 测试用 tests/data/grdgradient_reference.npz 中 grdgradient 的实际输出检查该容差，
+# 参考数据在装有 GMT 的环境中生成，生成时打印并保存实测的 rms 和最大差值：
+#     python benchmarks/bench_hillshade.py --sizes 64 --save-reference tests/data/grdgradient_reference.npz
+# 参考数据提交之前该值没有实测依据，测试会跳过比较
+HILLSHADE_TOLERANCE = 0.05
+
+
+def _shade_rows(z, row_start, row_stop, dx, dy, light, lighting):
+    """
+    计算 [row_start, row_stop) 行的光照强度，读取上下各一行作为重叠区
+
+    Args:
+        z (numpy.ndarray): 整个高程网格（只读共享）
+        dx (numpy.ndarray): 每行的东西向节点间距（米）
+        dy (float): 南北向节点间距（米），行号增大方向为正
+        light (numpy.ndarray): 指向光源的单位向量（东、北、上）
+        lighting (dict): Lambertian 参数
+    """
+    top, bottom = max(row_start - 1, 0), min(row_stop + 1, z.shape[0])
+    block = z[top:bottom].astype(np.float64)
+
+    dzdx = np.gradient(block, axis=1) / dx[top:bottom, None] if block.shape[1] > 1 else np.zeros_like(block)
+    dzdy = np.gradient(block, axis=0) / dy if block.shape[0] > 1 else np.zeros_like(block)
+    # 去掉重叠区
+    dzdx = dzdx[row_start - top:row_start - top + row_stop - row_start]
+    dzdy = dzdy[row_start - top:row_start - top + row_stop - row_start]
+
+    norm = np.sqrt(dzdx ** 2 + dzdy ** 2 + 1)
+    cos_i = (-dzdx * light[0] - dzdy * light[1] + light[2]) / norm
+    # 观察方向竖直向上时反射光的 z 分量
+    cos_r = np.clip(2 * cos_i / norm - light[2], 0, None)
+    return (
+        lighting["ambient"]
+        + lighting["diffuse"] * np.clip(cos_i, 0, None)
+        + lighting["specular"] * cos_r ** lighting["shine"]
+    )
+
+
+def _shade(grid, radiance, tile_rows, workers, lighting):
+    """分块并行计算未归一化的光照强度"""
+    lighting = {**DEFAULT_LIGHTING, **(lighting or {})}
+    azimuth, elevation = np.radians(radiance[0]), np.radians(radiance[1])
+    light = np.array([
+        np.sin(azimuth) * np.cos(elevation),
+        np.cos(azimuth) * np.cos(elevation),
+        np.sin(elevation),
+    ])
+
+    z = np.asarray(grid.values)
+    lon, lat = grid.lon.values, grid.lat.values
+    lon_step = abs(float(lon[1] - lon[0])) if lon.size > 1 else 1.0
+    lat_step = float(lat[1] - lat[0]) if lat.size > 1 else 1.0
+    dx = lon_step * METERS_PER_DEGREE * np.maximum(np.cos(np.radians(lat)), 1e-6)
+    dy = lat_step * METERS_PER_DEGREE  # 纬度降序时为负，梯度方向随之翻转
+
+    shade = np.empty(z.shape, dtype=np.float32)
+    starts = range(0, z.shape[0], tile_rows)
+
+    def run(row_start):
+        row_stop = min(row_start + tile_rows, z.shape[0])
+        shade[row_start:row_stop] = _shade_rows(z, row_start, row_stop, dx, dy, light, lighting)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        list(executor.map(run, starts))
+    return shade
+
+
+def halo_region(region, step):
+    """
+    四周各扩大一个网格间距的区域（纬度不超过 ±90），
+    按该区域读取高程后计算光照，区域边界上的节点也能使用中心差分
+
+    Args:
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        step (float): 网格间距（度）
+
+    Returns:
+        list: 扩大后的区域
+    """
+    return [region[0] - step, region[1] + step, max(region[2] - step, -90), min(region[3] + step, 90)]
+
+
+def _region_index(grid, region):
+    """区域内节点的纬度和经度掩码，取舍与瓦片缓存拼接区域时一致"""
+    lon, lat = grid.lon.values, grid.lat.values
+    tolerance = 1e-6 * (abs(float(lon[1] - lon[0])) if lon.size > 1 else 1.0)
+    rows = (lat >= region[2] - tolerance) & (lat <= region[3] + tolerance)
+    columns = (lon >= region[0] - tolerance) & (lon <= region[1] + tolerance)
+    return rows, columns
+
+
+def intensity_range(grid, radiance=(270, 30), tile_rows=256, workers=None, lighting=None, region=None):
+    """
+    未归一化光照强度的最小值和最大值，用于多个网格（如分块出图）统一归一化
+
+    Args:
+        region (list): 只统计该区域内的节点，grid 多出的一圈节点只作为差分的重叠区
+
+    Returns:
+        tuple: (最小值, 最大值)
+    """
+    shade = _shade(grid, radiance, tile_rows, workers, lighting)
+    if region is not None:
+        rows, columns = _region_index(grid, region)
+        shade = shade[rows][:, columns]
+    return float(np.nanmin(shade)), float(np.nanmax(shade))
+
+
+def hillshade(grid, radiance=(270, 30), tile_rows=256, workers=None, lighting=None, value_range=None,
+              region=None):
+    """
+    分块并行计算光照强度网格
+
+    Args:
+        grid (xarray.DataArray): 地理坐标高程网格，维度为 (lat, lon)
+        radiance (tuple): 光源方位角（自北顺时针）和高度角，单位度
+        tile_rows (int): 每个分块的行数
+        workers (int): 线程数，默认为 CPU 核数
+        lighting (dict): Lambertian 参数，默认与 grdgradient -E 相同
+        value_range (tuple): 归一化使用的强度范围，默认为本网格的最小值和最大值
+        region (list): 只返回该区域内的节点，grid 可以按 halo_region 多读一圈节点作为差分的重叠区
+
+    Returns:
+        xarray.DataArray: 与 grid（或其区域内部分）同坐标、范围为 [-1, 1] 的光照强度
+    """
+    shade = _shade(grid, radiance, tile_rows, workers, lighting)
+    registration, gtype = grid.gmt.registration, grid.gmt.gtype
+    if region is not None:
+        rows, columns = _region_index(grid, region)
+        shade = np.ascontiguousarray(shade[rows][:, columns])
+        grid = grid.isel(lat=rows, lon=columns)
+
+    # 按整个网格（或给定）的范围统一缩放到 [-1, 1]，保证各分块之间一致
+    low, high = value_range or (np.nanmin(shade), np.nanmax(shade))
+    if high > low:
+        shade -= low
+        shade *= 2 / (high - low)
+        shade -= 1
+        np.clip(shade, -1, 1, out=shade)
+    else:
+        shade[:] = 0
+
+    result = xr.DataArray(shade, coords=grid.coords, dims=grid.dims, name="intensity")
+    result.gmt.registration = registration
+    result.gmt.gtype = gtype
+    return result
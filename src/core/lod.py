@@ -0,0 +1,83 @@
+"""
+细节层次模块
+三维透视图（grdview）的曲面绘制耗时随网格单元数迅速增长，而输出图像上一个像素内的多个单元看不出区别。
+按地图宽度、输出 dpi 和观察高度角估算需要的网格密度，把高程网格块平均抽稀后再绘制
+"""
+import math
+
+import xarray as xr
+
+from src.core.relief_cache import block_average
+from src.utils.constants import VIEW_PIXELS_PER_CELL, VIEW_QUALITY
+
+
+def _snap(factor, intervals):
+    """优先选择能整除网格间隔数的倍数（不小于原倍数的一半），抽稀后网格仍覆盖整个区域"""
+    for candidate in range(factor, max(factor // 2, 1) - 1, -1):
+        if intervals % candidate == 0:
+            return candidate
+    return factor
+
+
+def view_factors(shape, width_cm, dpi, elevation=90, quality=VIEW_QUALITY, registration=0):
+    """
+    计算 grdview 网格的抽稀倍数
+
+    Args:
+        shape (tuple): 网格的 (行数, 列数)
+        width_cm (float): 地图宽度（cm）
+        dpi (int): 输出 dpi
+        elevation (float): 观察高度角（度），90 为垂直俯视，越小南北方向在图上越压缩
+        quality (float): 质量系数，1 表示每 VIEW_PIXELS_PER_CELL 个输出像素一个网格单元，2 表示密度加倍
+        registration (int): 网格配准方式，0 为网格线配准，1 为像元配准
+
+    Returns:
+        tuple: (经度方向, 纬度方向) 的抽稀倍数，1 表示不抽稀
+    """
+    rows, columns = shape
+    target_columns = max(width_cm / 2.54 * dpi * quality / VIEW_PIXELS_PER_CELL, 2)
+    # 图高按网格行列比估算，倾斜观察时南北方向按 sin(高度角) 压缩
+    target_rows = max(target_columns * rows / columns * math.sin(math.radians(elevation)), 2)
+    # 网格线配准时 n 个节点有 n - 1 个间隔
+    gaps = 0 if registration == 1 else 1
+    return (
+        _snap(max(int(columns / target_columns), 1), columns - gaps),
+        _snap(max(int(rows / target_rows), 1), rows - gaps),
+    )
+
+
+def decimate(grid, factors):
+    """
+    按整数倍块平均抽稀高程网格，忽略 NaN
+
+    Args:
+        grid (xarray.DataArray): 地理坐标高程网格，维度为 (lat, lon)
+        factors (tuple): (经度方向, 纬度方向) 的抽稀倍数
+
+    Returns:
+        xarray.DataArray: 抽稀后的网格，倍数均为 1 时原样返回
+    """
+    x_factor, y_factor = factors
+    if x_factor == 1 and y_factor == 1:
+        return grid
+
+    registration, gtype = int(grid.gmt.registration), grid.gmt.gtype
+    grid = grid.sortby("lat").sortby("lon")
+    grid.gmt.registration = registration
+
+    def coarse(coords, factor):
+        if registration == 1:  # 粗单元中心为所含细单元中心的平均
+            usable = coords.size // factor * factor
+            return coords[:usable].reshape(-1, factor).mean(axis=1)
+        return coords[::factor]
+
+    lon, lat = coarse(grid.lon.values, x_factor), coarse(grid.lat.values, y_factor)
+    result = xr.DataArray(
+        block_average(grid, (x_factor, y_factor), lon, lat),
+        coords={"lat": lat, "lon": lon},
+        dims=("lat", "lon"),
+        name=grid.name,
+    )
+    result.gmt.registration = registration
+    result.gmt.gtype = gtype
+    return result
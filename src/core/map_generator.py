@@ -2,21 +2,60 @@
 地图生成器核心模块
 提供地图生成的主要功能
 """
+import contextlib
 import os
+import tempfile
+import threading
 import pygmt
-import numpy as np
-from src.utils.constants import DEFAULT_POLYGON, DEFAULT_POINT
+import xarray as xr
+from src.core.coastline import CoastMaskCache, coast_resolution, mask_shape
+from src.core.hillshade import halo_region, hillshade
+from src.core.lod import decimate, view_factors
+from src.core.memory_cache import MemoryCache
+from src.core.polygon_layer import load_polygons, simplify_polygons, pixel_tolerance, plot_polygons
+from src.core.point_layer import load_points, plot_points, reduce_points
+from src.core.profiling import RenderProfiler, profiling_enabled, grid_details, TRACE_ENV
+from src.core.progress import check_cancelled
+from src.core.relief_cache import ReliefTileCache
+from src.core.render_cache import RenderCache, config_key, render_cache_enabled
+from src.core.resolution import resolve_resolution, uses_mercator
+from src.utils.constants import (
+    DEFAULT_POLYGON, DEFAULT_POINT, OUTPUT_DIR, OUTPUT_DPI, IMAGE_PROJECTION_WIDTH, VIEW_PROJECTION_WIDTH,
+    AUTO_RESOLUTION, PREVIEW_DPI, PREVIEW_DIR, BASE_LAYER_CACHE_DIR, BASE_LAYER_CACHE_MAX_BYTES, RASTER_FORMATS,
+    VIEW_QUALITY, COAST_WATER_TRANSPARENCY, RESOLUTION_SECONDS
+)
+
+# 光源方位角（正西）和高度角
+RADIANCE = (270, 30)
+
+# 三维透视图的观察方位角和高度角
+PERSPECTIVE = (180, 90)
+
 
 class MapGenerator:
     """地图生成器类，负责处理地图的生成和保存"""
     
     def __init__(self):
         """初始化地图生成器"""
-        self.fig = pygmt.Figure()
+        self.fig = None  # 每次出图时新建
         self.polygon_config = DEFAULT_POLYGON.copy()
         self.point_config = DEFAULT_POINT.copy()
+        self.relief_cache = ReliefTileCache()
+        self.memory_cache = MemoryCache()
+        self.render_cache = RenderCache()
+        self.base_cache = RenderCache(BASE_LAYER_CACHE_DIR, BASE_LAYER_CACHE_MAX_BYTES)
+        self.coast_cache = CoastMaskCache()
+        self._cancel_event = None
+        # GMT 会话和缓存都不是线程安全的，后台预取和出图依次使用
+        self._gmt_lock = threading.RLock()
+        self._profiler = RenderProfiler(enabled=False)
+        self.resolution_info = None
+        self.relief_source = None
+        self.point_stats = None
+        self.polygon_stats = None
+        self.coast_info = None
         
-    def generate(self, config):
+    def generate(self, config, progress=None, cancel_event=None):
         """
         根据配置生成地图
         
@@ -29,98 +68,519 @@ class MapGenerator:
                 - plot_points (bool): 是否进行投点
                 - compass (bool): 是否显示指南针
                 - region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+                - resolution (str): 地形分辨率，'auto' 表示按区域和输出 dpi 自动选择
+                - relief_grid (str): 本地高程网格（netCDF）路径，设置后不再读取 earth relief 数据
+                - gradient_engine (str): 光照计算方式，'grdgradient'（默认）或 'numpy'（多线程分块计算）
+                - shade_range (list): numpy 光照归一化使用的强度范围，分块出图时各块共用；
+                  设置后光照强度图的配色固定为 [-1, 1]
+                - shade_halo (bool): numpy 计算光照时四周多读一个网格间距，边界节点也用中心差分，
+                  分块出图时各块接缝处明暗一致，默认 False
+                - cpt_series (list): 三维透视图配色表的高程范围 [最小值, 最大值]，默认按网格自动拉伸
+                - width (float): 地图宽度（cm），默认按绘图方式取 12 或 15
+                - ellipsoid (str): 投影使用的椭球（GMT PROJ_ELLIPSOID），如 'Sphere'，默认 WGS-84
+                - coast_resolution (str): 海岸线精度，'auto'（默认，按区域大小和地图宽度选择）、
+                  'crude'、'low'、'intermediate'、'high' 或 'full'
+                - coast_cache (bool): 栅格输出时是否缓存海陆掩膜，默认 True
+                - view_lod (bool): 三维透视图是否按地图宽度、dpi 和观察角度抽稀高程网格，默认 True
+                - view_quality (float): 抽稀的质量系数，默认 1.0，越大网格越密
+                - max_grid_cells (int): 高程网格点数上限，超出时降级或拒绝
+                - grid_budget_policy (str): 超出网格预算时的处理方式，'downgrade' 或 'refuse'
+                - relief_cache (bool): 是否使用高程瓦片磁盘缓存，默认 True
+                - base_cache (bool): 栅格输出时是否缓存并重放底图图层（高程和海岸线），默认 True；
+                  同一底图第二次出图时才写入缓存，之后命中时重放
+                - render_cache (bool): 是否使用出图结果缓存，默认 True；
+                  也可设置环境变量 QUICK_GMT_NO_RENDER_CACHE=1 跳过
+                - dpi (int): 输出图像 dpi，默认 600
+                - output_dir (str): 输出目录，默认 output
+                - profile (bool): 是否记录各阶段性能数据，也可设置环境变量 QUICK_GMT_PROFILE=1
+                - profile_json (str): 性能数据 JSON 导出路径
+                - profile_trace (str): Chrome trace 导出路径，也可设置环境变量 QUICK_GMT_TRACE
+                - show (bool): 生成后是否显示图像，默认 True
                 - image_name (str): 图片名称
-                - image_format (str): 图片格式
+                - image_format (str | list): 图片格式，可以是列表或逗号分隔的多个格式，如 "png,pdf"
+                - exports (list): 每个格式单独设置 dpi，如 [{"format": "png", "dpi": 300}, {"format": "pdf"}]，
+                  设置后忽略 image_format
+            progress (callable): 进度回调 progress(stage, index, total)
+            cancel_event (threading.Event): 取消标志，在各阶段之间检查
+
+        Returns:
+            dict: 生成结果
+                - output_path (str): 第一个输出图像路径
+                - output_paths (list): 全部输出图像路径
+                - resolution (dict): 实际使用的地形分辨率和网格规模
+                - points (dict): 投点简化统计
+                - polygons (dict): 多边形抽稀统计
+                - coast (dict): 海岸线精度和海陆掩膜缓存状态
+                - profile (dict): 各阶段性能数据，未开启分析时为 None
+                - render_cache (str): 'hit'、'miss' 或 'bypass'
         """
+        with self._gmt_lock:
+            return self._generate(config, progress, cancel_event)
+    
+    def _generate(self, config, progress, cancel_event):
+        """按阶段出图（调用方持有 GMT 锁）"""
+        base_key = None
+        if self._can_replay_base(config):
+            base_key, base_dpi = self._base_layer_key(config)
+        if base_key and self.base_cache.lookup(base_key, ["base.png"]) is not None:
+            # 只改叠加图层时重放缓存的底图，不再重新绘制高程和海岸线
+            base_stages = [("base", "绘制底图", self._process_base_layer)]
+        else:
+            # 未命中时和不缓存时一样直接绘制，不为填充缓存多出一次底图导出
+            base_stages = [
+                ("elevation", "读取高程数据", self._process_elevation),
+                ("coastline", "绘制海岸线", self._process_coastline),
+            ]
+        stages = base_stages + [
+            ("polygons", "绘制多边形", self._process_polygons),
+            ("points", "绘制投点", self._process_points),
+            ("compass", "绘制比例尺和指南针", self._process_compass),
+            ("save", "保存图像", self._save_image),
+        ]
+        self.resolution_info = self.point_stats = self.polygon_stats = self.coast_info = None
+        self._profiler = RenderProfiler(enabled=profiling_enabled(config))
+        
+        # 相同配置已出过图时直接复制缓存结果
+        cache_key = None
+        cache_status = "bypass"
+        if render_cache_enabled(config):
+            cache_key = config_key(config)
+            output_paths = self._output_paths(config)
+            with self._profiler.stage("render_cache.lookup"):
+                hit = self.render_cache.restore(cache_key, output_paths)
+            cache_status = "hit" if hit else "miss"
+            if hit:
+                if progress:
+                    progress("完成", len(stages), len(stages))
+                return self._result(config, output_paths, cache_status)
+        
         self.fig = pygmt.Figure()  # 每次都新建
-        self._process_elevation(config)
-        self._process_coastline(config)
-        self._process_polygons(config)
-        self._process_points(config)
-        self._process_compass(config)
+        self._cancel_event = cancel_event
+        # 椭球参数参与配置哈希，球体（如 Web Mercator 切片）与椭球的结果分别缓存
+        ellipsoid = (
+            pygmt.config(PROJ_ELLIPSOID=config["ellipsoid"]) if config.get("ellipsoid") else contextlib.nullcontext()
+        )
+        try:
+            with ellipsoid, self._profiler.stage("generate"):
+                for index, (name, stage, process) in enumerate(stages):
+                    self._report_stage(progress, stage, index, len(stages))
+                    with self._profiler.stage(name):
+                        # 最后一个阶段（保存图像）返回全部输出路径
+                        output_paths = process(config)
+                # 同一底图第二次未命中时才单独导出底图，只出现一次的底图不占用出图时间和缓存
+                if base_key and base_stages[0][0] != "base" and self.base_cache.mark(base_key):
+                    self._store_base_layer(config, base_key, base_dpi)
+        finally:
+            self._cancel_event = None
+        if progress:
+            progress("完成", len(stages), len(stages))
+        
+        if cache_key:
+            self.render_cache.store(cache_key, output_paths)
         
         # 显示图像
-        self.fig.show()
+        if config.get("show", True):
+            self.fig.show()
+        return self._result(config, output_paths, cache_status)
+    
+    def _result(self, config, output_paths, cache_status):
+        """整理生成结果并导出性能数据"""
+        result = {
+            "output_path": output_paths[0],
+            "output_paths": output_paths,
+            "resolution": self.resolution_info,
+            "points": self.point_stats,
+            "polygons": self.polygon_stats,
+            "coast": self.coast_info,
+            "profile": None,
+            "render_cache": cache_status,
+        }
+        if self._profiler.enabled:
+            result["profile"] = self._profiler.to_dict()
+            if config.get("profile_json"):
+                self._profiler.write_json(config["profile_json"])
+            trace_path = config.get("profile_trace") or os.environ.get(TRACE_ENV)
+            if trace_path:
+                self._profiler.write_chrome_trace(trace_path)
+        return result
+    
+    def prefetch(self, config, cancel_event=None):
+        """
+        预先读取出图需要的高程网格（开启光照时同时计算光照）并放入内存缓存，
+        之后相同区域和分辨率的 generate 不再等待读取
+        
+        Args:
+            config (dict): 与 generate 相同的配置
+            cancel_event (threading.Event): 取消标志，配置变化后由界面置位
+        
+        Returns:
+            dict: 预取的分辨率和网格规模，不需要高程数据时返回 None
+        """
+        if not config.get("elevation"):
+            return None
+        with self._gmt_lock:
+            self._cancel_event = cancel_event
+            try:
+                check_cancelled(cancel_event)
+                info = resolve_resolution(
+                    config, self._map_width(config), self._max_dpi(config), uses_mercator(config)
+                )
+                grid_key, grid, shade_region = self._load_elevation(config, info["resolution"])
+                if config.get("topography"):
+                    check_cancelled(cancel_event)
+                    self._compute_gradient(
+                        grid_key, grid, radiance=RADIANCE, engine=config.get("gradient_engine", "grdgradient"),
+                        value_range=config.get("shade_range"), region=shade_region
+                    )
+            finally:
+                self._cancel_event = None
+        return {**info, "source": self.relief_source}
+    
+    def preview(self, config, progress=None, cancel_event=None):
+        """
+        快速生成草图：按低 dpi 自动选择较粗的地形分辨率，输出到临时 PNG
+        
+        Args:
+            config (dict): 与 generate 相同的配置
+            progress (callable): 进度回调
+            cancel_event (threading.Event): 取消标志
         
-        # 保存图像
-        self._save_image(config)
+        Returns:
+            dict: 生成结果，output_path 为临时预览图路径
+        """
+        preview_config = {
+            **config,
+            "resolution": AUTO_RESOLUTION,
+            "dpi": PREVIEW_DPI,
+            "image_name": config.get("image_name") or "preview",
+            "image_format": "png",
+            "output_dir": PREVIEW_DIR,
+            "show": False,
+        }
+        return self.generate(preview_config, progress=progress, cancel_event=cancel_event)
+    
+    def _report_stage(self, progress, stage, index, total):
+        """进入新阶段前检查取消标志并报告进度"""
+        check_cancelled(self._cancel_event)
+        if progress:
+            progress(stage, index, total)
     
     def _process_elevation(self, config):
         """处理高程数据"""
         cmap = config.get("cmap", "gray")
-        resolution = config.get("resolution", "05m")
         if config["elevation"]:
-            grid = pygmt.datasets.load_earth_relief(
-                resolution=resolution,
-                region=config["region"]
+            width = self._map_width(config)
+            # 加载前先估算网格规模，按预算确定实际分辨率
+            self.resolution_info = resolve_resolution(
+                config, width, self._max_dpi(config), uses_mercator(config)
             )
+            resolution = self.resolution_info["resolution"]
+            with self._profiler.stage("elevation.load") as details:
+                grid_key, grid, shade_region = self._load_elevation(config, resolution)
+                details.update(grid_details(grid), resolution=resolution, source=self.relief_source)
+            self.resolution_info = {**self.resolution_info, "source": self.relief_source}
             
             if config["topography"]:
-                grid = pygmt.grdgradient(grid=grid, radiance=[270, 30])
-                pygmt.makecpt(cmap=cmap)
-                self.fig.grdimage(
-                    grid=grid,
-                    projection="M12c",
-                    frame=["xa", "ya", f"+t{config['image_name']}"],
-                    cmap=cmap,
-                )
+                with self._profiler.stage("elevation.gradient") as details:
+                    engine = config.get("gradient_engine", "grdgradient")
+                    grid = self._compute_gradient(
+                        grid_key, grid, radiance=RADIANCE, engine=engine, value_range=config.get("shade_range"),
+                        region=shade_region
+                    )
+                    details.update(grid_details(grid), engine=engine)
+                with self._profiler.stage("elevation.grdimage"):
+                    # 这里绘制的是光照强度而不是高程；按统一的 shade_range 归一化后强度位于 [-1, 1]，
+                    # 固定配色范围使分块出图和动画各帧明暗一致
+                    fixed = bool(config.get("shade_range"))
+                    if fixed:
+                        pygmt.makecpt(cmap=cmap, series=[-1, 1])
+                    else:
+                        pygmt.makecpt(cmap=cmap)
+                    self.fig.grdimage(
+                        grid=grid,
+                        projection=self._projection(config),
+                        frame=self._frame(config, ["xa", "ya"]),
+                        cmap=True if fixed else cmap,
+                    )
             else:
-                self.fig.grdview(
-                    grid=grid,
-                    perspective=[180, 90],
-                    cmap=cmap,
+                with self._profiler.stage("elevation.lod") as details:
+                    grid = self._view_grid(grid_key, grid, config)
+                    details.update(grid_details(grid), factors=self.resolution_info["view_factors"])
+                with self._profiler.stage("elevation.grdview"):
+                    if config.get("cpt_series"):
+                        pygmt.makecpt(cmap=cmap, series=list(config["cpt_series"]))
+                    self.fig.grdview(
+                        grid=grid,
+                        # 抽稀后的网格可能略小于区域，图框仍按配置的区域绘制
+                        region=config["region"],
+                        perspective=list(PERSPECTIVE),
+                        cmap=True if config.get("cpt_series") else cmap,
 
-                    projection="J15c",
-                    zsize="1.5c",
-                    surftype="s",
-                    plane="1000+ggrey",
-                    frame=["xaf", "yaf",f"+t{config['image_name']}"]
-                )
+                        projection=self._projection(config),
+                        zsize="1.5c",
+                        surftype="s",
+                        plane="1000+ggrey",
+                        frame=self._frame(config, ["xaf", "yaf"])
+                    )
         else:
             self.fig.basemap(
                 region=config["region"],
-                projection="M15c",
-                frame=["xa1", "ya1","a", f"+t{config['image_name']}"]
+                projection=self._projection(config),
+                frame=self._frame(config, ["xa1", "ya1", "a"])
+            )
+    
+    def _projection(self, config):
+        """当前配置下的投影"""
+        if not uses_mercator(config):
+            return f"J{self._map_width(config)}c"
+        return f"M{self._map_width(config)}c"
+    
+    def _frame(self, config, axes):
+        """图框设置，绘制底图图层时（frame=False）不画图框"""
+        if config.get("frame") is False:
+            return None
+        return axes + [f"+t{config['image_name']}"]
+    
+    def _can_replay_base(self, config):
+        """
+        是否可以重放缓存的底图：只有高程铺满整个地图区域时裁剪后的底图才能精确对齐，
+        且矢量格式输出需要保留矢量底图，因此只对栅格输出启用
+        """
+        return config.get("base_cache", True) and config["elevation"] and self._raster_output(config)
+    
+    def _raster_output(self, config):
+        """全部输出格式是否都是栅格格式"""
+        return all(image_format in RASTER_FORMATS for image_format, _, _ in self._export_targets(config))
+    
+    def _base_layer_key(self, config):
+        """底图图层的缓存键，只包含影响高程和海岸线绘制的配置"""
+        base_keys = (
+            "elevation", "topography", "coast_line", "region", "resolution", "relief_grid", "cmap",
+            "max_grid_cells", "grid_budget_policy", "gradient_engine", "shade_range", "shade_halo", "cpt_series",
+            "width", "view_lod", "view_quality", "coast_resolution", "coast_cache", "ellipsoid",
+        )
+        base_config = {key: config.get(key) for key in base_keys}
+        base_config["dpi"] = self._max_dpi(config)
+        return config_key(base_config), base_config["dpi"]
+    
+    def _store_base_layer(self, config, key, dpi):
+        """把不带图框的高程和海岸线单独导出为裁剪后的 PNG 并缓存"""
+        with self._profiler.stage("base.render"):
+            main_fig = self.fig
+            self.fig = pygmt.Figure()
+            try:
+                base_config = {**config, "frame": False}
+                self._process_elevation(base_config)
+                self._process_coastline(base_config)
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    base_path = os.path.join(tmpdir, "base.png")
+                    self.fig.savefig(base_path, dpi=dpi, crop=True)
+                    self.base_cache.store(key, [base_path])
+            finally:
+                self.fig = main_fig
+    
+    def _process_base_layer(self, config):
+        """
+        绘制底图图层：用 fig.image 把缓存的底图按地图左下角和宽度贴回，再画图框；
+        缓存在查找之后被其他进程淘汰时直接绘制高程和海岸线
+        """
+        key, _ = self._base_layer_key(config)
+        artifacts = self.base_cache.lookup(key, ["base.png"])
+        if artifacts is None:
+            self._process_elevation(config)
+            self._process_coastline(config)
+            return
+        
+        with self._profiler.stage("base.replay"):
+            region = config["region"]
+            projection = self._projection(config)
+            self.fig.basemap(region=region, projection=projection, frame="+n")
+            self.fig.image(
+                imagefile=artifacts[0],
+                position=f"g{region[0]}/{region[2]}+w{self._map_width(config)}c+jBL",
+            )
+            frame = ["xa", "ya"] if config["topography"] else ["xaf", "yaf"]
+            self.fig.basemap(frame=self._frame(config, frame))
+            if config["coast_line"]:
+                self.fig.basemap(frame=self._frame(config, ["xa1", "ya1"]))
+    
+    def _map_width(self, config):
+        """当前配置下地图的宽度（cm）"""
+        if config.get("width"):
+            return config["width"]
+        if config["elevation"] and config["topography"]:
+            return IMAGE_PROJECTION_WIDTH
+        return VIEW_PROJECTION_WIDTH
+    
+    def _grid_key(self, config, resolution):
+        """高程网格在内存缓存中的键"""
+        return ("grid", tuple(config["region"]), resolution, config.get("relief_grid"))
+    
+    def _load_elevation(self, config, resolution):
+        """
+        读取出图使用的高程网格；设置 shade_halo 且用 numpy 计算光照时按 halo_region 多读一圈节点
+
+        Returns:
+            tuple: (网格缓存键, 高程网格, 光照结果的裁剪区域，不需要裁剪时为 None)
+        """
+        shade_region = None
+        if config["topography"] and config.get("shade_halo") and config.get("gradient_engine") == "numpy":
+            shade_region = config["region"]
+            config = {**config, "region": halo_region(shade_region, RESOLUTION_SECONDS[resolution] / 3600)}
+        grid_key = self._grid_key(config, resolution)
+        return grid_key, self._load_relief(grid_key, resolution, config), shade_region
+    
+    def _load_relief(self, grid_key, resolution, config):
+        """
+        读取高程数据，依次查找内存缓存和瓦片缓存，数据来源记录在 self.relief_source：
+        'memory'、'local'、'remote'，或瓦片缓存的来源统计（含使用的概览层）
+        """
+        grid = self.memory_cache.get(grid_key)
+        self.relief_source = "memory"
+        if grid is None:
+            if config.get("relief_grid"):
+                grid = self._load_local_relief(config["relief_grid"], config["region"])
+                self.relief_source = "local"
+            elif config.get("relief_cache", True):
+                grid = self.relief_cache.load(resolution, config["region"], self._cancel_event)
+                self.relief_source = dict(self.relief_cache.last_load)
+            else:
+                self.relief_source = "remote"
+                grid = pygmt.datasets.load_earth_relief(
+                    resolution=resolution,
+                    region=config["region"]
+                )
+            self.memory_cache.put(grid_key, grid)
+        return grid
+    
+    def _load_local_relief(self, path, region):
+        """读取本地高程网格中与区域相交的部分，多个进程可同时只读打开同一文件"""
+        with xr.open_dataarray(path) as full:
+            # 自行保存的网格在 node_offset 属性中记录配准方式
+            registration = int(full.attrs["node_offset"]) if "node_offset" in full.attrs else full.gmt.registration
+            lat_ascending = full.lat.values[0] <= full.lat.values[-1]
+            lat_slice = slice(region[2], region[3]) if lat_ascending else slice(region[3], region[2])
+            grid = full.sel(lon=slice(region[0], region[1]), lat=lat_slice).load()
+        grid.gmt.registration = registration
+        grid.gmt.gtype = 1  # 地理坐标
+        return grid
+    
+    def _compute_gradient(self, grid_key, grid, radiance, engine="grdgradient", value_range=None, region=None):
+        """
+        计算光照梯度网格，按 (网格, 光照参数, 计算方式, 归一化范围, 裁剪区域) 缓存；
+        region 只用于 numpy 计算方式，计算后裁掉 grid 四周的重叠区
+        """
+        value_range = tuple(value_range) if value_range else None
+        region = tuple(region) if region else None
+        gradient_key = ("gradient", grid_key, tuple(radiance), engine, value_range, region)
+        gradient = self.memory_cache.get(gradient_key)
+        if gradient is None:
+            if engine == "numpy":
+                gradient = hillshade(grid, radiance=radiance, value_range=value_range, region=region)
+            elif engine == "grdgradient":
+                gradient = pygmt.grdgradient(grid=grid, radiance=list(radiance))
+            else:
+                raise ValueError(f"不支持的光照计算方式：{engine}")
+            self.memory_cache.put(gradient_key, gradient)
+        return gradient
+    
+    def _view_grid(self, grid_key, grid, config):
+        """三维透视图使用的网格：按地图宽度、最大输出 dpi 和观察高度角块平均抽稀，按 (网格, 倍数) 缓存"""
+        factors = (1, 1)
+        if config.get("view_lod", True):
+            dpi = self._max_dpi(config)
+            factors = view_factors(
+                grid.shape, self._map_width(config), dpi, elevation=PERSPECTIVE[1],
+                quality=config.get("view_quality", VIEW_QUALITY), registration=int(grid.gmt.registration)
             )
+        self.resolution_info = {**self.resolution_info, "view_factors": list(factors), "view_cells": None}
+        lod_key = ("lod", grid_key, factors)
+        view_grid = self.memory_cache.get(lod_key)
+        if view_grid is None:
+            view_grid = decimate(grid, factors)
+            if view_grid is not grid:
+                self.memory_cache.put(lod_key, view_grid)
+        self.resolution_info["view_cells"] = int(view_grid.size)
+        return view_grid
+    
+    def clear_cache(self):
+        """清空内存中的高程网格和梯度网格缓存"""
+        self.memory_cache.clear()
     
     def _process_coastline(self, config):
-        """处理海岸线"""
+        """
+        处理海岸线：按地图比例选择海岸线精度；栅格输出时用缓存的海陆掩膜绘制水域，
+        矢量输出时仍用 coast 绘制以保持矢量边界
+        """
         if config["coast_line"]:
-            self.fig.coast(
-                water="lightblue@80",
+            width = self._map_width(config)
+            resolution = config.get("coast_resolution", AUTO_RESOLUTION)
+            if resolution == AUTO_RESOLUTION:
+                resolution = coast_resolution(config["region"], width)
+            self.coast_info = {"resolution": resolution, "mask": None}
 
-                frame=["xa1", "ya1", f"+t{config['image_name']}"]
-            )
+            if config.get("coast_cache", True) and self._raster_output(config):
+                with self._profiler.stage("coastline.mask") as details:
+                    dpi = self._max_dpi(config)
+                    shape = mask_shape(
+                        config["region"], width, dpi, mercator=self._projection(config).startswith("M")
+                    )
+                    mask_key = ("coast", tuple(config["region"]), resolution, shape)
+                    mask = self.memory_cache.get(mask_key)
+                    if mask is None:
+                        hits = self.coast_cache.stats["hits"]
+                        mask = self.coast_cache.load(config["region"], resolution, shape)
+                        self.memory_cache.put(mask_key, mask)
+                        status = "hit" if self.coast_cache.stats["hits"] > hits else "miss"
+                    else:
+                        status = "memory"
+                    self.coast_info["mask"] = status
+                    details.update(grid_details(mask), resolution=resolution, cache=status)
+                self.fig.grdimage(
+                    grid=mask,
+                    cmap=self.coast_cache.cpt_path,
+                    nan_transparent=True,
+                    transparency=COAST_WATER_TRANSPARENCY,
+                    frame=self._frame(config, ["xa1", "ya1"])
+                )
+            else:
+                self.fig.coast(
+                    water="lightblue@80",
+                    resolution=resolution,
+                    frame=self._frame(config, ["xa1", "ya1"])
+                )
     
     def _process_polygons(self, config):
-        """处理多边形投图"""
+        """处理多边形投图，支持从 GeoJSON / GMT 多段文件读取并按输出 dpi 抽稀"""
         if config["plot_polygons"]:
             polygon_config = config.get("polygon_config") or {}
-            points = polygon_config.get("points", [])
-            if points:
-                x = np.array([p["x"] for p in points])
-                y = np.array([p["y"] for p in points])
-                pen = f"{polygon_config.get('pen_width', '2p')},{polygon_config.get('pen_color', 'black')}"
-                self.fig.plot(
-                    x=x,
-                    y=y,
-                    pen=pen,
-                    close=polygon_config.get("close", True)
+            layer = load_polygons(polygon_config)
+            if layer["x"].size:
+                vertices = layer["x"].size
+                tolerance = pixel_tolerance(
+                    config["region"], self._map_width(config), self._max_dpi(config),
+                    polygon_config.get("simplify_pixels", 1.0)
                 )
+                layer = simplify_polygons(layer, tolerance)
+                self.polygon_stats = {
+                    "segments": layer["offsets"].size - 1,
+                    "input_vertices": vertices,
+                    "output_vertices": layer["x"].size,
+                    "tolerance": tolerance,
+                }
+                plot_polygons(self.fig, layer, polygon_config)
     
     def _process_points(self, config):
-        """处理投点"""
+        """处理投点，支持从 CSV/Parquet 文件批量读取并按列映射样式"""
         if config["plot_points"]:
             point_config = config.get("point_config") or {}
             if point_config:
-                self.fig.plot(
-                    x=point_config.get("x", 120.4033),
-                    y=point_config.get("y", -21.3068),
-                    style=point_config.get("style", "c0.1c"),
-                    fill=point_config.get("fill", "red"),
-                    pen=f"{point_config.get('pen_width', '1p')},{point_config.get('pen_color', 'black')}",
-                    transparency=point_config.get("transparency", 30)
+                layer = load_points(point_config)
+                layer, point_config, self.point_stats = reduce_points(
+                    layer, point_config, config["region"],
+                    self._map_width(config), self._max_dpi(config), uses_mercator(config)
                 )
+                plot_points(self.fig, layer, point_config)
     
     def _process_compass(self, config):
         """处理比例尺和指南针"""
@@ -139,14 +599,56 @@ class MapGenerator:
                 compass=compass_config.get("compass")
             )
     
+    def _export_targets(self, config):
+        """整理输出格式和对应的 dpi"""
+        exports = config.get("exports")
+        if not exports:
+            formats = config["image_format"]
+            if isinstance(formats, str):
+                formats = formats.split(",")
+            exports = [{"format": image_format} for image_format in formats]
+        
+        targets = []
+        for export in exports:
+            image_format = export["format"].strip().lower()
+            dpi = export.get("dpi", config.get("dpi", OUTPUT_DPI))
+            # 同一格式出现多次时在文件名中加上 dpi 以免互相覆盖
+            repeated = sum(e["format"].strip().lower() == image_format for e in exports) > 1
+            suffix = f"_{dpi}dpi" if repeated else ""
+            targets.append((image_format, dpi, suffix))
+        return targets
+    
+    def _max_dpi(self, config):
+        """全部输出格式中最大的 dpi，网格分辨率、抽稀和投点简化都按它计算"""
+        if not config.get("exports") and "image_format" not in config:  # 如只预取高程时
+            return config.get("dpi", OUTPUT_DPI)
+        return max(dpi for _, dpi, _ in self._export_targets(config))
+    
+    def _output_paths(self, config):
+        """全部输出文件路径"""
+        output_dir = config.get("output_dir", OUTPUT_DIR)
+        return [
+            os.path.join(output_dir, f"{config['image_name']}{suffix}.{image_format}")
+            for image_format, _, suffix in self._export_targets(config)
+        ]
+    
     def _save_image(self, config):
-        """保存图像"""
-        output_dir = "output"
+        """
+        从同一张已绘制好的图件导出全部格式
+        
+        同一个 GMT 会话内的 psconvert 调用不能并发执行，因此各格式依次导出；
+        高程读取、光照计算和绘图只做一次
+        """
+        output_dir = config.get("output_dir", OUTPUT_DIR)
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
-        output_path = os.path.join(output_dir, f"{config['image_name']}.{config['image_format']}")
-        self.fig.savefig(output_path, dpi=600) 
+        output_paths = self._output_paths(config)
+        for (image_format, dpi, _), output_path in zip(self._export_targets(config), output_paths):
+            with self._profiler.stage("save.savefig") as details:
+                self.fig.savefig(output_path, dpi=dpi)
+                details.update(format=image_format, dpi=dpi, output_bytes=os.path.getsize(output_path))
+        return output_paths
 
     def _configure_scale(self):
         dialog = ScaleConfigDialog(self.window, self.scale_config)
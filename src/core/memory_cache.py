@@ -0,0 +1,62 @@
+"""
+内存缓存模块
+在多次 generate 调用之间保留高程网格和光照梯度网格
+"""
+from collections import OrderedDict
+
+from src.utils.constants import MEMORY_CACHE_MAX_BYTES
+
+
+class MemoryCache:
+    """按占用内存大小淘汰的 LRU 缓存"""
+
+    def __init__(self, max_bytes=MEMORY_CACHE_MAX_BYTES):
+        """
+        初始化内存缓存
+
+        Args:
+            max_bytes (int): 缓存对象占用内存的上限（字节）
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        """读取缓存对象，未命中时返回 None"""
+        if key not in self._items:
+            self.stats["misses"] += 1
+            return None
+        self._items.move_to_end(key)
+        self.stats["hits"] += 1
+        return self._items[key][0]
+
+    def put(self, key, value):
+        """写入缓存对象，超过上限时淘汰最久未使用的对象"""
+        size = int(getattr(value, "nbytes", 0))
+        if size > self.max_bytes:
+            return
+        self.pop(key)
+        self._items[key] = (value, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._items.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.stats["evictions"] += 1
+
+    def pop(self, key):
+        """移除单个缓存对象"""
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.current_bytes -= item[1]
+
+    def clear(self):
+        """清空缓存"""
+        self._items.clear()
+        self.current_bytes = 0
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,263 @@
+"""
+投点图层模块
+从 CSV/Parquet 文件或数组读取大批量点位，按列映射大小、颜色和符号，一次性交给 GMT 绘制
+"""
+import os
+
+import numpy as np
+import pygmt
+
+from src.core.resolution import projected_lat, projected_y
+
+# CSV 分块读取的行数，避免一次性解析整个文件占用过多内存
+CSV_CHUNK_ROWS = 1_000_000
+
+
+def _read_columns(path, columns):
+    """按列读取 CSV 或 Parquet 文件，返回 {列名: 连续数组}"""
+    import pandas as pd
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"):
+        frame = pd.read_parquet(path, columns=columns)
+        return {name: np.ascontiguousarray(frame[name].to_numpy()) for name in columns}
+
+    chunks = {name: [] for name in columns}
+    for frame in pd.read_csv(path, usecols=columns, chunksize=CSV_CHUNK_ROWS):
+        for name in columns:
+            chunks[name].append(frame[name].to_numpy())
+    return {name: np.concatenate(parts) if parts else np.empty(0) for name, parts in chunks.items()}
+
+
+def load_points(point_config):
+    """
+    读取投点数据
+
+    Args:
+        point_config (dict): 投点配置
+            - file (str): CSV 或 Parquet 文件路径；未设置时使用 x、y
+            - x, y (float | array): 坐标，可以是单个数值或数组
+            - x_column, y_column (str): 文件中的经纬度列名，默认 'x'、'y'
+            - size_column (str): 映射符号大小（cm）的列
+            - color_column (str): 映射颜色的列，配合 cmap 使用
+            - symbol_column (str): 映射符号代码的列，如 'c'、's'、't'
+            - time_column (str): 时间（或年龄等数值）列，配合 time_range 筛选
+            - time (float | array): 未读取文件时与 x、y 对应的时间
+            - time_range (list): 只保留时间列在 [起点, 终点] 内的点，需要 time_column 或 time
+
+    Returns:
+        dict: 连续的 x、y 数组，以及可选的 size、color、symbol 数组
+    """
+    mapping = {
+        "x": point_config.get("x_column", "x"),
+        "y": point_config.get("y_column", "y"),
+        "size": point_config.get("size_column"),
+        "color": point_config.get("color_column"),
+        "symbol": point_config.get("symbol_column"),
+        "time": point_config.get("time_column"),
+    }
+
+    if point_config.get("file"):
+        columns = [name for name in dict.fromkeys(mapping.values()) if name]
+        data = _read_columns(point_config["file"], columns)
+        layer = {key: data[name] for key, name in mapping.items() if name}
+    else:
+        layer = {
+            "x": point_config.get("x", 120.4033),
+            "y": point_config.get("y", -21.3068),
+        }
+        for key in ("size", "color", "symbol", "time"):
+            if mapping[key] is None and point_config.get(key) is not None:
+                layer[key] = point_config[key]
+
+    for key in ("x", "y", "size", "color", "time"):
+        if key in layer:
+            layer[key] = np.ascontiguousarray(np.atleast_1d(layer[key]), dtype=np.float64)
+    if "symbol" in layer:
+        layer["symbol"] = np.atleast_1d(layer["symbol"]).astype(str)
+
+    if point_config.get("time_range") and "time" not in layer:
+        raise ValueError("设置了 time_range 但没有时间数据，请提供 time_column 或 time")
+    if "time" in layer:
+        time = layer.pop("time")
+        if point_config.get("time_range"):
+            start, end = point_config["time_range"]
+            layer = _select(layer, (time >= start) & (time <= end))
+    return layer
+
+
+def plot_points(fig, layer, point_config):
+    """
+    用一次 fig.plot 调用绘制整个投点图层
+
+    Args:
+        fig (pygmt.Figure): 目标图件
+        layer (dict): load_points 返回的数组
+        point_config (dict): 投点样式配置
+            - style (str): 符号样式，如 'c0.1c'；有 size 列时只取符号代码
+            - fill (str): 统一填充颜色，没有 color 列时使用
+            - cmap (str): color 列使用的配色表
+            - size_scale (float): size 列的缩放系数
+            - color_range (list): color 列的配色范围，默认为数据范围（动画各帧需固定）
+    """
+    style = point_config.get("style", "c0.1c")
+    kwargs = {
+        "x": layer["x"],
+        "y": layer["y"],
+        "pen": f"{point_config.get('pen_width', '1p')},{point_config.get('pen_color', 'black')}",
+        "transparency": point_config.get("transparency", 30),
+    }
+
+    if "size" in layer:
+        kwargs["size"] = layer["size"] * point_config.get("size_scale", 1.0)
+        style = f"{style[0]}c"  # 大小由 size 列给出，单位 cm
+    if "symbol" in layer:
+        # 符号代码和大小都由数据列给出时只保留 -S 开关
+        kwargs["symbol"] = layer["symbol"]
+        style = True if "size" in layer else style[1:]
+    kwargs["style"] = style
+
+    if "color" in layer and layer["color"].size:
+        color = layer["color"]
+        low, high = point_config.get("color_range") or (float(np.nanmin(color)), float(np.nanmax(color)))
+        pygmt.makecpt(
+            cmap=point_config.get("cmap", "viridis"),
+            series=[low, high if high > low else low + 1],
+        )
+        kwargs["fill"] = color
+        kwargs["cmap"] = True
+    else:
+        kwargs["fill"] = point_config.get("fill", "red")
+
+    fig.plot(**kwargs)
+
+
+def _pixel_coordinates(x, y, region, width_cm, dpi, mercator=True):
+    """把经纬度换算成输出图像上的像素坐标（墨卡托或 Miller 圆柱投影）"""
+    min_lon, max_lon, min_lat, _ = region
+    pixels_per_radian = width_cm / 2.54 * dpi / np.radians(max_lon - min_lon)
+    px = np.radians(x - min_lon) * pixels_per_radian
+    py = (projected_y(y, mercator) - projected_y(min_lat, mercator)) * pixels_per_radian
+    return px, py, pixels_per_radian
+
+
+def _select(layer, index):
+    """按索引或布尔掩码筛选图层中的所有数组"""
+    return {key: values[index] for key, values in layer.items()}
+
+
+def _inside(layer, region):
+    """区域内点的掩码"""
+    min_lon, max_lon, min_lat, max_lat = region
+    x, y = layer["x"], layer["y"]
+    return (x >= min_lon) & (x <= max_lon) & (y >= min_lat) & (y <= max_lat)
+
+
+def thin_points(layer, region, width_cm, dpi, pixel_size=1, mercator=True):
+    """
+    屏幕空间去重：每个输出像素（或 pixel_size×pixel_size 像素块）只保留第一个点
+
+    Args:
+        layer (dict): load_points 返回的数组
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        width_cm (float): 地图宽度（cm）
+        dpi (int): 输出 dpi
+        pixel_size (int): 去重的像素块边长
+        mercator (bool): 是否为墨卡托投影，否则为 Miller 圆柱投影
+
+    Returns:
+        dict: 去重后的图层
+    """
+    layer = _select(layer, _inside(layer, region))
+    px, py, _ = _pixel_coordinates(layer["x"], layer["y"], region, width_cm, dpi, mercator)
+    ix = (px // pixel_size).astype(np.int64)
+    iy = (py // pixel_size).astype(np.int64)
+    cell_ids = iy * (int(ix.max(initial=0)) + 1) + ix
+    _, first = np.unique(cell_ids, return_index=True)
+    return _select(layer, np.sort(first))
+
+
+def aggregate_points(layer, region, width_cm, dpi, cell_pixels=8, statistic="count", mercator=True):
+    """
+    网格聚合：统计每个网格内的点数或 color 列均值，返回网格中心点组成的图层
+
+    Args:
+        layer (dict): load_points 返回的数组
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        width_cm (float): 地图宽度（cm）
+        dpi (int): 输出 dpi
+        cell_pixels (int): 网格边长（像素）
+        statistic (str): 'count' 或 'mean'（对 color 列求均值）
+        mercator (bool): 是否为墨卡托投影，否则为 Miller 圆柱投影
+
+    Returns:
+        dict: 网格中心的 x、y，以及作为颜色的统计值 color
+    """
+    layer = _select(layer, _inside(layer, region))
+    px, py, pixels_per_radian = _pixel_coordinates(layer["x"], layer["y"], region, width_cm, dpi, mercator)
+    ix = (px // cell_pixels).astype(np.int64)
+    iy = (py // cell_pixels).astype(np.int64)
+    columns = int(ix.max(initial=0)) + 1
+    cell_ids, inverse, counts = np.unique(iy * columns + ix, return_inverse=True, return_counts=True)
+
+    if statistic == "mean":
+        if "color" not in layer:
+            raise ValueError("按均值聚合需要设置 color_column")
+        values = np.bincount(inverse, weights=layer["color"], minlength=cell_ids.size) / counts
+    else:
+        values = counts.astype(np.float64)
+
+    # 网格中心换算回经纬度
+    center_x = (cell_ids % columns + 0.5) * cell_pixels
+    center_y = (cell_ids // columns + 0.5) * cell_pixels
+    min_lon, _, min_lat, _ = region
+    lon = min_lon + np.degrees(center_x / pixels_per_radian)
+    lat = projected_lat(center_y / pixels_per_radian + projected_y(min_lat, mercator), mercator)
+    return {"x": lon, "y": lat, "color": values}
+
+
+def reduce_points(layer, point_config, region, width_cm, dpi, mercator=True):
+    """
+    按 point_config 中的 reduce 设置对图层做绘图前的简化
+
+    Args:
+        layer (dict): load_points 返回的数组
+        point_config (dict): 投点配置
+            - reduce (str): None、'thin'（屏幕空间去重）或 'aggregate'（网格聚合密度图）
+            - thin_pixels (int): 去重的像素块边长，默认 1
+            - aggregate_pixels (int): 聚合网格边长（像素），默认 8
+            - aggregate_statistic (str): 'count' 或 'mean'
+        region (list): 区域范围
+        width_cm (float): 地图宽度（cm）
+        dpi (int): 输出 dpi
+        mercator (bool): 是否为墨卡托投影，否则为 Miller 圆柱投影
+
+    Returns:
+        tuple: (简化后的图层, 绘图样式配置, 统计信息)
+    """
+    mode = point_config.get("reduce")
+    count = layer["x"].size
+    if mode == "thin":
+        layer = thin_points(layer, region, width_cm, dpi, point_config.get("thin_pixels", 1), mercator)
+    elif mode == "aggregate":
+        cell_pixels = point_config.get("aggregate_pixels", 8)
+        layer = aggregate_points(
+            layer, region, width_cm, dpi, cell_pixels, point_config.get("aggregate_statistic", "count"), mercator
+        )
+        # 密度图：每个网格画一个与网格等大的方块，颜色表示统计值
+        point_config = {
+            **point_config,
+            "style": f"s{cell_pixels / dpi * 2.54:.4f}c",
+            "pen_width": "0p",
+            "cmap": point_config.get("cmap", "hot"),
+        }
+    elif mode:
+        raise ValueError(f"不支持的投点简化方式：{mode}")
+
+    stats = {
+        "mode": mode,
+        "input_points": count,
+        "output_points": layer["x"].size,
+        "reduction_ratio": count / layer["x"].size if layer["x"].size else float("inf"),
+    }
+    return layer, point_config, stats
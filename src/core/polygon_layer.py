@@ -0,0 +1,190 @@
+"""
+多边形图层模块
+从 GeoJSON 或 GMT 多段文本文件读取多边形，按输出 dpi 抽稀顶点，一次性交给 GMT 绘制
+"""
+import json
+import os
+
+import numpy as np
+from pygmt.helpers import GMTTempFile
+
+
+def _pack(segments):
+    """把顶点数组列表打包成连续的 x、y 数组和段起点 offsets"""
+    segments = [np.asarray(segment, dtype=np.float64)[:, :2] for segment in segments if len(segment)]
+    lengths = [len(segment) for segment in segments]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    xy = np.concatenate(segments) if segments else np.empty((0, 2))
+    return {"x": np.ascontiguousarray(xy[:, 0]), "y": np.ascontiguousarray(xy[:, 1]), "offsets": offsets}
+
+
+def _geojson_rings(geometry):
+    """展开 GeoJSON 几何对象中的所有环和折线"""
+    kind = geometry.get("type")
+    coordinates = geometry.get("coordinates", [])
+    if kind == "LineString":
+        return [coordinates]
+    if kind in ("Polygon", "MultiLineString"):
+        return list(coordinates)
+    if kind == "MultiPolygon":
+        return [ring for polygon in coordinates for ring in polygon]
+    if kind == "GeometryCollection":
+        return [ring for child in geometry.get("geometries", []) for ring in _geojson_rings(child)]
+    return []
+
+
+def read_geojson(path):
+    """
+    读取 GeoJSON 文件中的多边形和折线
+
+    Args:
+        path (str): GeoJSON 文件路径
+
+    Returns:
+        dict: 打包后的 x、y、offsets 数组
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    if data.get("type") == "FeatureCollection":
+        geometries = [feature.get("geometry") or {} for feature in data.get("features", [])]
+    elif data.get("type") == "Feature":
+        geometries = [data.get("geometry") or {}]
+    else:
+        geometries = [data]
+    return _pack([ring for geometry in geometries for ring in _geojson_rings(geometry)])
+
+
+def read_gmt_multisegment(path):
+    """
+    读取 GMT 多段文本文件，以 '>' 开头的行为段头，'#' 开头的行为注释
+
+    Args:
+        path (str): 文件路径
+
+    Returns:
+        dict: 打包后的 x、y、offsets 数组
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = [line for line in f.read().splitlines() if line.strip() and not line.lstrip().startswith("#")]
+
+    is_header = np.array([line.startswith(">") for line in lines], dtype=bool)
+    data_lines = [line for line, header in zip(lines, is_header) if not header]
+    xy = np.loadtxt(data_lines, usecols=(0, 1), ndmin=2) if data_lines else np.empty((0, 2))
+
+    # 每个段头之前的数据行数即为下一段的起点
+    starts = np.cumsum(~is_header)[is_header]
+    offsets = np.unique(np.concatenate([[0], starts, [len(xy)]])).astype(np.int64)
+    return {"x": np.ascontiguousarray(xy[:, 0]), "y": np.ascontiguousarray(xy[:, 1]), "offsets": offsets}
+
+
+def load_polygons(polygon_config):
+    """
+    读取多边形图层
+
+    Args:
+        polygon_config (dict): 多边形配置
+            - file (str): GeoJSON（.geojson/.json）或 GMT 多段文本文件路径
+            - points (list): 未设置 file 时使用的 {"x", "y"} 顶点列表
+
+    Returns:
+        dict: 打包后的 x、y、offsets 数组
+    """
+    path = polygon_config.get("file")
+    if path:
+        if os.path.splitext(path)[1].lower() in (".geojson", ".json"):
+            return read_geojson(path)
+        return read_gmt_multisegment(path)
+
+    points = polygon_config.get("points", [])
+    return _pack([[(p["x"], p["y"]) for p in points]])
+
+
+def _douglas_peucker(x, y, tolerance):
+    """单段 Douglas–Peucker 抽稀，返回保留顶点的布尔掩码"""
+    keep = np.zeros(x.size, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, x.size - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distance = np.hypot(px, py)
+        else:
+            distance = np.abs(px * dy - py * dx) / length
+        index = int(np.argmax(distance))
+        if distance[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def simplify_polygons(layer, tolerance):
+    """
+    对每一段做 Douglas–Peucker 抽稀
+
+    Args:
+        layer (dict): 打包后的 x、y、offsets 数组
+        tolerance (float): 容差（度）
+
+    Returns:
+        dict: 抽稀后的图层
+    """
+    if tolerance <= 0:
+        return layer
+    keep = np.zeros(layer["x"].size, dtype=bool)
+    offsets = layer["offsets"]
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        keep[start:end] = _douglas_peucker(layer["x"][start:end], layer["y"][start:end], tolerance)
+    kept_per_segment = np.add.reduceat(keep.astype(np.int64), offsets[:-1]) if offsets.size > 1 else []
+    return {
+        "x": layer["x"][keep],
+        "y": layer["y"][keep],
+        "offsets": np.concatenate([[0], np.cumsum(kept_per_segment)]).astype(np.int64),
+    }
+
+
+def pixel_tolerance(region, width_cm, dpi, pixels=1.0):
+    """
+    按输出 dpi 和地图比例尺计算抽稀容差：一个输出像素对应的经度跨度
+
+    Args:
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        width_cm (float): 地图宽度（cm）
+        dpi (int): 输出 dpi
+        pixels (float): 容差对应的像素数
+
+    Returns:
+        float: 容差（度）
+    """
+    return (region[1] - region[0]) / (width_cm / 2.54 * dpi) * pixels
+
+
+def plot_polygons(fig, layer, polygon_config):
+    """
+    把全部段写入一个 GMT 多段文件，用一次 fig.plot 调用绘制
+
+    Args:
+        fig (pygmt.Figure): 目标图件
+        layer (dict): 打包后的 x、y、offsets 数组
+        polygon_config (dict): 样式配置 pen_width、pen_color、close、fill
+    """
+    pen = f"{polygon_config.get('pen_width', '2p')},{polygon_config.get('pen_color', 'black')}"
+    xy = np.column_stack([layer["x"], layer["y"]])
+    offsets = layer["offsets"]
+    kwargs = {"pen": pen, "close": polygon_config.get("close", True)}
+    if polygon_config.get("fill"):
+        kwargs["fill"] = polygon_config["fill"]
+
+    with GMTTempFile(suffix=".txt") as tmpfile:
+        with open(tmpfile.name, "w", encoding="utf-8") as f:
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                f.write(">\n")
+                np.savetxt(f, xy[start:end], fmt="%.8f")
+        fig.plot(data=tmpfile.name, **kwargs)
@@ -0,0 +1,135 @@
+"""
+性能分析模块
+记录地图生成各阶段的耗时、网格规模、峰值内存增量和输出文件大小，
+可导出为 JSON 或 Chrome trace（chrome://tracing、Perfetto 可直接打开）
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# 设置该环境变量为 1 即可开启分析；QUICK_GMT_TRACE 指定 Chrome trace 输出路径
+PROFILE_ENV = "QUICK_GMT_PROFILE"
+TRACE_ENV = "QUICK_GMT_TRACE"
+
+
+def peak_rss():
+    """
+    当前进程的峰值常驻内存（字节），无法获取时返回 None
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 下单位为 KB，macOS 下为字节
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss():
+    """
+    当前进程的常驻内存（字节），无法获取时返回峰值常驻内存
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return peak_rss()
+    return psutil.Process().memory_info().rss
+
+
+def profiling_enabled(config):
+    """配置或环境变量是否开启了性能分析"""
+    return bool(config.get("profile")) or os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+class RenderProfiler:
+    """按阶段记录性能数据，关闭时所有记录操作都是空操作"""
+
+    def __init__(self, enabled=True):
+        """
+        初始化分析器
+
+        Args:
+            enabled (bool): 是否记录
+        """
+        self.enabled = enabled
+        self.stages = []
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        记录一个阶段，返回的字典可用于补充网格规模等细节
+
+        Args:
+            name (str): 阶段名称，如 'elevation.gradient'
+        """
+        details = {}
+        if not self.enabled:
+            yield details
+            return
+
+        rss_before = peak_rss()
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield details
+        finally:
+            self._depth -= 1
+            end = time.perf_counter()
+            rss_after = peak_rss()
+            self.stages.append({
+                "name": name,
+                "depth": self._depth,
+                "start": round(start - self._origin, 6),
+                "wall_time": round(end - start, 6),
+                "peak_rss_delta": rss_after - rss_before if rss_before is not None else None,
+                **details,
+            })
+
+    def to_dict(self):
+        """分析结果（按开始时间排序）"""
+        return {
+            "total_time": round(time.perf_counter() - self._origin, 6),
+            "peak_rss": peak_rss(),
+            "stages": sorted(self.stages, key=lambda stage: stage["start"]),
+        }
+
+    def write_json(self, path):
+        """导出为 JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def write_chrome_trace(self, path):
+        """导出为 Chrome trace 事件格式"""
+        pid = os.getpid()
+        events = [
+            {
+                "name": stage["name"],
+                "ph": "X",
+                "ts": stage["start"] * 1e6,
+                "dur": stage["wall_time"] * 1e6,
+                "pid": pid,
+                "tid": 0,
+                "args": {k: v for k, v in stage.items() if k not in ("name", "start", "wall_time", "depth")},
+            }
+            for stage in self.stages
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def grid_details(grid):
+    """网格尺寸和内存占用，用于补充阶段细节"""
+    return {"grid_shape": list(grid.shape), "grid_bytes": int(grid.nbytes)}
@@ -0,0 +1,19 @@
+"""
+进度与取消模块
+为后台生成任务提供进度回调和取消检查
+"""
+
+
+class GenerationCancelled(Exception):
+    """生成任务被用户取消"""
+
+
+def check_cancelled(cancel_event):
+    """
+    检查取消标志，已取消时抛出 GenerationCancelled
+
+    Args:
+        cancel_event (threading.Event): 取消标志，可以为 None
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise GenerationCancelled("任务已取消")
@@ -0,0 +1,474 @@
+"""
+高程瓦片缓存模块
+将 load_earth_relief 的结果按分辨率和经纬度瓦片保存在磁盘上，瓦片边长随分辨率变化，每块的网格点数大致相同，
+请求区域由已缓存的瓦片拼接而成，只下载缺失的瓦片。
+缺失的粗分辨率瓦片如果能由已缓存的更细分辨率瓦片按整数倍块平均得到（概览层），则不再下载。
+瓦片以 .npy 保存并以内存映射方式读取，只有与请求区域相交的部分会被读入内存
+"""
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pygmt
+import xarray as xr
+
+from src.core.progress import check_cancelled
+from src.core.resolution import relief_tile_size
+from src.utils.constants import RELIEF_CACHE_DIR, RELIEF_CACHE_MAX_BYTES, RESOLUTIONS, RESOLUTION_SECONDS
+
+
+@contextmanager
+def _file_lock(path):
+    """
+    跨进程的排他文件锁，多个进程共用同一缓存目录时串行读写索引
+    """
+    with open(path, "a+b") as f:
+        try:
+            import fcntl
+        except ImportError:  # Windows
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK 重试约 10 秒后仍未获得锁
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _block_weights(factor, registration):
+    """
+    块平均的一维权重和相对节点偏移
+
+    像元配准时粗网格单元恰好覆盖 factor 个细网格单元；
+    网格线配准时窗口以粗节点为中心、宽度为 factor 个细间距，偶数倍时两端节点各占一半权重
+
+    Returns:
+        tuple: (权重数组, 偏移数组)
+    """
+    if registration == 1:
+        return np.ones(factor), np.arange(factor)
+    if factor % 2:
+        half = factor // 2
+        return np.ones(factor), np.arange(-half, half + 1)
+    weights = np.ones(factor + 1)
+    weights[[0, -1]] = 0.5
+    return weights, np.arange(-(factor // 2), factor // 2 + 1)
+
+
+def _reduce_axis(values, starts, weights, offsets, axis):
+    """沿一个轴按权重累加 starts + offsets 处的值，越界节点不计入"""
+    size = values.shape[axis]
+    total = 0.0
+    for weight, offset in zip(weights, offsets):
+        index = starts + offset
+        inside = (index >= 0) & (index < size)
+        taken = np.take(values, np.clip(index, 0, size - 1), axis=axis)
+        mask = inside[:, None] if axis == 0 else inside[None, :]
+        total = total + weight * np.where(mask, taken, 0.0)
+    return total
+
+
+def block_average(grid, factor, coords_lon, coords_lat):
+    """
+    把细网格块平均到粗网格节点上，忽略 NaN
+
+    Args:
+        grid (xarray.DataArray): 纬度、经度均升序的细网格
+        factor (int | tuple): 粗细网格间距之比，也可以分别给出 (经度方向, 纬度方向)
+        coords_lon (numpy.ndarray): 粗网格节点经度
+        coords_lat (numpy.ndarray): 粗网格节点纬度
+
+    Returns:
+        numpy.ndarray: 粗网格高程，维度为 (lat, lon)
+    """
+    registration = int(grid.gmt.registration)
+    x_factor, y_factor = factor if isinstance(factor, tuple) else (factor, factor)
+    lon, lat = grid.lon.values, grid.lat.values
+    x_step = float(lon[1] - lon[0]) if lon.size > 1 else 1.0
+    y_step = float(lat[1] - lat[0]) if lat.size > 1 else x_step
+    x_weights, x_offsets = _block_weights(x_factor, registration)
+    y_weights, y_offsets = _block_weights(y_factor, registration)
+    # 像元配准时从粗单元内第一个细单元开始，网格线配准时从粗节点所在的细节点开始
+    x_shift = (x_factor - 1) / 2 * x_step if registration == 1 else 0.0
+    y_shift = (y_factor - 1) / 2 * y_step if registration == 1 else 0.0
+    x_starts = np.round((coords_lon - x_shift - lon[0]) / x_step).astype(int)
+    y_starts = np.round((coords_lat - y_shift - lat[0]) / y_step).astype(int)
+
+    values = np.asarray(grid.values, dtype=np.float64)
+    valid = np.isfinite(values)
+    sums = np.where(valid, values, 0.0)
+    counts = valid.astype(np.float64)
+    # 权重可分离：先沿经度再沿纬度累加
+    sums = _reduce_axis(_reduce_axis(sums, x_starts, x_weights, x_offsets, 1), y_starts, y_weights, y_offsets, 0)
+    counts = _reduce_axis(_reduce_axis(counts, x_starts, x_weights, x_offsets, 1), y_starts, y_weights, y_offsets, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan).astype(np.float32)
+
+
+class ReliefTileCache:
+    """高程瓦片磁盘缓存，超过容量上限时按最近最少使用（LRU）淘汰"""
+
+    def __init__(self, cache_dir=RELIEF_CACHE_DIR, tile_size=None, max_bytes=RELIEF_CACHE_MAX_BYTES):
+        """
+        初始化瓦片缓存
+
+        Args:
+            cache_dir (str): 缓存目录
+            tile_size (float): 固定的瓦片边长（度），None 表示按分辨率选取（relief_tile_size）
+            max_bytes (int): 缓存占用磁盘的上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.tile_size = tile_size
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock_path = os.path.join(cache_dir, "index.lock")
+        self.index = self._read_index()
+        # 本进程删除的瓦片，合并磁盘上的索引时不再恢复
+        self._removed = set()
+        self.stats = {"hits": 0, "misses": 0, "derived": 0, "bytes_read": 0, "bytes_written": 0, "evictions": 0}
+        # 最近一次 load/prefetch 的瓦片来源：命中、由概览层生成、下载的数量以及概览层的源分辨率
+        self.last_load = None
+
+    def load(self, resolution, region, cancel_event=None):
+        """
+        读取区域高程数据，缺失的瓦片会被下载并写入缓存
+
+        Args:
+            resolution (str): 地形分辨率，如 '05m'
+            region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+            cancel_event (threading.Event): 取消标志，每个瓦片读取前检查
+
+        Returns:
+            xarray.DataArray: 裁剪到 region 的高程网格
+        """
+        keys = []
+        tiles = []
+        self._begin_load(resolution)
+        try:
+            for key, bounds in self._tiles_for_region(resolution, region):
+                check_cancelled(cancel_event)
+                keys.append(key)
+                tiles.append(self._load_tile(key, resolution, bounds))
+        finally:
+            # 中途取消时也要记录已经下载的瓦片
+            self._sync_index(protected=set(keys))
+        return self._assemble(tiles, region)
+
+    def prefetch(self, resolution, region, cancel_event=None):
+        """
+        只确保覆盖区域的瓦片都已缓存，不拼接区域网格
+
+        Args:
+            resolution (str): 地形分辨率
+            region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+            cancel_event (threading.Event): 取消标志，每个瓦片读取前检查
+
+        Returns:
+            list: 覆盖区域的瓦片键
+        """
+        keys = []
+        self._begin_load(resolution)
+        try:
+            for key, bounds in self._tiles_for_region(resolution, region):
+                check_cancelled(cancel_event)
+                keys.append(key)
+                self._load_tile(key, resolution, bounds)
+        finally:
+            self._sync_index(protected=set(keys))
+        return keys
+
+    def report(self):
+        """
+        缓存统计报告
+
+        Returns:
+            dict: 命中、未命中、读写字节数以及当前缓存占用
+        """
+        requests = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "overview_tiles": sum(bool(entry.get("derived_from")) for entry in self.index.values()),
+            "hit_rate": self.stats["hits"] / requests if requests else 0.0,
+            "tiles": len(self.index),
+            "cached_bytes": sum(entry["bytes"] for entry in self.index.values()),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        """删除全部缓存瓦片"""
+        with self._index_lock():
+            self.index = self._merge_index()
+            for key in list(self.index):
+                self._remove(key)
+            self._write_index()
+
+    def _tiles_for_region(self, resolution, region):
+        """计算覆盖区域的瓦片键和瓦片边界"""
+        min_lon, max_lon, min_lat, max_lat = region
+        size = self.tile_size or relief_tile_size(resolution)
+        for j in range(math.floor(min_lat / size), math.ceil(max_lat / size)):
+            south, north = max(j * size, -90), min((j + 1) * size, 90)
+            if south >= north:
+                continue
+            for i in range(math.floor(min_lon / size), math.ceil(max_lon / size)):
+                # 键中包含边长，不同边长划分的瓦片不会混用
+                yield f"{resolution}/{size:g}/{i}_{j}.npy", [i * size, (i + 1) * size, south, north]
+
+    def _begin_load(self, resolution):
+        """重置最近一次读取的瓦片来源统计"""
+        self.last_load = {"resolution": resolution, "cached": 0, "derived": 0, "downloaded": 0, "overview_from": []}
+
+    def _load_tile(self, key, resolution, bounds):
+        """
+        从缓存读取单个瓦片，未命中时优先由更细分辨率的缓存瓦片生成，否则下载并保存
+
+        Returns:
+            tuple: (内存映射的数组, 瓦片索引信息)
+        """
+        path = os.path.join(self.cache_dir, key)
+        entry = self.index.get(key)
+        if entry is None and os.path.exists(path):
+            # 可能是其他进程刚写入的瓦片
+            entry = self._read_index().get(key)
+            if entry:
+                self.index[key] = entry
+        if entry and os.path.exists(path):
+            self.stats["hits"] += 1
+            self.last_load["cached"] += 1
+        else:
+            source, tile = self._derive_tile(resolution, bounds)
+            if tile is None:
+                tile = pygmt.datasets.load_earth_relief(resolution=resolution, region=bounds)
+                self.stats["misses"] += 1
+                self.last_load["downloaded"] += 1
+            else:
+                self.stats["derived"] += 1
+                self.last_load["derived"] += 1
+            entry = self._save_tile(path, tile)
+            if source:
+                entry["derived_from"] = source
+            self.index[key] = entry
+            self.stats["bytes_written"] += entry["bytes"]
+        if entry.get("derived_from") and entry["derived_from"] not in self.last_load["overview_from"]:
+            self.last_load["overview_from"].append(entry["derived_from"])
+        entry["last_access"] = time.time()
+        return np.load(path, mmap_mode="r"), entry
+
+    def _overview_source(self, resolution, bounds):
+        """
+        查找能生成该瓦片的更细分辨率：间距为整数倍、对应瓦片已缓存且不是概览层，
+        优先使用最接近的分辨率，块平均的计算量最小
+
+        Returns:
+            tuple: (源分辨率, 间距倍数)，没有可用的源时返回 (None, None)
+        """
+        seconds = RESOLUTION_SECONDS[resolution]
+        registrations = {entry["registration"] for key, entry in self.index.items() if key.startswith(f"{resolution}/")}
+        for source in RESOLUTIONS[RESOLUTIONS.index(resolution) + 1:]:
+            if seconds % RESOLUTION_SECONDS[source]:
+                continue
+            keys = [key for key, _ in self._tiles_for_region(source, bounds)]
+            entries = [self.index.get(key) for key in keys]
+            if not all(entry and not entry.get("derived_from") for entry in entries):
+                continue
+            if not all(os.path.exists(os.path.join(self.cache_dir, key)) for key in keys):
+                continue
+            # 同一分辨率的瓦片必须配准方式一致才能拼接
+            if registrations and entries[0]["registration"] not in registrations:
+                continue
+            return source, seconds // RESOLUTION_SECONDS[source]
+        return None, None
+
+    def _derive_tile(self, resolution, bounds):
+        """
+        由更细分辨率的缓存瓦片块平均生成粗分辨率瓦片，邻近瓦片已缓存时一并读入作为窗口的重叠区
+
+        Returns:
+            tuple: (源分辨率, xarray.DataArray)，无法生成时返回 (None, None)
+        """
+        source, factor = self._overview_source(resolution, bounds)
+        if source is None:
+            return None, None
+
+        step = RESOLUTION_SECONDS[resolution] / 3600
+        halo = [bounds[0] - step, bounds[1] + step, max(bounds[2] - step, -90), min(bounds[3] + step, 90)]
+        tiles = [
+            self._read_tile(key)
+            for key, _ in self._tiles_for_region(source, halo)
+            if key in self.index and os.path.exists(os.path.join(self.cache_dir, key))
+        ]
+        fine = self._assemble(tiles, halo)
+
+        registration = int(fine.gmt.registration)
+        offset = step / 2 if registration == 1 else 0.0
+        lon = offset + step * np.arange(
+            math.ceil((bounds[0] - offset) / step - 1e-6), math.floor((bounds[1] - offset) / step + 1e-6) + 1
+        )
+        lat = offset + step * np.arange(
+            math.ceil((bounds[2] - offset) / step - 1e-6), math.floor((bounds[3] - offset) / step + 1e-6) + 1
+        )
+        tile = xr.DataArray(
+            block_average(fine, factor, lon, lat),
+            coords={"lat": np.round(lat, 10), "lon": np.round(lon, 10)},
+            dims=("lat", "lon"),
+            name="z",
+        )
+        tile.gmt.registration = registration
+        tile.gmt.gtype = 1
+        return source, tile
+
+    def _read_tile(self, key):
+        """内存映射方式读取已缓存的瓦片"""
+        entry = self.index[key]
+        entry["last_access"] = time.time()
+        return np.load(os.path.join(self.cache_dir, key), mmap_mode="r"), entry
+
+    def _save_tile(self, path, tile):
+        """把瓦片保存为纬度升序的 .npy，坐标以起点、间距和点数记录在索引中"""
+        tile = tile.sortby("lat").sortby("lon")
+        lon, lat = tile.lon.values, tile.lat.values
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再替换，避免并发进程读到写了一半的瓦片
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, np.ascontiguousarray(tile.values))
+        os.replace(tmp_path, path)
+        return {
+            "bytes": os.path.getsize(path),
+            "registration": int(tile.gmt.registration),
+            "lon0": float(lon[0]),
+            "lat0": float(lat[0]),
+            "step": float((lon[-1] - lon[0]) / (lon.size - 1)) if lon.size > 1 else float(lat[1] - lat[0]),
+        }
+
+    def _assemble(self, tiles, region):
+        """
+        按全局网格节点编号把瓦片中与区域相交的部分直接拷贝进一个预先分配的数组，
+        不经过中间拼接，内存中只有最终区域网格这一份拷贝
+        """
+        first = tiles[0][1]
+        step = first["step"]
+        # 网格线配准时节点位于间距的整数倍上，像元配准时位于半格处
+        offset = step / 2 if first["registration"] == 1 else 0.0
+
+        def node_range(low, high):
+            start = math.ceil((low - offset) / step - 1e-6)
+            stop = math.floor((high - offset) / step + 1e-6)
+            return start, stop + 1
+
+        min_lon, max_lon, min_lat, max_lat = region
+        x0, x1 = node_range(min_lon, max_lon)
+        y0, y1 = node_range(min_lat, max_lat)
+        data = np.full((y1 - y0, x1 - x0), np.nan, dtype=np.result_type(tiles[0][0].dtype, np.float32))
+
+        for array, entry in tiles:
+            tx0 = round((entry["lon0"] - offset) / step)
+            ty0 = round((entry["lat0"] - offset) / step)
+            rows, columns = array.shape
+            xs, xe = max(x0, tx0), min(x1, tx0 + columns)
+            ys, ye = max(y0, ty0), min(y1, ty0 + rows)
+            if xs < xe and ys < ye:
+                block = array[ys - ty0:ye - ty0, xs - tx0:xe - tx0]
+                data[ys - y0:ye - y0, xs - x0:xe - x0] = block
+                self.stats["bytes_read"] += block.nbytes
+
+        grid = xr.DataArray(
+            data,
+            coords={
+                "lat": np.round(offset + np.arange(y0, y1) * step, 10),
+                "lon": np.round(offset + np.arange(x0, x1) * step, 10),
+            },
+            dims=("lat", "lon"),
+            name="z",
+        )
+        grid.gmt.registration = first["registration"]
+        grid.gmt.gtype = 1  # 地理坐标
+        return grid
+
+    def _evict(self, protected=()):
+        """超过容量上限时删除最久未使用的瓦片"""
+        total = sum(entry["bytes"] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k].get("last_access", 0)):
+            if total <= self.max_bytes:
+                break
+            if key in protected:
+                continue
+            total -= self.index[key]["bytes"]
+            self._remove(key)
+            self.stats["evictions"] += 1
+
+    def _remove(self, key):
+        """删除单个瓦片文件及其索引"""
+        path = os.path.join(self.cache_dir, key)
+        if os.path.exists(path):
+            os.remove(path)
+        self.index.pop(key, None)
+        self._removed.add(key)
+
+    @contextmanager
+    def _index_lock(self):
+        """持有索引文件锁"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with _file_lock(self.lock_path):
+            yield
+
+    def _sync_index(self, protected=()):
+        """
+        在文件锁内合并其他进程写入的索引、按容量淘汰并写回，
+        保证所有进程写入的瓦片都记录在索引中并计入容量
+        """
+        with self._index_lock():
+            self.index = self._merge_index()
+            self._evict(protected=protected)
+            self._write_index()
+
+    def _merge_index(self):
+        """
+        合并磁盘上的索引和本进程的索引（调用方持有文件锁）：
+        文件已不存在的瓦片（被其他进程淘汰）丢弃，两边都有时保留最近访问时间较晚的记录
+        """
+        disk = self._read_index()
+        merged = {}
+        for key in set(disk) | set(self.index):
+            if not os.path.exists(os.path.join(self.cache_dir, key)):
+                continue
+            if key in self._removed and key not in disk:
+                continue
+            candidates = [entry for entry in (disk.get(key), self.index.get(key)) if entry]
+            if key in self._removed:
+                candidates = [disk[key]]  # 本进程删除后其他进程重新写入的瓦片
+            merged[key] = max(candidates, key=lambda entry: entry.get("last_access", 0))
+        self._removed.clear()
+        return merged
+
+    def _read_index(self):
+        """读取瓦片索引"""
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _write_index(self):
+        """写入瓦片索引（调用方持有文件锁）"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,190 @@
+"""
+出图结果缓存模块
+以规范化配置和 GMT/PyGMT 版本的哈希为键保存输出图像，相同配置再次出图时直接复制结果
+"""
+import functools
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from src.utils.constants import RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES
+
+# 设置该环境变量为 1 时跳过出图结果缓存
+NO_RENDER_CACHE_ENV = "QUICK_GMT_NO_RENDER_CACHE"
+
+# 不影响输出内容的配置项，不参与哈希
+IGNORED_KEYS = ("show", "output_dir", "profile", "profile_json", "profile_trace", "render_cache", "relief_cache")
+
+
+@functools.lru_cache(maxsize=1)
+def library_versions():
+    """PyGMT 和 GMT 的版本号"""
+    import pygmt
+    from pygmt.clib import Session
+
+    with Session() as lib:
+        gmt_version = lib.info["version"]
+    return {"pygmt": pygmt.__version__, "gmt": gmt_version}
+
+
+def _file_fingerprint(path):
+    """引用的数据文件以路径、大小和修改时间参与哈希"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {"path": path}
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _encode(value):
+    """JSON 无法直接序列化的对象（如 NumPy 数组）转换为摘要"""
+    if isinstance(value, np.ndarray):
+        return {"ndarray": hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest(), "dtype": str(value.dtype)}
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+
+def render_cache_enabled(config):
+    """配置或环境变量是否允许使用出图结果缓存"""
+    return config.get("render_cache", True) and os.environ.get(NO_RENDER_CACHE_ENV, "") in ("", "0")
+
+
+def config_key(config):
+    """
+    计算配置的内容哈希
+
+    Args:
+        config (dict): 地图生成配置
+
+    Returns:
+        str: 十六进制 SHA-256
+    """
+    canonical = {key: value for key, value in config.items() if key not in IGNORED_KEYS}
+    for layer in ("point_config", "polygon_config"):
+        layer_config = canonical.get(layer) or {}
+        if layer_config.get("file"):
+            canonical[layer] = {**layer_config, "file": _file_fingerprint(layer_config["file"])}
+    if canonical.get("relief_grid"):
+        canonical["relief_grid"] = _file_fingerprint(canonical["relief_grid"])
+    canonical["_versions"] = library_versions()
+    text = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=_encode)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """出图结果缓存，超过容量上限时按最近最少使用淘汰"""
+
+    def __init__(self, cache_dir=RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_MAX_BYTES):
+        """
+        初始化出图结果缓存
+
+        Args:
+            cache_dir (str): 缓存目录
+            max_bytes (int): 缓存占用磁盘的上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def restore(self, key, output_paths):
+        """
+        命中时把缓存的结果复制到输出路径
+
+        不使用硬链接：之后重新出图覆盖输出文件时会连带改写缓存中的文件
+
+        Args:
+            key (str): 配置哈希
+            output_paths (list): 目标输出路径
+
+        Returns:
+            bool: 是否命中
+        """
+        artifacts = self.lookup(key, [os.path.basename(path) for path in output_paths])
+        if artifacts is None:
+            return False
+
+        for artifact, path in zip(artifacts, output_paths):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            shutil.copy2(artifact, path)
+        return True
+
+    def lookup(self, key, filenames):
+        """
+        查找缓存中的文件
+
+        Args:
+            key (str): 配置哈希
+            filenames (list): 文件名
+
+        Returns:
+            list: 缓存文件路径，未命中时返回 None
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        artifacts = [os.path.join(entry_dir, filename) for filename in filenames]
+        if not all(os.path.exists(artifact) for artifact in artifacts):
+            self.stats["misses"] += 1
+            return None
+        os.utime(entry_dir)  # 记录最近使用时间
+        self.stats["hits"] += 1
+        return artifacts
+
+    def store(self, key, output_paths):
+        """
+        保存新生成的结果并按容量淘汰
+
+        Args:
+            key (str): 配置哈希
+            output_paths (list): 刚生成的输出文件路径
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        os.makedirs(entry_dir, exist_ok=True)
+        for path in output_paths:
+            shutil.copy2(path, os.path.join(entry_dir, os.path.basename(path)))
+        os.utime(entry_dir)
+        self._evict(protected=key)
+
+    def mark(self, key):
+        """
+        记录一次未命中，用于只缓存重复出现的结果
+
+        Args:
+            key (str): 配置哈希
+
+        Returns:
+            bool: 该键之前是否已经记录过
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        seen = os.path.isdir(entry_dir)
+        os.makedirs(entry_dir, exist_ok=True)
+        os.utime(entry_dir)
+        return seen
+
+    def clear(self):
+        """删除全部缓存结果"""
+        if os.path.exists(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
+
+    def _evict(self, protected=None):
+        """超过容量上限时删除最久未使用的结果"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if os.path.isdir(entry_dir):
+                size = sum(
+                    os.path.getsize(os.path.join(entry_dir, filename)) for filename in os.listdir(entry_dir)
+                )
+                entries.append((os.path.getmtime(entry_dir), name, size))
+
+        total = sum(size for _, _, size in entries)
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == protected:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            total -= size
+            self.stats["evictions"] += 1
@@ -0,0 +1,179 @@
+"""
+地形分辨率选择模块
+根据区域范围、地图宽度和输出 dpi 选择合适的 earth relief 分辨率，并估算网格规模
+"""
+import math
+import warnings
+
+import numpy as np
+
+from src.utils.constants import (
+    RESOLUTIONS, RESOLUTION_SECONDS, AUTO_RESOLUTION, MAX_GRID_CELLS, GRID_BUDGET_POLICY,
+    RELIEF_TILE_CELLS, RELIEF_TILE_DEGREES
+)
+
+# 网格以 float32 保存
+BYTES_PER_CELL = 4
+
+
+def relief_tile_size(resolution):
+    """
+    高程瓦片边长（度）：每边网格点数不超过 RELIEF_TILE_CELLS 的最大可选边长
+
+    Args:
+        resolution (str): 地形分辨率，如 '05m'
+
+    Returns:
+        float: 瓦片边长（度）
+    """
+    limit = RELIEF_TILE_CELLS * RESOLUTION_SECONDS[resolution] / 3600
+    for size in RELIEF_TILE_DEGREES:  # 从大到小
+        if size <= limit:
+            return size
+    return RELIEF_TILE_DEGREES[-1]
+
+
+def estimate_grid(region, resolution):
+    """
+    估算区域在指定分辨率下的网格规模，以及读取时需要下载或读入的瓦片规模
+
+    Args:
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        resolution (str): 地形分辨率，如 '05m'
+
+    Returns:
+        dict: 列数、行数、网格点数、内存占用（字节）、瓦片数和瓦片网格点数
+    """
+    min_lon, max_lon, min_lat, max_lat = region
+    step = RESOLUTION_SECONDS[resolution] / 3600
+    columns = int(round((max_lon - min_lon) / step)) + 1
+    rows = int(round((max_lat - min_lat) / step)) + 1
+    cells = columns * rows
+    # 与 ReliefTileCache 的瓦片划分一致，瓦片边长整除 90，纬度方向不会越过两极
+    size = relief_tile_size(resolution)
+    tiles = (
+        (math.ceil(max_lon / size) - math.floor(min_lon / size))
+        * (math.ceil(max_lat / size) - math.floor(min_lat / size))
+    )
+    return {
+        "resolution": resolution,
+        "columns": columns,
+        "rows": rows,
+        "cells": cells,
+        "bytes": cells * BYTES_PER_CELL,
+        "tiles": tiles,
+        "tile_cells": tiles * (int(round(size / step)) + 1) ** 2,
+    }
+
+
+def uses_mercator(config):
+    """
+    配置是否使用墨卡托投影（-JM）：只有不加光照的三维透视图（grdview）使用 Miller 圆柱投影（-JJ），
+    两者南北方向都随纬度拉伸，只是拉伸程度不同
+    """
+    return not (config["elevation"] and not config["topography"])
+
+
+def projected_y(lat, mercator=False):
+    """
+    纬度在圆柱投影图上的纵坐标，单位与经度的弧度相同（图宽对应经度跨度的弧度数）
+
+    墨卡托：ln tan(π/4 + φ/2)，局部拉伸 sec φ；
+    Miller：1.25 ln tan(π/4 + 0.4φ)，局部拉伸 sec 0.8φ，两极处有限
+
+    Args:
+        lat (float | numpy.ndarray): 纬度（度）
+        mercator (bool): 是否为墨卡托投影，否则为 Miller 圆柱投影
+
+    Returns:
+        float | numpy.ndarray: 纵坐标
+    """
+    if mercator:
+        return np.log(np.tan(np.pi / 4 + np.radians(np.clip(lat, -85, 85)) / 2))
+    return 1.25 * np.log(np.tan(np.pi / 4 + 0.4 * np.radians(lat)))
+
+
+def projected_lat(y, mercator=False):
+    """projected_y 的反函数，返回纬度（度）"""
+    if mercator:
+        return np.degrees(2 * np.arctan(np.exp(y)) - np.pi / 2)
+    return np.degrees(2.5 * np.arctan(np.exp(0.8 * y)) - 0.625 * np.pi)
+
+
+def auto_resolution(region, width_cm, dpi, mercator=False):
+    """
+    选择能满足输出像素密度的最粗分辨率
+
+    Args:
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        width_cm (float): 地图宽度（cm）
+        dpi (int): 输出 dpi
+        mercator (bool): 是否为墨卡托投影，否则为 Miller 圆柱投影
+
+    Returns:
+        str: 地形分辨率
+    """
+    min_lon, max_lon, min_lat, max_lat = region
+    pixels = width_cm / 2.54 * dpi
+    # 地图宽度对应经度跨度，每个输出像素对应的经度跨度（秒）
+    pixel_seconds = (max_lon - min_lon) * 3600 / pixels
+    # 一度纬度在图上拉长 sec φ（墨卡托）或 sec 0.8φ（Miller）倍，按区域内纬度绝对值最大处取样
+    max_lat_abs = max(abs(min_lat), abs(max_lat))
+    if mercator:
+        pixel_seconds *= math.cos(math.radians(min(max_lat_abs, 85)))
+    else:
+        pixel_seconds *= math.cos(math.radians(0.8 * max_lat_abs))
+    for resolution in RESOLUTIONS:  # 从粗到细
+        if RESOLUTION_SECONDS[resolution] <= pixel_seconds:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def _budget_cells(estimate):
+    """计入网格预算的网格点数：区域网格和覆盖区域的瓦片取较大者"""
+    return max(estimate["cells"], estimate["tile_cells"])
+
+
+def resolve_resolution(config, width_cm, dpi, mercator=False):
+    """
+    确定实际使用的分辨率，并按网格预算降级或拒绝
+
+    Args:
+        config (dict): 地图生成配置
+            - resolution (str): 地形分辨率或 'auto'
+            - max_grid_cells (int): 网格点数上限，默认 MAX_GRID_CELLS；
+              区域网格和需要读取的瓦片都不能超过该上限
+            - grid_budget_policy (str): 'downgrade' 或 'refuse'
+        width_cm (float): 地图宽度（cm）
+        dpi (int): 输出 dpi
+        mercator (bool): 是否为墨卡托投影，否则为 Miller 圆柱投影
+
+    Returns:
+        dict: estimate_grid 的结果，附加 requested 字段
+    """
+    region = config["region"]
+    requested = config.get("resolution", "05m")
+    resolution = requested
+    if requested == AUTO_RESOLUTION:
+        resolution = auto_resolution(region, width_cm, dpi, mercator)
+
+    max_cells = config.get("max_grid_cells", MAX_GRID_CELLS)
+    estimate = estimate_grid(region, resolution)
+    if _budget_cells(estimate) > max_cells:
+        if config.get("grid_budget_policy", GRID_BUDGET_POLICY) == "refuse":
+            raise ValueError(
+                f"分辨率 {resolution} 下网格点数约 {estimate['cells']:,}"
+                f"（需读取 {estimate['tiles']} 个瓦片共 {estimate['tile_cells']:,} 个网格点），"
+                f"超过上限 {max_cells:,}，请缩小区域或选择更粗的分辨率"
+            )
+        coarser = RESOLUTIONS[:RESOLUTIONS.index(resolution)]
+        for candidate in reversed(coarser):
+            estimate = estimate_grid(region, candidate)
+            if _budget_cells(estimate) <= max_cells:
+                break
+        warnings.warn(
+            f"分辨率 {resolution} 超过网格预算（{max_cells:,} 个网格点），已降为 {estimate['resolution']}"
+        )
+
+    estimate["requested"] = requested
+    return estimate
@@ -0,0 +1,419 @@
+"""
+本地出图服务模块
+以 HTTP/JSON 接口包装常驻出图进程池，接收与界面相同的配置字典：
+内容相同且仍在排队或出图中的请求合并为一次出图（single-flight），
+可以直接返回图像内容或返回任务号稍后查询，/metrics 提供队列深度、延迟分位数和缓存命中率
+"""
+import itertools
+import json
+import math
+import mimetypes
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.core.batch import with_defaults
+from src.core.render_cache import config_key
+from src.core.worker_pool import WorkerPool
+from src.utils.constants import (
+    SERVICE_HOST, SERVICE_PORT, SERVICE_MAX_QUEUE, SERVICE_JOB_HISTORY, SERVICE_LATENCY_WINDOW, SERVICE_OUTPUT_DIR,
+    SERVICE_DATA_DIR, IMAGE_FORMATS, RASTER_FORMATS
+)
+
+# 请求中不允许出现的配置项：会在服务端写入任意路径
+FORBIDDEN_KEYS = ("output_dir", "profile_json", "profile_trace")
+
+
+class ServiceBusy(RuntimeError):
+    """排队的任务已达上限"""
+
+
+class InvalidRequest(ValueError):
+    """请求中的配置不安全或无效"""
+
+
+def _data_path(path, data_dir):
+    """把请求中的文件路径解析到数据目录内，越出数据目录时拒绝"""
+    if not isinstance(path, str) or not path:
+        raise InvalidRequest(f"无效的文件路径：{path!r}")
+    root = os.path.realpath(data_dir)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise InvalidRequest(f"只能引用数据目录 {data_dir} 中的文件：{path}")
+    return resolved
+
+
+def sanitize_config(config, data_dir=SERVICE_DATA_DIR):
+    """
+    检查来自 HTTP 请求的配置：图片名称不能包含路径，输出格式必须是支持的格式，
+    不能指定输出目录和性能数据导出路径，引用的数据文件必须位于数据目录内
+
+    Args:
+        config (dict): 请求中的地图生成配置
+        data_dir (str): 允许引用的数据目录
+
+    Returns:
+        dict: 数据文件路径已解析为数据目录内绝对路径的配置
+
+    Raises:
+        InvalidRequest: 配置不安全或无效
+    """
+    forbidden = [key for key in FORBIDDEN_KEYS if key in config]
+    if forbidden:
+        raise InvalidRequest(f"服务不接受以下配置项：{', '.join(forbidden)}")
+
+    config = dict(config)
+    image_name = config.get("image_name")
+    if image_name is not None:
+        if (not isinstance(image_name, str) or not image_name or image_name.startswith(".")
+                or any(sep in image_name for sep in ("/", "\\", os.sep))):
+            raise InvalidRequest(f"图片名称不能包含路径：{image_name!r}")
+
+    formats = config.get("image_format") or []
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    if not isinstance(formats, list) or not isinstance(config.get("exports") or [], list):
+        raise InvalidRequest("image_format 和 exports 必须是字符串或列表")
+    formats = list(formats) + [export.get("format") if isinstance(export, dict) else export
+                               for export in config.get("exports") or []]
+    allowed = set(IMAGE_FORMATS) | set(RASTER_FORMATS)
+    for image_format in formats:
+        if not isinstance(image_format, str) or image_format.strip().lower() not in allowed:
+            raise InvalidRequest(f"不支持的图片格式：{image_format!r}")
+
+    if config.get("relief_grid"):
+        config["relief_grid"] = _data_path(config["relief_grid"], data_dir)
+    for layer in ("point_config", "polygon_config"):
+        layer_config = config.get(layer)
+        if isinstance(layer_config, dict) and layer_config.get("file"):
+            config[layer] = {**layer_config, "file": _data_path(layer_config["file"], data_dir)}
+    return config
+
+
+def percentile(values, q):
+    """
+    最近秩法计算分位数
+
+    Args:
+        values (list): 数值
+        q (float): 分位，0-100
+
+    Returns:
+        float: 分位数，values 为空时返回 None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    # 秩为 ceil(q/100·n)；先乘后除，避免 0.3 × 10 这类浮点误差把整数秩向上取整多一位
+    rank = max(math.ceil(q * len(ordered) / 100) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def _chain(source, target):
+    """把进程池任务的结果转交给服务的任务"""
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.wall_time = getattr(source, "wall_time", 0.0)
+        target.set_result(source.result())
+
+
+class _Job:
+    """一次实际出图及等待它的全部请求"""
+
+    def __init__(self, job_id, key, future):
+        self.id = job_id
+        self.key = key
+        self.future = future
+        self.created = time.time()
+        self.finished = None
+        self.requests = 1
+
+    def to_dict(self):
+        """任务状态，完成后包含输出路径或错误信息"""
+        entry = {"job": self.id, "key": self.key, "requests": self.requests, "created": self.created}
+        if not self.future.done():
+            entry["status"] = "pending"
+            return entry
+        error = None if self.future.cancelled() else self.future.exception()
+        entry["finished"] = self.finished
+        if self.future.cancelled() or error is not None:
+            entry.update(status="error", error="任务已取消" if self.future.cancelled() else f"{type(error).__name__}: {error}")
+        else:
+            result = self.future.result()
+            entry.update(
+                status="ok",
+                output_paths=result["output_paths"],
+                render_cache=result.get("render_cache"),
+                wall_time=round(getattr(self.future, "wall_time", 0.0), 3),
+            )
+        return entry
+
+
+class RenderService:
+    """出图任务队列：合并相同的进行中请求，限制排队数量并统计指标"""
+
+    def __init__(self, workers=None, timeout=None, max_queue=SERVICE_MAX_QUEUE, output_dir=SERVICE_OUTPUT_DIR,
+                 data_dir=SERVICE_DATA_DIR):
+        """
+        初始化出图服务
+
+        Args:
+            workers (int): 出图进程数，默认为 CPU 核数
+            timeout (float): 单个任务的超时时间（秒）
+            max_queue (int): 排队和正在出图的任务上限
+            output_dir (str): 输出目录，每个配置哈希一个子目录，避免同名图片互相覆盖
+            data_dir (str): 请求可以引用的数据文件目录
+        """
+        self.pool = WorkerPool(workers, timeout=timeout)
+        self.max_queue = max_queue
+        self.output_dir = output_dir
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._jobs = OrderedDict()
+        self._job_ids = itertools.count(1)
+        self._latencies = deque(maxlen=SERVICE_LATENCY_WINDOW)
+        self._started = time.time()
+        self.stats = {"requests": 0, "deduplicated": 0, "rejected": 0, "renders": 0,
+                      "completed": 0, "failed": 0, "cache_hits": 0}
+
+    def start(self):
+        """启动进程池"""
+        self.pool.start()
+        return self
+
+    def shutdown(self):
+        """取消排队的任务并关闭进程池"""
+        self.pool.shutdown(wait=True, cancel_pending=True)
+
+    def submit(self, config):
+        """
+        提交出图请求，与进行中的相同配置合并
+
+        Args:
+            config (dict): 地图生成配置（与界面生成的配置相同，省略的字段使用默认值）
+
+        Returns:
+            tuple: (_Job, 是否与进行中的任务合并)
+
+        Raises:
+            ServiceBusy: 排队的任务已达上限
+            InvalidRequest: 配置不安全或无效
+        """
+        config = with_defaults(sanitize_config(config, self.data_dir))
+        key = config_key(config)
+        config["output_dir"] = os.path.join(self.output_dir, key[:16])
+
+        with self._lock:
+            self.stats["requests"] += 1
+            job = self._inflight.get(key)
+            if job is not None:
+                job.requests += 1
+                self.stats["deduplicated"] += 1
+                return job, True
+            if len(self._inflight) >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise ServiceBusy(f"排队的任务已达上限 {self.max_queue}")
+
+            job = _Job(next(self._job_ids), key, Future())
+            self._inflight[key] = job
+            self._jobs[job.id] = job
+            self.stats["renders"] += 1
+            self._trim_history()
+        job.future.add_done_callback(lambda future: self._finish(job))
+
+        # 进程池在持有自己的锁时执行完成回调，提交时不能持有本服务的锁，否则两把锁可能互相等待
+        try:
+            self.pool.submit(config).add_done_callback(lambda future: _chain(future, job.future))
+        except Exception as e:
+            job.future.set_exception(e)
+        return job, False
+
+    def job(self, job_id):
+        """按任务号查找任务，不存在时返回 None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def metrics(self):
+        """
+        服务指标
+
+        Returns:
+            dict: 请求数、合并数、队列深度（queued）和出图中的任务数（running）、延迟分位数（秒）、出图结果缓存命中率和进程池统计
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+            stats = dict(self.stats)
+            in_flight = len(self._inflight)
+        finished = stats["completed"] + stats["failed"]
+        return {
+            **stats,
+            "uptime": round(time.time() - self._started, 3),
+            "in_flight": in_flight,
+            **self.pool.load(),
+            "max_queue": self.max_queue,
+            "latency": {
+                "count": len(latencies),
+                **{f"p{q}": percentile(latencies, q) for q in (50, 90, 95, 99)},
+                "max": max(latencies) if latencies else None,
+            },
+            "cache_hit_rate": stats["cache_hits"] / stats["completed"] if stats["completed"] else 0.0,
+            "dedup_rate": stats["deduplicated"] / stats["requests"] if stats["requests"] else 0.0,
+            "error_rate": stats["failed"] / finished if finished else 0.0,
+            "pool": dict(self.pool.stats),
+        }
+
+    def _finish(self, job):
+        """任务结束：移出进行中的任务并记录延迟和缓存命中"""
+        job.finished = time.time()
+        failed = job.future.cancelled() or job.future.exception() is not None
+        with self._lock:
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            self._latencies.append(round(job.finished - job.created, 3))
+            if failed:
+                self.stats["failed"] += 1
+            else:
+                self.stats["completed"] += 1
+                if job.future.result().get("render_cache") == "hit":
+                    self.stats["cache_hits"] += 1
+            self._trim_history()
+
+    def _trim_history(self):
+        """只保留最近的已完成任务（调用方持有锁）"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[:max(len(finished) - SERVICE_JOB_HISTORY, 0)]:
+            del self._jobs[job_id]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    HTTP 接口：
+        POST /render[?wait=0]      提交配置；默认等待出图完成并返回图像，wait=0 时立即返回任务号
+        GET  /jobs/<id>            任务状态
+        GET  /jobs/<id>/image[?index=n]  任务的第 n 个输出图像
+        GET  /metrics              服务指标
+        GET  /health               出图进程健康检查
+    """
+
+    service = None
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/render":
+            return self._send_json(404, {"error": "未知路径"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            config = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(config, dict):
+                raise ValueError("请求体必须是配置字典")
+        except ValueError as e:
+            return self._send_json(400, {"error": f"无效的 JSON 配置：{e}"})
+
+        try:
+            job, deduplicated = self.service.submit(config)
+        except ServiceBusy as e:
+            return self._send_json(503, {"error": str(e)}, {"Retry-After": "5"})
+        except InvalidRequest as e:
+            return self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            return self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+        if parse_qs(url.query).get("wait", ["1"])[0] in ("0", "false"):
+            return self._send_json(202, {**job.to_dict(), "deduplicated": deduplicated},
+                                   {"Location": f"/jobs/{job.id}"})
+        wait([job.future])  # 结果和错误由 _send_image 处理
+        self._send_image(job, 0, {"X-Job-Id": str(job.id), "X-Deduplicated": str(deduplicated).lower()})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["metrics"]:
+            return self._send_json(200, self.service.metrics())
+        if parts == ["health"]:
+            return self._send_json(200, {"workers": self.service.pool.health_check()})
+        if len(parts) in (2, 3) and parts[0] == "jobs" and parts[1].isdigit():
+            job = self.service.job(int(parts[1]))
+            if job is None:
+                return self._send_json(404, {"error": "任务不存在或已过期"})
+            if len(parts) == 2:
+                return self._send_json(200, job.to_dict())
+            if parts[2] == "image":
+                if not job.future.done():
+                    return self._send_json(202, job.to_dict(), {"Retry-After": "1"})
+                index = int(parse_qs(url.query).get("index", ["0"])[0])
+                return self._send_image(job, index)
+        self._send_json(404, {"error": "未知路径"})
+
+    def _send_image(self, job, index, headers=None):
+        """以流的方式返回任务的输出图像，失败时返回错误信息"""
+        entry = job.to_dict()
+        if entry["status"] != "ok":
+            return self._send_json(500, entry)
+        if not 0 <= index < len(entry["output_paths"]):
+            return self._send_json(404, {"error": f"任务只有 {len(entry['output_paths'])} 个输出图像"})
+        path = entry["output_paths"][index]
+        try:
+            f = open(path, "rb")
+        except OSError as e:
+            return self._send_json(410, {"error": f"输出图像已被删除：{e}"})
+        with f:
+            self.send_response(200)
+            self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Content-Disposition", f'inline; filename="{os.path.basename(path)}"')
+            self.send_header("X-Render-Cache", str(entry.get("render_cache")))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile)
+
+    def _send_json(self, status, payload, headers=None):
+        """返回 JSON 响应"""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """访问日志输出到标准输出"""
+        print(f"[{self.log_date_time_string()}] {self.address_string()} {format % args}")
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, workers=None, timeout=None, max_queue=SERVICE_MAX_QUEUE,
+          data_dir=SERVICE_DATA_DIR):
+    """
+    启动出图服务，直到 Ctrl+C 退出
+
+    Args:
+        host (str): 监听地址
+        port (int): 监听端口
+        workers (int): 出图进程数
+        timeout (float): 单个任务的超时时间（秒）
+        max_queue (int): 排队和正在出图的任务上限
+        data_dir (str): 请求可以引用的数据文件目录
+    """
+    service = RenderService(workers, timeout=timeout, max_queue=max_queue, data_dir=data_dir).start()
+    handler = type("RenderHandler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"出图服务已启动：http://{host}:{server.server_address[1]}（{service.pool.workers} 个出图进程）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
@@ -0,0 +1,292 @@
+"""
+分块出图模块
+把大区域切分为多个子区域，在多个子进程中并行出图，各块共用同一光照归一化范围，
+再拼接成一张大图或切成标准的 z/x/y PNG 瓦片金字塔
+"""
+import math
+import os
+import time
+
+import numpy as np
+
+from src.core.batch import run_jobs, with_defaults
+from src.core.hillshade import halo_region, intensity_range
+from src.core.relief_cache import ReliefTileCache
+from src.core.resolution import auto_resolution, resolve_resolution, uses_mercator
+from src.utils.constants import (
+    AUTO_RESOLUTION, IMAGE_PROJECTION_WIDTH, OUTPUT_DIR, OUTPUT_DPI, RESOLUTION_SECONDS,
+    XYZ_MAX_LATITUDE, XYZ_TILE_SIZE
+)
+
+
+def _mercator_y(lat):
+    """球面 Mercator 纵坐标（弧度）"""
+    lat = np.clip(lat, -XYZ_MAX_LATITUDE, XYZ_MAX_LATITUDE)
+    return np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+
+
+def split_region(region, rows, columns, step=None):
+    """
+    把区域切分为 rows × columns 个子区域，行号自北向南
+
+    Args:
+        region (list): 区域范围 [min_lon, max_lon, min_lat, max_lat]
+        rows (int): 行数
+        columns (int): 列数
+        step (float): 网格间距（度），给定时分界线对齐到网格节点，相邻块共用边界节点
+
+    Returns:
+        list: (行号, 列号, 子区域) 列表
+    """
+    min_lon, max_lon, min_lat, max_lat = region
+
+    def edges(low, high, count):
+        values = [low + (high - low) * k / count for k in range(count + 1)]
+        if step:
+            values[1:-1] = [round(value / step) * step for value in values[1:-1]]
+        return values
+
+    lons = edges(min_lon, max_lon, columns)
+    lats = edges(max_lat, min_lat, rows)
+    return [
+        (row, column, [lons[column], lons[column + 1], lats[row + 1], lats[row]])
+        for row in range(rows)
+        for column in range(columns)
+    ]
+
+
+def _tile_stats(job):
+    """子进程：统计一个子区域的未归一化光照强度范围，四周多读一圈节点，与出图时的光照计算一致"""
+    config = job["config"]
+    step = RESOLUTION_SECONDS[config["resolution"]] / 3600
+    grid = ReliefTileCache().load(config["resolution"], halo_region(config["region"], step))
+    return {"shade_range": list(intensity_range(grid, radiance=(270, 30), region=config["region"]))}
+
+
+def _render_tile(config):
+    """子进程：按统一的光照范围生成一个子区域的图像"""
+    from src.core.map_generator import MapGenerator
+    return MapGenerator().generate(config)
+
+
+def _tile_configs(config, rows, columns):
+    """为每个子区域生成配置：宽度按经度跨度等比例缩放，保证各块比例尺相同"""
+    region = config["region"]
+    width = config.get("width") or IMAGE_PROJECTION_WIDTH * columns
+    dpi = config.get("dpi", OUTPUT_DPI)
+
+    resolution = config.get("resolution", "05m")
+    if resolution == AUTO_RESOLUTION:
+        resolution = auto_resolution(region, width, dpi, uses_mercator(config))
+    tiles = split_region(region, rows, columns, step=RESOLUTION_SECONDS[resolution] / 3600)
+
+    output_dir = os.path.join(config.get("output_dir", OUTPUT_DIR), f"{config['image_name']}_tiles")
+    configs = []
+    for row, column, tile_region in tiles:
+        tile_width = width * (tile_region[1] - tile_region[0]) / (region[1] - region[0])
+        tile_config = {
+            **config,
+            "region": tile_region,
+            "width": tile_width,
+            "dpi": dpi,
+            "image_name": f"tile_{row}_{column}",
+            "image_format": "png",
+            "exports": None,
+            "output_dir": output_dir,
+            "frame": False,
+            "compass": False,
+            "scale": False,
+            "gradient_engine": "numpy",
+            # 相邻块的光照在接缝处使用相同的邻近节点，拼接后没有明暗断层
+            "shade_halo": True,
+            "relief_cache": True,
+            "base_cache": False,
+            "show": False,
+        }
+        # 网格预算按单个子区域计算
+        tile_config["resolution"] = resolve_resolution(
+            {**tile_config, "resolution": resolution}, tile_width, dpi, uses_mercator(tile_config)
+        )["resolution"]
+        configs.append((row, column, tile_config))
+    return configs
+
+
+def _import_pillow():
+    """Pillow 是可选依赖，只在拼接和切片时需要"""
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise ImportError("拼接和切片需要安装 Pillow：pip install pillow") from e
+    Image.MAX_IMAGE_PIXELS = None  # 拼接结果可能超过 Pillow 默认的像素数上限
+    return Image
+
+
+def stitch_tiles(records, output_path):
+    """
+    按行列号把子区域图像拼接成一张大图
+
+    Args:
+        records (list): (行号, 列号, 图像路径) 列表
+        output_path (str): 拼接结果路径
+
+    Returns:
+        tuple: 拼接结果的宽和高（像素）
+    """
+    Image = _import_pillow()
+    images = {(row, column): Image.open(path) for row, column, path in records}
+    rows = max(row for row, _ in images) + 1
+    columns = max(column for _, column in images) + 1
+    # 各块像素尺寸可能因取整相差一个像素，按实际尺寸累加偏移
+    widths = [images[0, column].width for column in range(columns)]
+    heights = [images[row, 0].height for row in range(rows)]
+
+    mosaic = Image.new("RGBA", (sum(widths), sum(heights)))
+    for (row, column), image in images.items():
+        mosaic.paste(image.convert("RGBA"), (sum(widths[:column]), sum(heights[:row])))
+        image.close()
+    mosaic.save(output_path)
+    return mosaic.size
+
+
+def native_zoom(region, width_pixels):
+    """与拼接结果像素密度最接近的 z/x/y 缩放级别"""
+    world_pixels = width_pixels * 360 / (region[1] - region[0])
+    return max(0, round(math.log2(world_pixels / XYZ_TILE_SIZE)))
+
+
+def write_xyz_pyramid(mosaic_path, region, output_dir, min_zoom=0, max_zoom=None):
+    """
+    把球面 Mercator 拼接结果切成 z/x/y PNG 瓦片金字塔，区域外透明
+
+    Args:
+        mosaic_path (str): 拼接结果路径
+        region (list): 拼接结果的区域范围 [min_lon, max_lon, min_lat, max_lat]
+        output_dir (str): 瓦片目录，瓦片路径为 {z}/{x}/{y}.png
+        min_zoom (int): 最小缩放级别
+        max_zoom (int): 最大缩放级别，默认为与拼接结果像素密度最接近的级别
+
+    Returns:
+        dict: 各级别的瓦片数
+    """
+    Image = _import_pillow()
+    mosaic = Image.open(mosaic_path).convert("RGBA")
+    if max_zoom is None:
+        max_zoom = native_zoom(region, mosaic.width)
+    min_lon, max_lon, min_lat, max_lat = region
+    top, bottom = _mercator_y(max_lat), _mercator_y(min_lat)
+
+    counts = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        world = XYZ_TILE_SIZE * 2 ** zoom
+        x0 = (min_lon + 180) / 360 * world
+        x1 = (max_lon + 180) / 360 * world
+        y0 = (1 - top / np.pi) / 2 * world
+        y1 = (1 - bottom / np.pi) / 2 * world
+
+        # 该级别下先整体缩放一次，再贴到与瓦片网格对齐的画布上切片
+        column0, row0 = int(x0 // XYZ_TILE_SIZE), int(y0 // XYZ_TILE_SIZE)
+        column1, row1 = math.ceil(x1 / XYZ_TILE_SIZE), math.ceil(y1 / XYZ_TILE_SIZE)
+        size = (max(1, round(x1 - x0)), max(1, round(y1 - y0)))
+        canvas = Image.new("RGBA", ((column1 - column0) * XYZ_TILE_SIZE, (row1 - row0) * XYZ_TILE_SIZE))
+        canvas.paste(
+            mosaic.resize(size, Image.LANCZOS),
+            (round(x0 - column0 * XYZ_TILE_SIZE), round(y0 - row0 * XYZ_TILE_SIZE)),
+        )
+
+        counts[zoom] = 0
+        for x in range(column0, column1):
+            for y in range(row0, row1):
+                left, upper = (x - column0) * XYZ_TILE_SIZE, (y - row0) * XYZ_TILE_SIZE
+                tile = canvas.crop((left, upper, left + XYZ_TILE_SIZE, upper + XYZ_TILE_SIZE))
+                if tile.getbbox() is None:  # 完全透明
+                    continue
+                tile_dir = os.path.join(output_dir, str(zoom), str(x))
+                os.makedirs(tile_dir, exist_ok=True)
+                tile.save(os.path.join(tile_dir, f"{y}.png"))
+                counts[zoom] += 1
+    return counts
+
+
+def render_tiled(config, rows=2, columns=2, workers=None, timeout=None, stitch=True,
+                 xyz_dir=None, min_zoom=0, max_zoom=None):
+    """
+    分块并行出图
+
+    先在当前进程中下载覆盖整个区域（含光照计算的重叠区）的高程瓦片，再分两轮调度子进程：
+    第一轮统计各块的光照强度范围并合并为全局范围，
+    第二轮按全局范围归一化光照后出图，使各块之间明暗一致
+
+    Args:
+        config (dict): 地图生成配置，需开启高程和光照增强；width 为整幅图的宽度（cm），
+            默认每列 12cm
+        rows (int): 行数
+        columns (int): 列数
+        workers (int): 最大并发进程数，默认为 CPU 核数
+        timeout (float): 单个子区域的超时时间（秒）
+        stitch (bool): 是否拼接为一张大图
+        xyz_dir (str): 设置时输出 z/x/y 瓦片金字塔到该目录（需要拼接）
+        min_zoom (int): 瓦片金字塔最小缩放级别
+        max_zoom (int): 瓦片金字塔最大缩放级别
+
+    Returns:
+        dict: 汇总信息，包含各块状态、拼接结果路径和瓦片数
+    """
+    config = with_defaults(config)
+    if not (config["elevation"] and config["topography"]):
+        raise ValueError("分块出图只支持添加高程数据并开启光照增强（grdimage）的地图")
+
+    start = time.perf_counter()
+    tiles = _tile_configs(config, rows, columns)
+    relief_cache = ReliefTileCache()
+    for resolution in sorted({tile_config["resolution"] for _, _, tile_config in tiles}):
+        # 子进程只读缓存，避免并发下载同一瓦片和互相覆盖索引
+        relief_cache.prefetch(resolution, halo_region(config["region"], RESOLUTION_SECONDS[resolution] / 3600))
+
+    stats = run_jobs([{"config": c} for _, _, c in tiles], _tile_stats, workers=workers, timeout=timeout)
+    failed = [record for record in stats if record["status"] != "ok"]
+    if failed:
+        raise RuntimeError(f"统计子区域范围失败：{failed[0]['error']}")
+    shade_range = [
+        min(r["result"]["shade_range"][0] for r in stats), max(r["result"]["shade_range"][1] for r in stats)
+    ]
+
+    jobs = [{**tile_config, "shade_range": shade_range} for _, _, tile_config in tiles]
+    if xyz_dir is not None:
+        # 与 Web Mercator 一致使用球体，拼接结果才能直接切成 z/x/y 瓦片
+        jobs = [{**job, "ellipsoid": "Sphere"} for job in jobs]
+    records = run_jobs(jobs, _render_tile, workers=workers, timeout=timeout)
+
+    summary = {
+        "rows": rows,
+        "columns": columns,
+        "shade_range": shade_range,
+        "tiles": [
+            {
+                "row": row,
+                "column": column,
+                "region": tile_config["region"],
+                "resolution": tile_config["resolution"],
+                "status": record["status"],
+                "wall_time": record["wall_time"],
+                "output_path": record["result"]["output_path"] if record["result"] else None,
+                "error": record["error"],
+            }
+            for (row, column, tile_config), record in zip(tiles, records)
+        ],
+        "mosaic_path": None,
+        "xyz": None,
+    }
+    succeeded = all(record["status"] == "ok" for record in records)
+    if succeeded and (stitch or xyz_dir):
+        mosaic_path = os.path.join(config.get("output_dir", OUTPUT_DIR), f"{config['image_name']}_mosaic.png")
+        summary["mosaic_size"] = stitch_tiles(
+            [(tile["row"], tile["column"], tile["output_path"]) for tile in summary["tiles"]], mosaic_path
+        )
+        summary["mosaic_path"] = mosaic_path
+        if xyz_dir:
+            summary["xyz"] = {
+                "dir": xyz_dir,
+                "tiles": write_xyz_pyramid(mosaic_path, config["region"], xyz_dir, min_zoom, max_zoom),
+            }
+    summary["wall_time"] = round(time.perf_counter() - start, 3)
+    return summary
@@ -0,0 +1,32 @@
+"""
+预热模块
+导入 PyGMT、加载 GMT 动态库并创建 GMT 会话需要数秒，在出图子进程启动时完成，
+界面可以先显示出来，预热完成后再允许出图
+"""
+import time
+
+
+def warm_up():
+    """
+    导入 PyGMT、打开一次 GMT 会话并创建地图生成器
+
+    Returns:
+        tuple: (MapGenerator, 各步骤耗时（秒）)
+    """
+    timings = {}
+    start = time.perf_counter()
+    import pygmt  # noqa: F401  导入时会加载 GMT 动态库
+    from pygmt.clib import Session
+    timings["import_pygmt"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with Session() as lib:
+        lib.info  # 首次创建会话时 GMT 会读取配置和共享数据目录
+    timings["gmt_session"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from src.core.map_generator import MapGenerator
+    generator = MapGenerator()
+    timings["generator"] = time.perf_counter() - start
+    return generator, timings
+
@@ -0,0 +1,522 @@
+"""
+常驻出图进程池模块
+每个子进程启动时加载一次 GMT 并创建地图生成器，之后持续从队列中接收配置出图，
+GMT 会话、配色表和内存中的高程/光照网格缓存在任务之间复用。
+进程处理一定数量的任务或内存超过上限后自动重启，支持健康检查、取消单个任务和有序关闭
+"""
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future
+from multiprocessing.connection import wait
+
+from src.core.profiling import current_rss
+from src.core.progress import GenerationCancelled
+from src.utils.constants import WORKER_MAX_JOBS, WORKER_MAX_RSS, WORKER_HEALTH_TIMEOUT
+
+
+class WorkerError(RuntimeError):
+    """出图进程异常退出或无法启动"""
+
+
+class _JobCancel:
+    """子进程中的取消标志：父进程把共享值设为当前任务号即表示取消该任务"""
+
+    def __init__(self, cancelled, job_id):
+        self._cancelled = cancelled
+        self._job_id = job_id
+
+    def is_set(self):
+        return self._cancelled.value == self._job_id
+
+
+def _worker_main(worker_id, tasks, results, max_jobs, max_rss, cancelled):
+    """子进程入口：预热后循环处理任务，达到任务数或内存上限时退出等待替换"""
+    from src.core.warmup import warm_up
+
+    try:
+        generator, timings = warm_up()
+    except Exception as e:
+        results.send(("failed", worker_id, None, f"{type(e).__name__}: {e}"))
+        return
+    results.send(("ready", worker_id, None, {"pid": os.getpid(), "timings": timings}))
+
+    jobs = 0
+    while True:
+        message = tasks.get()
+        if message is None:  # 关闭
+            break
+        kind, job_id, config = message
+        if kind == "ping":
+            results.send(("pong", worker_id, job_id, {"pid": os.getpid(), "jobs": jobs, "rss": current_rss()}))
+            continue
+
+        def progress(stage, index, total, job_id=job_id):
+            results.send(("progress", worker_id, job_id, (stage, index, total)))
+
+        cancel_event = _JobCancel(cancelled, job_id)
+        try:
+            if kind == "prefetch":
+                result = generator.prefetch(config, cancel_event=cancel_event)
+            elif kind == "preview":
+                result = generator.preview(config, progress=progress, cancel_event=cancel_event)
+            else:
+                # 未指定时不弹出图像窗口，界面出图可以传入 show=True
+                result = generator.generate({"show": False, **config}, progress=progress, cancel_event=cancel_event)
+            message = ("done", worker_id, job_id, result)
+        except GenerationCancelled:
+            message = ("cancelled", worker_id, job_id, None)
+        except Exception as e:
+            message = ("error", worker_id, job_id, f"{type(e).__name__}: {e}")
+        jobs += 1
+
+        # 先通知即将退出再返回结果，父进程不会再把新任务分给这个进程
+        rss = current_rss()
+        retire = jobs >= max_jobs or (max_rss and rss and rss > max_rss)
+        if retire:
+            results.send(("retire", worker_id, None, {"jobs": jobs, "rss": rss}))
+        results.send(message)
+        if retire:
+            break
+
+
+class _Worker:
+    """父进程中记录的单个出图进程状态"""
+
+    def __init__(self, worker_id, process, tasks, results, cancelled):
+        self.id = worker_id
+        self.process = process
+        self.tasks = tasks
+        self.results = results
+        self.cancelled = cancelled  # 共享的待取消任务号
+        self.pid = None
+        self.ready = False
+        self.job = None  # (任务号, 开始时间)
+        self.pinging = False
+        self.retiring = False
+        self.jobs = 0
+
+
+class WorkerPool:
+    """常驻出图进程池"""
+
+    def __init__(self, workers=None, max_jobs=WORKER_MAX_JOBS, max_rss=WORKER_MAX_RSS, timeout=None):
+        """
+        初始化进程池
+
+        Args:
+            workers (int): 进程数，默认为 CPU 核数
+            max_jobs (int): 每个进程处理多少个任务后重启
+            max_rss (int): 进程常驻内存超过该值（字节）后重启，None 表示不限制
+            timeout (float): 单个任务的超时时间（秒），超时的进程会被终止并替换
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.max_rss = max_rss
+        self.timeout = timeout
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0,
+                      "crashes": 0, "recycled": 0, "started": 0, "cancelled": 0}
+        # 至少一个进程预热完成（或启动失败）后置位，界面据此启用出图按钮
+        self.ready = threading.Event()
+
+        # spawn 模式下子进程不会继承父进程中已初始化的 GMT 会话
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = {}
+        self._pending = deque()
+        self._futures = {}
+        self._progress = {}
+        self._pongs = {}
+        self._job_ids = itertools.count()
+        self._worker_ids = itertools.count()
+        self._lock = threading.Condition()
+        self._closing = False
+        self._broken = None
+        self._dispatcher = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def start(self):
+        """启动全部出图进程和调度线程"""
+        with self._lock:
+            for _ in range(self.workers):
+                self._spawn()
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def submit(self, config, kind="generate", progress=None):
+        """
+        提交一个出图任务
+
+        Args:
+            config (dict): 地图生成配置
+            kind (str): generate 正式出图，preview 生成草图，
+                prefetch 预先读取高程和光照放入该进程的缓存（MapGenerator.prefetch）
+            progress (callable): 进度回调 progress(stage, index, total)，在调度线程中执行
+
+        Returns:
+            concurrent.futures.Future: 结果为 MapGenerator.generate（或 preview）的返回值；
+                完成后 wall_time 属性记录从开始出图到结束的耗时
+        """
+        future = Future()
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("进程池已关闭")
+            if self._broken:
+                raise WorkerError(self._broken)
+            job_id = next(self._job_ids)
+            self._futures[job_id] = future
+            if progress is not None:
+                self._progress[job_id] = progress
+            self._pending.append((job_id, kind, config))
+            self.stats["submitted"] += 1
+            self._lock.notify_all()
+        return future
+
+    def run(self, config, kind="generate", progress=None, cancel_event=None, terminate=True, poll=0.1):
+        """
+        提交一个任务并等待结果，cancel_event 置位后取消任务
+
+        Args:
+            config (dict): 地图生成配置
+            kind (str): 任务类型，同 submit
+            progress (callable): 进度回调 progress(stage, index, total)
+            cancel_event (threading.Event): 取消标志
+            terminate (bool): 取消时是否终止进程，同 cancel
+            poll (float): 检查取消标志的间隔（秒）
+
+        Returns:
+            任务结果，同 submit 返回的 Future
+        """
+        future = self.submit(config, kind=kind, progress=progress)
+        while cancel_event is not None and not future.done():
+            if cancel_event.wait(poll):
+                if self.cancel(future, terminate=terminate):
+                    raise GenerationCancelled("任务已取消")
+                break
+        return future.result()
+
+    def cancel(self, future, terminate=True):
+        """
+        取消一个任务：尚未开始的任务直接移出队列，正在出图的任务终止执行它的进程并启动新进程替换，
+        不必等 GMT 调用返回；其他进程和它们的缓存不受影响
+
+        Args:
+            future (concurrent.futures.Future): submit 返回的 Future
+            terminate (bool): 为 False 时不终止进程，只通知任务在下一个检查点停止，
+                进程和已读入的缓存保留，适合预取这类可以随时中断的任务
+
+        Returns:
+            bool: 是否取消了任务，任务已经结束时返回 False
+        """
+        with self._lock:
+            job_id = next((job_id for job_id, f in self._futures.items() if f is future), None)
+            if job_id is None:
+                return False
+            for pending in self._pending:
+                if pending[0] == job_id:
+                    self.stats["cancelled"] += 1
+                    self._pending.remove(pending)
+                    self._futures.pop(job_id)
+                    self._progress.pop(job_id, None)
+                    future.cancel()
+                    return True
+            worker = next(worker for worker in self._workers.values()
+                          if worker.job is not None and worker.job[0] == job_id)
+            if terminate:
+                self._replace(worker, GenerationCancelled("任务已取消"))
+            else:
+                worker.cancelled.value = job_id
+            self._lock.notify_all()
+            return True
+
+    def map(self, configs, on_result=None):
+        """
+        依次提交多个任务并等待全部完成
+
+        Args:
+            configs (list): 配置列表
+            on_result (callable): 每个任务结束时的回调 on_result(record)
+
+        Returns:
+            list: 与 batch.run_jobs 格式相同的结果记录
+        """
+        futures = [self.submit(config) for config in configs]
+        records = [None] * len(futures)
+        finished = threading.Semaphore(0)
+
+        def collect(index, future):
+            error = CancelledError("任务已取消") if future.cancelled() else future.exception()
+            status = "ok"
+            if future.cancelled():
+                status = "cancelled"
+            elif isinstance(error, TimeoutError):
+                status = "timeout"
+            elif isinstance(error, WorkerError):
+                status = "crashed"
+            elif error is not None:
+                status = "error"
+            records[index] = {
+                "index": index,
+                "status": status,
+                "wall_time": round(getattr(future, "wall_time", 0.0), 3),
+                "result": future.result() if error is None else None,
+                "error": str(error) if error is not None else None,
+            }
+            if on_result:
+                on_result(records[index])
+            finished.release()
+
+        for index, future in enumerate(futures):
+            future.add_done_callback(lambda f, i=index: collect(i, f))
+        for _ in futures:
+            finished.acquire()
+        return records
+
+    def load(self):
+        """
+        当前负载
+
+        Returns:
+            dict: 排队等待的任务数（queued）和正在出图的任务数（running）
+        """
+        with self._lock:
+            return {
+                "queued": len(self._pending),
+                "running": sum(worker.job is not None for worker in self._workers.values()),
+            }
+
+    def health_check(self, timeout=WORKER_HEALTH_TIMEOUT):
+        """
+        检查每个进程的状态：空闲进程需在 timeout 秒内响应，未响应的进程会被终止并替换
+
+        Returns:
+            list: 每个进程的 id、pid、status（ok/busy/starting/unresponsive）、已处理任务数和常驻内存
+        """
+        with self._lock:
+            probes = {}
+            report = []
+            for worker in self._workers.values():
+                entry = {"id": worker.id, "pid": worker.pid, "jobs": worker.jobs, "rss": None}
+                if not worker.ready:
+                    entry["status"] = "starting"
+                elif worker.job is not None:
+                    entry["status"] = "busy"
+                    entry["job_time"] = round(time.perf_counter() - worker.job[1], 3)
+                else:
+                    ping_id = next(self._job_ids)
+                    worker.pinging = True
+                    worker.tasks.put(("ping", ping_id, None))
+                    probes[ping_id] = (worker, entry)
+                report.append(entry)
+
+            deadline = time.perf_counter() + timeout
+            while any(ping_id not in self._pongs for ping_id in probes):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._lock.wait(remaining)
+
+            for ping_id, (worker, entry) in probes.items():
+                pong = self._pongs.pop(ping_id, None)
+                worker.pinging = False
+                if pong is None:
+                    entry["status"] = "unresponsive"
+                    self._replace(worker)
+                else:
+                    entry.update(status="ok", rss=pong["rss"])
+            self._lock.notify_all()
+        return report
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """
+        关闭进程池
+
+        Args:
+            wait (bool): 是否等待已提交的任务全部完成
+            cancel_pending (bool): 是否取消尚未开始的任务
+        """
+        with self._lock:
+            self._closing = True
+            if cancel_pending:
+                while self._pending:
+                    job_id, _, _ = self._pending.popleft()
+                    self._progress.pop(job_id, None)
+                    self._futures.pop(job_id).cancel()
+            self._lock.notify_all()
+        if wait and self._dispatcher is not None:
+            self._dispatcher.join()
+
+    def _spawn(self):
+        """启动一个新进程（调用方持有锁）"""
+        worker_id = next(self._worker_ids)
+        tasks = self._context.Queue()
+        # 每个进程使用独立的结果管道，终止一个进程不会影响其他进程回传结果
+        reader, writer = self._context.Pipe(duplex=False)
+        cancelled = self._context.Value("q", -1, lock=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, tasks, writer, self.max_jobs, self.max_rss, cancelled),
+            daemon=True,
+        )
+        process.start()
+        writer.close()
+        self._workers[worker_id] = _Worker(worker_id, process, tasks, reader, cancelled)
+        self.stats["started"] += 1
+
+    def _replace(self, worker, error=None):
+        """终止并替换一个进程，正在处理的任务以 error 结束（调用方持有锁）"""
+        self._workers.pop(worker.id, None)
+        if worker.retiring:
+            worker.process.join(timeout=5)  # 主动退出的进程等它自行结束
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.process.join(timeout=5)
+        worker.results.close()
+        if worker.job is not None:
+            self._finish(worker, worker.job[0], error=error or WorkerError("出图进程被终止"))
+        if not self._closing or self._pending:
+            self._spawn()
+
+    def _finish(self, worker, job_id, result=None, error=None):
+        """结束一个任务（调用方持有锁）"""
+        future = self._futures.pop(job_id, None)
+        self._progress.pop(job_id, None)
+        started = worker.job[1] if worker.job is not None else None
+        worker.job = None
+        if future is None:
+            return
+        future.wall_time = time.perf_counter() - started if started is not None else 0.0
+        if error is None:
+            self.stats["completed"] += 1
+            future.set_result(result)
+        else:
+            self.stats["cancelled" if isinstance(error, GenerationCancelled) else "failed"] += 1
+            future.set_exception(error)
+
+    def _receive(self, worker):
+        """读取进程已发回的全部消息"""
+        messages = []
+        try:
+            while worker.results.poll():
+                messages.append(worker.results.recv())
+        except (EOFError, OSError):
+            pass  # 进程已退出，由存活检查处理
+        return messages
+
+    def _handle(self, message):
+        """处理子进程发来的消息（调用方持有锁）"""
+        kind, worker_id, job_id, payload = message
+        if kind == "pong":
+            self._pongs[job_id] = payload
+            return
+        worker = self._workers.get(worker_id)
+        if worker is None:  # 已被替换的进程
+            return
+        if kind == "ready":
+            worker.ready = True
+            worker.pid = payload["pid"]
+            self.ready.set()
+        elif kind == "progress":
+            callback = self._progress.get(job_id)
+            if callback is not None:
+                callback(*payload)
+        elif kind in ("done", "error", "cancelled"):
+            worker.jobs += 1
+            if kind == "done":
+                self._finish(worker, job_id, result=payload)
+            elif kind == "cancelled":
+                self._finish(worker, job_id, error=GenerationCancelled("任务已取消"))
+            else:
+                self._finish(worker, job_id, error=RuntimeError(payload))
+            if worker.retiring:
+                self._replace(worker)
+        elif kind == "retire":
+            worker.retiring = True
+            self.stats["recycled"] += 1
+        elif kind == "failed":
+            # 预热失败通常是 GMT 环境问题，重启也无济于事，让等待中的任务全部失败
+            self._broken = f"出图进程启动失败：{payload}"
+            self._workers.pop(worker.id, None)
+            worker.process.join(timeout=5)
+            worker.results.close()
+            while self._pending:
+                job_id, _, _ = self._pending.popleft()
+                self._progress.pop(job_id, None)
+                self._futures.pop(job_id).set_exception(WorkerError(self._broken))
+            self.ready.set()
+
+    def _dispatch(self):
+        """调度线程：分派任务、接收结果、处理超时和异常退出的进程"""
+        while True:
+            with self._lock:
+                for worker in list(self._workers.values()):
+                    if not self._pending:
+                        break
+                    if worker.ready and worker.job is None and not worker.pinging and not worker.retiring:
+                        job_id, kind, config = self._pending.popleft()
+                        worker.job = (job_id, time.perf_counter())
+                        worker.tasks.put((kind, job_id, config))
+
+                running = any(worker.job is not None for worker in self._workers.values())
+                if self._closing and not self._pending and not running:
+                    break
+
+            with self._lock:
+                readers = {worker.results: worker for worker in self._workers.values()}
+            if readers:
+                ready = wait(list(readers), timeout=0.1)
+            else:
+                time.sleep(0.1)
+                ready = []
+
+            with self._lock:
+                for reader in ready:
+                    for message in self._receive(readers[reader]):
+                        self._handle(message)
+                now = time.perf_counter()
+                for worker in list(self._workers.values()):
+                    if not worker.process.is_alive():
+                        # 进程退出前发出的消息可能还没读到
+                        for message in self._receive(worker):
+                            self._handle(message)
+                        if worker.id not in self._workers:
+                            continue
+                    if self.timeout and worker.job and now - worker.job[1] > self.timeout:
+                        self.stats["timeouts"] += 1
+                        self._replace(worker, TimeoutError(f"超过 {self.timeout} 秒"))
+                    elif not worker.process.is_alive() and not worker.ready:
+                        # 启动阶段就退出，与预热失败同样处理，避免反复重启
+                        self._handle(("failed", worker.id, None, f"退出码 {worker.process.exitcode}"))
+                    elif not worker.process.is_alive() and not worker.retiring:
+                        if worker.process.exitcode == 0 and worker.job is None:
+                            # 正常退出（回收消息尚未到达）
+                            self.stats["recycled"] += 1
+                        else:
+                            self.stats["crashes"] += 1
+                        self._replace(worker, WorkerError(f"出图进程退出码 {worker.process.exitcode}"))
+                self._lock.notify_all()
+
+        self._stop_workers()
+
+    def _stop_workers(self):
+        """通知全部进程退出并回收"""
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            if worker.process.is_alive():
+                worker.tasks.put(None)
+        for worker in workers:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            worker.results.close()
@@ -3,16 +3,19 @@ GUI配置界面模块
 提供用户交互界面
 """
 import os
+import queue
 import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 from src.utils.constants import (
     WINDOW_TITLE, WINDOW_SIZE, WINDOW_BG_COLOR,
     FONT_FAMILY, TITLE_FONT, NORMAL_FONT,
     DEFAULT_IMAGE_NAME, DEFAULT_IMAGE_FORMAT,
-    DEFAULT_REGION, IMAGE_FORMATS, GMTCPTS, RESOLUTIONS
+    DEFAULT_REGION, IMAGE_FORMATS, GMTCPTS, RESOLUTIONS, AUTO_RESOLUTION, PREVIEW_MAX_SIZE, PREFETCH_DELAY_MS
 )
 from src.gui.dialogs import PolygonConfigDialog, PointConfigDialog, ScaleConfigDialog, CompassConfigDialog
+from src.core.progress import GenerationCancelled
 
 # 添加项目根目录到 Python 路径
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -21,12 +24,17 @@ sys.path.insert(0, project_root)
 class ConfigGUI:
     """配置界面类，负责处理用户交互"""
     
-    def __init__(self, on_submit=None):
+    def __init__(self, on_submit=None, on_preview=None, ready_event=None, on_prefetch=None):
         """
         初始化配置界面
         
         Args:
-            on_submit (callable): 提交配置时的回调函数
+            on_submit (callable): 提交配置时的回调函数，在后台线程中以
+                on_submit(config, progress=..., cancel_event=...) 调用，返回输出路径
+            on_preview (callable): 生成草图的回调函数，调用方式同 on_submit，返回预览 PNG 路径
+            ready_event (threading.Event): 后台加载 GMT 完成的标志，置位前禁用运行和预览按钮
+            on_prefetch (callable): 区域和分辨率有效且停止修改后在后台线程中以
+                on_prefetch(config, cancel_event=...) 调用，预先读取高程数据
         """
         self.window = tk.Tk()
         self.window.title(WINDOW_TITLE)
@@ -34,6 +42,9 @@ class ConfigGUI:
         self.window.configure(bg='#f7f7f7')
         self.window.resizable(False, False)
         self.on_submit = on_submit
+        self.on_preview = on_preview
+        self.ready_event = ready_event
+        self.on_prefetch = on_prefetch
         
         # 存储多边形和点的配置
         self.polygon_config = None
@@ -41,10 +52,30 @@ class ConfigGUI:
         self.scale_config = None
         self.compass_config = None
         self.help_var = tk.StringVar(value="")
+        self.status_var = tk.StringVar(value="")
+        
+        # 后台生成任务
+        self._job_thread = None
+        self._job_kind = None
+        self._cancel_event = None
+        self._job_queue = queue.Queue()
+        self._preview_window = None
+        self._preview_image = None
+        
+        # 后台预取
+        self._prefetch_after = None
+        self._prefetch_key = None
+        self._prefetch_cancel = None
         
         # 设置样式
         self._setup_styles()
         self._create_widgets()
+        self._bind_prefetch()
+        if ready_event is not None and not ready_event.is_set():
+            self.run_button.config(state=tk.DISABLED)
+            self.preview_button.config(state=tk.DISABLED)
+            self.status_var.set("正在加载 GMT...")
+            self.window.after(100, self._poll_ready)
     
     def _setup_styles(self):
         """设置界面样式"""
@@ -172,10 +203,10 @@ class ConfigGUI:
         # 分辨率选择
         ttk.Label(right_frame, text="分辨率:").grid(row=4, column=0, sticky="w", pady=6)
         self.resolution_var = tk.StringVar(value="02m")
-        self.resolution_combo = ttk.Combobox(right_frame, values=RESOLUTIONS, textvariable=self.resolution_var, width=17)
+        self.resolution_combo = ttk.Combobox(right_frame, values=(AUTO_RESOLUTION,) + RESOLUTIONS, textvariable=self.resolution_var, width=17)
         self.resolution_combo.set("02m")
         self.resolution_combo.grid(row=4, column=1, sticky="w", pady=6)
-        self.resolution_combo.bind("<FocusIn>", lambda e: self._show_help("全球地形用30m、全国地形起伏用05m、3度X3度用30s、更小的区域用03s"))
+        self.resolution_combo.bind("<FocusIn>", lambda e: self._show_help("auto按区域自动选择；全球地形用30m、全国地形起伏用05m、3度X3度用30s、更小的区域用03s"))
         self.resolution_combo.bind("<FocusOut>", self._clear_help)
     
     def _create_region_frame(self, main_frame):
@@ -209,40 +240,220 @@ class ConfigGUI:
         button_frame = ttk.Frame(main_frame, style='TLabelframe')
         button_frame.grid(row=3, column=0, columnspan=2, pady=30)
         
-        # 运行按钮
+        # 预览按钮
+        self.preview_button = ttk.Button(button_frame, text="预览", command=self._preview, style='TButton')
+        self.preview_button.grid(row=0, column=0, padx=10, ipadx=10, ipady=5)
+        
+        # 运行按钮（最终高 dpi 出图）
         self.run_button = ttk.Button(button_frame, text="运行", command=self._run, style='TButton')
-        self.run_button.grid(row=0, column=0, padx=20, ipadx=20, ipady=5)
+        self.run_button.grid(row=0, column=1, padx=10, ipadx=10, ipady=5)
+        
+        # 取消按钮
+        self.cancel_button = ttk.Button(button_frame, text="取消", command=self._cancel, style='TButton', state=tk.DISABLED)
+        self.cancel_button.grid(row=0, column=2, padx=10, ipadx=10, ipady=5)
         
         # 退出按钮
         self.exit_button = ttk.Button(button_frame, text="退出", command=self.window.destroy, style='TButton')
-        self.exit_button.grid(row=0, column=1, padx=20, ipadx=20, ipady=5)
+        self.exit_button.grid(row=0, column=3, padx=10, ipadx=10, ipady=5)
+        
+        # 进度条和状态
+        self.progress_bar = ttk.Progressbar(button_frame, mode="determinate", maximum=1)
+        self.progress_bar.grid(row=1, column=0, columnspan=4, sticky="ew", pady=(15, 0))
+        ttk.Label(button_frame, textvariable=self.status_var, foreground="#666").grid(row=2, column=0, columnspan=4, sticky="w", pady=(5, 0))
+    
+    def _bind_prefetch(self):
+        """区域、分辨率或高程选项变化时重新安排预取"""
+        if self.on_prefetch is None:
+            return
+        for entry in self.lon_entries + self.lat_entries:
+            entry.bind("<KeyRelease>", self._schedule_prefetch, add="+")
+        for var in (self.resolution_var, self.elevation_var, self.topography_var):
+            var.trace_add("write", self._schedule_prefetch)
+        self._schedule_prefetch()
+    
+    def _schedule_prefetch(self, *args):
+        """防抖：停止修改 PREFETCH_DELAY_MS 毫秒后才开始预取"""
+        if self._prefetch_after is not None:
+            self.window.after_cancel(self._prefetch_after)
+        self._prefetch_after = self.window.after(PREFETCH_DELAY_MS, self._start_prefetch)
+    
+    def _prefetch_config_key(self, config):
+        """决定需要哪份高程数据的配置项"""
+        return (tuple(config["region"]), config["resolution"], config["elevation"], config["topography"])
+    
+    def _start_prefetch(self):
+        """配置有效且与正在预取的不同时，取消旧的预取并在后台开始新的预取"""
+        self._prefetch_after = None
+        if self._job_thread is not None and self._job_thread.is_alive():
+            return  # 出图完成后会重新安排
+        try:
+            config = self._collect_config()
+        except ValueError:
+            return
+        min_lon, max_lon, min_lat, max_lat = config["region"]
+        valid = (
+            min_lon < max_lon and -90 <= min_lat < max_lat <= 90
+            and config["resolution"] in (AUTO_RESOLUTION,) + RESOLUTIONS
+        )
+        key = self._prefetch_config_key(config)
+        if not valid or not config["elevation"] or key == self._prefetch_key:
+            return
+        
+        self._cancel_prefetch()
+        self._prefetch_key = key
+        self._prefetch_cancel = threading.Event()
+        threading.Thread(
+            target=self._prefetch_worker, args=(config, self._prefetch_cancel), daemon=True
+        ).start()
+    
+    def _prefetch_worker(self, config, cancel_event):
+        """后台线程：预取失败不影响之后的出图，出图时会重新读取"""
+        try:
+            self.on_prefetch(config, cancel_event=cancel_event)
+        except Exception:
+            if not cancel_event.is_set() and self._prefetch_cancel is cancel_event:
+                self._prefetch_key = None
+    
+    def _cancel_prefetch(self, keep_key=None):
+        """取消正在进行的预取，keep_key 与正在预取的配置相同时保留"""
+        if self._prefetch_cancel is not None and self._prefetch_key != keep_key:
+            self._prefetch_cancel.set()
+            self._prefetch_cancel = None
+            self._prefetch_key = None
+    
+    def _poll_ready(self):
+        """等待后台加载 GMT 完成后启用运行和预览按钮"""
+        if self.ready_event.is_set():
+            self.run_button.config(state=tk.NORMAL)
+            self.preview_button.config(state=tk.NORMAL)
+            self.status_var.set("")
+        else:
+            self.window.after(100, self._poll_ready)
+    
+    def _collect_config(self):
+        """从界面控件收集地图生成配置"""
+        return {
+            "elevation": self.elevation_var.get(),
+            "topography": self.topography_var.get(),
+            "coast_line": self.coast_line_var.get(),
+            "plot_polygons": self.plot_polygons_var.get(),
+            "plot_points": self.plot_points_var.get(),
+            "region": [float(entry.get()) for entry in self.lon_entries + self.lat_entries],
+            "image_name": self.image_name.get(),
+            "image_format": self.image_format.get(),
+            "polygon_config": self.polygon_config,
+            "point_config": self.point_config,
+            "cmap": self.cmap_var.get(),
+            "resolution": self.resolution_var.get()
+        }
     
     def _run(self):
         """运行按钮回调函数"""
+        self._submit(self.on_submit, "final")
+    
+    def _preview(self):
+        """预览按钮回调函数：低 dpi 快速出草图并在窗口中显示"""
+        self._submit(self.on_preview, "preview")
+    
+    def _submit(self, callback, kind):
+        """收集配置并启动后台任务"""
         try:
-            config = {
-                "elevation": self.elevation_var.get(),
-                "topography": self.topography_var.get(),
-                "coast_line": self.coast_line_var.get(),
-                "plot_polygons": self.plot_polygons_var.get(),
-                "plot_points": self.plot_points_var.get(),
-                "region": [float(entry.get()) for entry in self.lon_entries + self.lat_entries],
-                "image_name": self.image_name.get(),
-                "image_format": self.image_format.get(),
-                "polygon_config": self.polygon_config,
-                "point_config": self.point_config,
-                "cmap": self.cmap_var.get(),
-                "resolution": self.resolution_var.get()
-            }
+            config = self._collect_config()
             
-            if self.on_submit:
-                self.on_submit(config)
+            if callback:
+                self._start_job(callback, config, kind)
                 
         except ValueError as e:
             messagebox.showerror("错误", "请输入有效的数值")
         except Exception as e:
             messagebox.showerror("错误", f"发生错误：{str(e)}")
     
+    def _start_job(self, callback, config, kind):
+        """在后台线程中运行生成任务，运行期间禁用运行和预览按钮"""
+        # 正式出图需要的正是正在预取的数据时让预取继续，否则取消以免出图等待
+        self._cancel_prefetch(keep_key=self._prefetch_config_key(config) if kind == "final" else None)
+        self._job_kind = kind
+        self._cancel_event = threading.Event()
+        self.run_button.config(state=tk.DISABLED)
+        self.preview_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_bar.config(value=0)
+        self.status_var.set("正在准备...")
+        self._job_thread = threading.Thread(
+            target=self._job_worker, args=(callback, config, self._cancel_event), daemon=True
+        )
+        self._job_thread.start()
+        self.window.after(100, self._poll_job)
+    
+    def _job_worker(self, callback, config, cancel_event):
+        """后台线程：调用回调函数，并通过队列把进度和结果交给界面线程"""
+        def progress(stage, index, total):
+            self._job_queue.put(("progress", stage, index / total))
+        
+        try:
+            result = callback(config, progress=progress, cancel_event=cancel_event)
+            self._job_queue.put(("done", result))
+        except GenerationCancelled:
+            self._job_queue.put(("cancelled",))
+        except Exception as e:
+            self._job_queue.put(("error", e))
+    
+    def _poll_job(self):
+        """在界面线程中处理后台任务发来的消息（Tk 控件只能在界面线程中操作）"""
+        finished = False
+        while not self._job_queue.empty():
+            message = self._job_queue.get_nowait()
+            kind = message[0]
+            if kind == "progress":
+                self.status_var.set(message[1])
+                self.progress_bar.config(value=message[2])
+                continue
+            finished = True
+            if kind == "done" and self._job_kind == "preview":
+                self.status_var.set("预览完成")
+                self._show_preview(message[1])
+            elif kind == "done":
+                self.status_var.set("完成")
+                messagebox.showinfo("成功", f"图像已成功保存到 {message[1]}")
+            elif kind == "cancelled":
+                self.status_var.set("已取消")
+            else:
+                self.status_var.set("出错")
+                messagebox.showerror("错误", f"生成图像时发生错误：{str(message[1])}")
+        
+        if finished:
+            self.run_button.config(state=tk.NORMAL)
+            self.preview_button.config(state=tk.NORMAL)
+            self.cancel_button.config(state=tk.DISABLED)
+            if self.on_prefetch is not None:
+                self._schedule_prefetch()
+        else:
+            self.window.after(100, self._poll_job)
+    
+    def _cancel(self):
+        """取消按钮回调：通知后台任务停止（回调在子进程中出图时会直接终止子进程）"""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_var.set("正在取消...")
+    
+    def _show_preview(self, path):
+        """在预览窗口中显示草图，过大时按整数倍缩小"""
+        if self._preview_window is None or not self._preview_window.winfo_exists():
+            self._preview_window = tk.Toplevel(self.window)
+            self._preview_window.title("预览")
+            self._preview_label = ttk.Label(self._preview_window)
+            self._preview_label.pack()
+        
+        image = tk.PhotoImage(file=path)
+        factor = max(1, -(-max(image.width(), image.height()) // PREVIEW_MAX_SIZE))
+        if factor > 1:
+            image = image.subsample(factor)
+        # 保留引用，避免图片被回收
+        self._preview_image = image
+        self._preview_label.config(image=image)
+        self._preview_window.lift()
+    
     def run(self):
         """运行GUI程序"""
         self.window.mainloop()
\ No newline at end of file
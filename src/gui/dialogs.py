@@ -3,7 +3,7 @@
 提供各种配置对话框
 """
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from src.utils.constants import (
     COLOR_OPTIONS, PEN_WIDTH_OPTIONS, DEFAULT_POLYGON, DEFAULT_POINT,
     FONT_FAMILY, NORMAL_FONT
@@ -48,6 +48,11 @@ class PolygonConfigDialog:
         ttk.Button(points_btn_frame, text="添加点", command=self._add_point).pack(side=tk.LEFT, padx=2)
         ttk.Button(points_btn_frame, text="删除点", command=self._delete_point).pack(side=tk.LEFT, padx=2)
         ttk.Button(points_btn_frame, text="编辑点", command=self._edit_point).pack(side=tk.LEFT, padx=2)
+        ttk.Button(points_btn_frame, text="导入文件", command=self._browse_file).pack(side=tk.LEFT, padx=2)
+        
+        # 多边形文件（GeoJSON 或 GMT 多段文件），设置后忽略上面的点列表
+        self.file_var = tk.StringVar(value=self.config.get("file", ""))
+        ttk.Label(points_frame, textvariable=self.file_var, foreground="#666").pack(fill=tk.X)
         
         # 样式设置
         style_frame = ttk.LabelFrame(self.dialog, text="样式设置", padding="5")
@@ -110,9 +115,18 @@ class PolygonConfigDialog:
                 self.points[index] = dialog.result
                 self._update_points_list()
     
+    def _browse_file(self):
+        """选择多边形文件"""
+        path = filedialog.askopenfilename(
+            parent=self.dialog,
+            filetypes=[("多边形文件", "*.geojson *.json *.gmt *.txt"), ("所有文件", "*.*")]
+        )
+        if path:
+            self.file_var.set(path)
+    
     def _on_ok(self):
         """确定按钮回调"""
-        if not self.points:
+        if not self.points and not self.file_var.get():
             messagebox.showerror("错误", "请至少添加一个点")
             return
         
@@ -122,6 +136,8 @@ class PolygonConfigDialog:
             "pen_color": self.pen_color.get(),
             "close": self.close_var.get()
         }
+        if self.file_var.get():
+            self.config["file"] = self.file_var.get()
         self.dialog.destroy()
     
     def get_config(self):
@@ -164,6 +180,13 @@ class PointConfigDialog:
         self.y_entry.insert(0, str(self.config["y"]))
         self.y_entry.grid(row=1, column=1, sticky="w", padx=5, pady=2)
         
+        # 批量投点文件（CSV/Parquet，需包含 x、y 列），设置后忽略上面的单点坐标
+        ttk.Label(pos_frame, text="数据文件:").grid(row=2, column=0, sticky="w", padx=5, pady=2)
+        self.file_entry = ttk.Entry(pos_frame, width=15)
+        self.file_entry.insert(0, self.config.get("file", ""))
+        self.file_entry.grid(row=2, column=1, sticky="w", padx=5, pady=2)
+        ttk.Button(pos_frame, text="浏览", command=self._browse_file).grid(row=2, column=2, padx=2, pady=2)
+        
         # 样式设置
         style_frame = ttk.LabelFrame(self.dialog, text="样式设置", padding="5")
         style_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -212,10 +235,22 @@ class PointConfigDialog:
                 "pen_color": self.pen_color.get(),
                 "transparency": int(self.transparency.get())
             }
+            if self.file_entry.get().strip():
+                self.config["file"] = self.file_entry.get().strip()
             self.dialog.destroy()
         except ValueError:
             tk.messagebox.showerror("错误", "请输入有效的数值")
     
+    def _browse_file(self):
+        """选择批量投点文件"""
+        path = filedialog.askopenfilename(
+            parent=self.dialog,
+            filetypes=[("点数据", "*.csv *.parquet *.pq"), ("所有文件", "*.*")]
+        )
+        if path:
+            self.file_entry.delete(0, tk.END)
+            self.file_entry.insert(0, path)
+    
     def get_config(self):
         """获取配置"""
         return self.config
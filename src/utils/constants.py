@@ -2,6 +2,8 @@
 常量定义模块
 定义程序中使用的常量
 """
+import os
+import tempfile
 
 # 窗口设置
 WINDOW_TITLE = "GMT插件"
@@ -78,4 +80,92 @@ GMTCPTS = (
 RESOLUTIONS = (
     '01d', '30m', '20m', '15m', '10m', '06m', '05m', '04m', '03m', '02m', '01m',
     '30s', '15s', '03s', '01s'
-)
\ No newline at end of file
+)
+
+# 高程瓦片缓存设置
+RELIEF_CACHE_DIR = os.path.join("cache", "relief")
+# 瓦片边长按分辨率选取：取每边网格点数不超过 RELIEF_TILE_CELLS 的最大边长，
+# 单个瓦片不超过约 1300 万字节，细分辨率的小区域不会读入整块大瓦片
+RELIEF_TILE_CELLS = 1800
+RELIEF_TILE_DEGREES = (90, 45, 30, 15, 10, 5, 3, 1, 0.5, 0.25)  # 可选边长（度），均能整除 90
+RELIEF_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 磁盘缓存上限 2GB
+
+# 内存缓存上限（高程网格和光照梯度网格）
+MEMORY_CACHE_MAX_BYTES = 1024 ** 3
+
+# 自动分辨率选项
+AUTO_RESOLUTION = "auto"
+
+# 各地形分辨率对应的网格间距（秒）
+RESOLUTION_SECONDS = {
+    '01d': 3600, '30m': 1800, '20m': 1200, '15m': 900, '10m': 600, '06m': 360,
+    '05m': 300, '04m': 240, '03m': 180, '02m': 120, '01m': 60,
+    '30s': 30, '15s': 15, '03s': 3, '01s': 1
+}
+
+# 输出图像分辨率（dpi）
+OUTPUT_DPI = 600
+
+# 地图宽度（cm），分别对应光照增强的 grdimage 和三维 grdview
+IMAGE_PROJECTION_WIDTH = 12
+VIEW_PROJECTION_WIDTH = 15
+
+# 高程网格预算：超出时降低分辨率（downgrade）或拒绝（refuse）
+MAX_GRID_CELLS = 50_000_000
+GRID_BUDGET_POLICY = "downgrade"
+
+# 草图预览设置
+PREVIEW_DPI = 100
+PREVIEW_DIR = os.path.join(tempfile.gettempdir(), "quick_gmt_preview")
+PREVIEW_MAX_SIZE = 800  # 预览窗口中图片的最大边长（像素）
+
+# 出图结果缓存设置
+RENDER_CACHE_DIR = os.path.join("cache", "render")
+RENDER_CACHE_MAX_BYTES = 1024 ** 3
+
+# 底图图层缓存设置（高程 + 海岸线，不含图框和叠加图层）
+BASE_LAYER_CACHE_DIR = os.path.join("cache", "base")
+BASE_LAYER_CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+# 可以用栅格底图重放的输出格式
+RASTER_FORMATS = ("png", "jpg", "tif", "bmp")
+
+# 分块出图设置
+XYZ_TILE_SIZE = 256  # z/x/y 瓦片边长（像素）
+XYZ_MAX_LATITUDE = 85.0511287798  # Web Mercator 的纬度范围
+
+# 常驻出图进程池设置：每个进程处理一定数量的任务或内存超过上限后重启
+WORKER_MAX_JOBS = 50
+WORKER_MAX_RSS = 2 * 1024 ** 3
+WORKER_HEALTH_TIMEOUT = 5.0  # 健康检查等待响应的时间（秒）
+
+# 区域或分辨率停止修改多久（毫秒）后开始在后台预取高程数据
+PREFETCH_DELAY_MS = 800
+
+# 本地出图服务设置
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_MAX_QUEUE = 64  # 排队和正在出图的任务上限，超过时拒绝新请求
+SERVICE_JOB_HISTORY = 1000  # 保留多少个已完成任务供查询
+SERVICE_LATENCY_WINDOW = 1000  # 统计延迟分位数的最近任务数
+SERVICE_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "service")
+SERVICE_DATA_DIR = "data"  # 请求中引用的高程网格、投点和多边形文件必须位于该目录内
+
+# 三维透视图（grdview）的网格抽稀：每个网格单元至少占多少个输出像素，质量系数越大网格越密。
+# 取 1 时只去掉小于一个输出像素的单元，这些单元在图上本来就分辨不出，不依赖实测调参；
+# 更大的值用画质换速度，需先用基准测出各分辨率的加速比和图像均方根差再调整：
+#     python benchmarks/bench_grdview.py --resolutions 05m 02m 01m 30s --dpi 300 --output grdview.json
+VIEW_PIXELS_PER_CELL = 1
+VIEW_QUALITY = 1.0
+
+# GSHHG 海岸线精度及其标称分辨率（km），从粗到细
+COAST_RESOLUTIONS = (
+    ("crude", 25.0), ("low", 5.0), ("intermediate", 1.0), ("high", 0.2), ("full", 0.04)
+)
+COAST_DETAIL_MM = 0.5  # 图上小于该尺寸（mm）的海岸线细节看不出来
+COAST_WATER_COLOR = "173/216/230"  # lightblue
+COAST_WATER_TRANSPARENCY = 80
+
+# 海陆掩膜缓存设置（栅格输出时用于绘制水域）
+COAST_CACHE_DIR = os.path.join("cache", "coast")
+COAST_CACHE_MAX_BYTES = 256 * 1024 ** 2
@@ -0,0 +1,79 @@
+"""
+测试公共设置
+数值模块只在绘图和下载时调用 PyGMT。未安装 PyGMT 时注册一个最小的替身模块和 .gmt 访问器，
+让纯 NumPy 的部分可以在没有 GMT 的环境中测试；下载由 downloads 夹具替换为线性高程场
+"""
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+import xarray as xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import pygmt  # noqa: F401
+except ImportError:
+    @xr.register_dataarray_accessor("gmt")
+    class _GMTAccessor:
+        """只记录配准方式和坐标类型，与 PyGMT 的 .gmt 访问器属性相同"""
+
+        def __init__(self, obj):
+            self.registration = 0
+            self.gtype = 0
+
+    def _unavailable(*args, **kwargs):
+        raise RuntimeError("测试环境未安装 PyGMT")
+
+    pygmt = types.ModuleType("pygmt")
+    pygmt.datasets = types.SimpleNamespace(load_earth_relief=_unavailable)
+    pygmt.helpers = types.ModuleType("pygmt.helpers")
+    pygmt.helpers.GMTTempFile = _unavailable
+    sys.modules["pygmt"] = pygmt
+    sys.modules["pygmt.helpers"] = pygmt.helpers
+
+from src.utils.constants import RESOLUTION_SECONDS  # noqa: E402
+
+
+def linear_field(lon, lat):
+    """线性高程场：块平均后的值等于窗口中心处的值"""
+    return 10 * lon + lat
+
+
+def _linear_relief(resolution, region):
+    """替代 load_earth_relief：网格线配准、纬度降序（与 GMT 返回的一致）"""
+    step = RESOLUTION_SECONDS[resolution] / 3600
+    lon = np.round(np.arange(round(region[0] / step), round(region[1] / step) + 1) * step, 10)
+    lat = np.round(np.arange(round(region[2] / step), round(region[3] / step) + 1) * step, 10)[::-1]
+    grid = xr.DataArray(
+        linear_field(lon[None, :], lat[:, None]).astype(np.float32),
+        coords={"lat": lat, "lon": lon},
+        dims=("lat", "lon"),
+        name="z",
+    )
+    grid.gmt.registration = 0
+    grid.gmt.gtype = 1
+    return grid
+
+
+@pytest.fixture
+def linear_relief():
+    """按分辨率和区域生成线性高程网格的函数"""
+    return _linear_relief
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """把 load_earth_relief 替换为线性高程场，返回记录下载请求的列表"""
+    from src.core import relief_cache
+
+    calls = []
+
+    def load_earth_relief(resolution, region):
+        calls.append((resolution, list(region)))
+        return _linear_relief(resolution, region)
+
+    monkeypatch.setattr(relief_cache.pygmt.datasets, "load_earth_relief", load_earth_relief)
+    return calls
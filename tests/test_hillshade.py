@@ -0,0 +1,68 @@
+"""
+NumPy 分块光照测试
+"""
+import os
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from src.core.hillshade import HILLSHADE_TOLERANCE, halo_region, hillshade, intensity_range
+
+
+@pytest.fixture
+def rough_grid(linear_relief):
+    """线性场叠加随机起伏的高程网格"""
+    rng = np.random.default_rng(1)
+    grid = linear_relief("02m", [100, 104, 30, 33])
+    grid = grid + rng.normal(0, 50, grid.shape).astype(np.float32)
+    grid.gmt.registration = 0
+    grid.gmt.gtype = 1
+    return grid
+
+
+def test_hillshade_independent_of_tiling(rough_grid):
+    reference = hillshade(rough_grid, tile_rows=rough_grid.shape[0], workers=1)
+    for tile_rows in (1, 7, 64):
+        result = hillshade(rough_grid, tile_rows=tile_rows, workers=4)
+        np.testing.assert_array_equal(result.values, reference.values)
+    assert float(reference.min()) == pytest.approx(-1, abs=1e-6)
+    assert float(reference.max()) == pytest.approx(1, abs=1e-6)
+
+
+def test_halo_tiles_match_whole_grid(rough_grid):
+    grid = rough_grid.sortby("lat")
+    value_range = intensity_range(grid)
+    whole = hillshade(grid, value_range=value_range)
+    step = float(grid.lon[1] - grid.lon[0])
+
+    for region in ([100, 102, 30, 33], [102, 104, 30, 31.5], [102, 104, 31.5, 33]):
+        halo = halo_region(region, step)
+        tile = grid.sel(lon=slice(halo[0], halo[1] + 1e-9), lat=slice(halo[2], halo[3] + 1e-9))
+        tile.gmt.registration = 0
+        assert intensity_range(tile, region=region)[1] <= value_range[1]
+        # 多读一圈节点后，接缝两侧的光照与整幅网格一次计算的结果相同
+        shaded = hillshade(tile, value_range=value_range, region=region)
+        expected = whole.sel(lon=shaded.lon.values, lat=shaded.lat.values)
+        assert shaded.lon.values[0] == pytest.approx(region[0]) and shaded.lat.values[-1] == pytest.approx(region[3])
+        np.testing.assert_allclose(shaded.values, expected.values, atol=1e-6)
+
+
+REFERENCE_PATH = os.path.join(os.path.dirname(__file__), "data", "grdgradient_reference.npz")
+
+
+@pytest.mark.skipif(
+    not os.path.exists(REFERENCE_PATH), reason="缺少 grdgradient 参考数据，见 bench_hillshade.py --save-reference"
+)
+def test_matches_grdgradient_reference():
+    reference = np.load(REFERENCE_PATH)
+    grid = xr.DataArray(
+        reference["elevation"], coords={"lat": reference["lat"], "lon": reference["lon"]}, dims=("lat", "lon")
+    )
+    grid.gmt.registration = 0
+    grid.gmt.gtype = 1
+    result = hillshade(grid, radiance=tuple(reference["radiance"]))
+    diff = result.values.astype(np.float64) - reference["intensity"]
+    assert np.sqrt(np.nanmean(diff ** 2)) <= HILLSHADE_TOLERANCE
+    # 最大差值不超过生成参考数据时的实测值
+    assert np.nanmax(np.abs(diff)) <= float(reference["max_diff"]) + 1e-6
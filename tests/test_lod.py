@@ -0,0 +1,28 @@
+"""
+三维透视图网格抽稀测试
+"""
+import numpy as np
+
+from src.core.lod import decimate, view_factors
+
+
+def test_view_factors_follow_output_pixels():
+    # 15cm、300dpi 约 1772 像素，每像素一个单元需要约 1772 列
+    x_factor, y_factor = view_factors((2401, 4801), width_cm=15, dpi=300)
+    assert x_factor == 2 and y_factor == 2
+    assert view_factors((1201, 1201), width_cm=15, dpi=300) == (1, 1)
+    # 倾斜观察时南北方向可以抽稀得更多
+    assert view_factors((2401, 4801), width_cm=15, dpi=300, elevation=30)[1] > y_factor
+
+
+def test_decimate_preserves_linear_field(linear_relief):
+    grid = linear_relief("01m", [100, 104, 30, 32])
+    assert decimate(grid, (1, 1)) is grid
+
+    coarse = decimate(grid, (4, 3))
+    assert coarse.shape == (41, 61)
+    assert coarse.lat.values[0] < coarse.lat.values[-1]
+    # 线性场的块平均等于窗口中心节点的值；边缘节点的窗口只有一半在网格内，比较内部节点
+    inner = coarse[1:-1, 1:-1]
+    expected = grid.sel(lon=inner.lon.values, lat=inner.lat.values)
+    np.testing.assert_allclose(inner.values, expected.values, atol=1e-3)
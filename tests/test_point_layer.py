@@ -0,0 +1,45 @@
+"""
+投点简化测试
+"""
+import numpy as np
+import pytest
+
+from src.core.point_layer import aggregate_points, thin_points
+
+
+def test_thin_points_keeps_one_point_per_pixel():
+    region = [0, 10, 0, 10]
+    x = np.array([1.0, 1.0001, 5.0, 5.0, 20.0])
+    y = np.array([1.0, 1.0001, 5.0, 5.0, 5.0])
+    layer = thin_points({"x": x, "y": y, "size": np.arange(5.0)}, region, width_cm=10, dpi=100)
+    # 区域外的点被去掉，同一像素的点只保留第一个
+    np.testing.assert_array_equal(layer["x"], [1.0, 5.0])
+    np.testing.assert_array_equal(layer["size"], [0.0, 2.0])
+
+
+def test_aggregate_points_counts_and_means():
+    rng = np.random.default_rng(0)
+    region = [100, 110, 20, 30]
+    x = rng.uniform(95, 115, 5000)
+    y = rng.uniform(15, 35, 5000)
+    color = rng.uniform(0, 1, 5000)
+    layer = {"x": x, "y": y, "color": color}
+    inside = (x >= 100) & (x <= 110) & (y >= 20) & (y <= 30)
+
+    counts = aggregate_points(layer, region, width_cm=10, dpi=100, cell_pixels=16)
+    assert counts["color"].sum() == inside.sum()
+    assert np.all((counts["x"] >= 100) & (counts["x"] <= 110 + 1))
+    assert np.all((counts["y"] >= 20) & (counts["y"] <= 30 + 1))
+
+    means = aggregate_points(layer, region, width_cm=10, dpi=100, cell_pixels=16, statistic="mean")
+    np.testing.assert_allclose(np.sum(means["color"] * counts["color"]), color[inside].sum())
+    with pytest.raises(ValueError):
+        aggregate_points({"x": x, "y": y}, region, width_cm=10, dpi=100, statistic="mean")
+
+
+def test_thin_points_uses_miller_stretch():
+    # 69° 附近南北相距 0.01° 的两点：墨卡托下相距约 1.1 像素，Miller 下约 0.7 像素，落在同一像素内
+    region = [0, 10, 60, 70]
+    layer = {"x": np.array([5.0, 5.0]), "y": np.array([69.0, 69.01])}
+    assert thin_points(layer, region, width_cm=10, dpi=100)["x"].size == 2
+    assert thin_points(layer, region, width_cm=10, dpi=100, mercator=False)["x"].size == 1
@@ -0,0 +1,51 @@
+"""
+多边形读取和抽稀测试
+"""
+import numpy as np
+
+from src.core.polygon_layer import _douglas_peucker, read_gmt_multisegment, simplify_polygons
+
+
+def test_douglas_peucker_keeps_endpoints_and_corners():
+    x = np.array([0.0, 1.0, 2.0, 3.0, 3.0, 3.0])
+    y = np.array([0.0, 0.001, 0.0, 0.0, 1.0, 2.0])
+    keep = _douglas_peucker(x, y, tolerance=0.01)
+    np.testing.assert_array_equal(keep, [True, False, False, True, False, True])
+
+
+def test_simplify_polygons_keeps_segment_offsets():
+    t = np.linspace(0, 2 * np.pi, 200)
+    ring = np.column_stack([np.cos(t), np.sin(t)])
+    line = np.column_stack([np.linspace(10, 11, 50), np.full(50, 5.0)])
+    layer = {
+        "x": np.concatenate([ring[:, 0], line[:, 0], ring[:, 0] + 20]),
+        "y": np.concatenate([ring[:, 1], line[:, 1], ring[:, 1]]),
+        "offsets": np.array([0, 200, 250, 450]),
+    }
+    simplified = simplify_polygons(layer, tolerance=0.01)
+    offsets = simplified["offsets"]
+
+    assert offsets[0] == 0 and offsets[-1] == simplified["x"].size
+    assert np.all(np.diff(offsets) >= 2)
+    # 每段的首尾顶点保留，且段之间不会串位
+    old = layer["offsets"]
+    for start, end, old_start, old_end in zip(offsets[:-1], offsets[1:], old[:-1], old[1:]):
+        assert simplified["x"][start] == layer["x"][old_start]
+        assert simplified["x"][end - 1] == layer["x"][old_end - 1]
+    # 直线段只剩两个端点
+    assert offsets[2] - offsets[1] == 2
+
+
+def test_read_gmt_multisegment(tmp_path):
+    path = tmp_path / "polygons.txt"
+    path.write_text(
+        "# 注释\n"
+        "> 第一段\n0 0\n1 0\n1 1\n"
+        "> 第二段\n5 5\n6 6\n"
+        ">\n\n10 10 extra\n11 11\n12 12\n",
+        encoding="utf-8",
+    )
+    layer = read_gmt_multisegment(str(path))
+    np.testing.assert_array_equal(layer["offsets"], [0, 3, 5, 8])
+    np.testing.assert_array_equal(layer["x"], [0, 1, 1, 5, 6, 10, 11, 12])
+    np.testing.assert_array_equal(layer["y"], [0, 0, 1, 5, 6, 10, 11, 12])
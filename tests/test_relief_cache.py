@@ -0,0 +1,50 @@
+"""
+高程瓦片缓存测试
+load_earth_relief 由 downloads 夹具替换为线性高程场
+"""
+import numpy as np
+
+from src.core.relief_cache import ReliefTileCache, block_average
+
+
+def test_assembled_region_matches_direct_load(tmp_path, downloads, linear_relief):
+    cache = ReliefTileCache(str(tmp_path), tile_size=5, max_bytes=10 ** 9)
+    region = [118.5, 131, 38, 46.2]
+    grid = cache.load("02m", region)
+    direct = linear_relief("02m", region).sortby("lat")
+
+    np.testing.assert_allclose(grid.lon.values, direct.lon.values)
+    np.testing.assert_allclose(grid.lat.values, direct.lat.values)
+    np.testing.assert_array_equal(grid.values, direct.values)
+    assert len(downloads) == 12  # 经度 4 × 纬度 3 个瓦片
+
+    # 再次读取时全部命中
+    again = cache.load("02m", [120, 122, 40, 41])
+    assert len(downloads) == 12
+    assert cache.last_load["cached"] == 1
+    np.testing.assert_array_equal(again.values, linear_relief("02m", [120, 122, 40, 41]).sortby("lat").values)
+
+
+def test_overview_matches_block_average_of_linear_field(tmp_path, downloads, linear_relief):
+    cache = ReliefTileCache(str(tmp_path), tile_size=5, max_bytes=10 ** 9)
+    cache.load("01m", [120, 130, 40, 45])
+    fine_downloads = len(downloads)
+
+    # 远离已缓存范围边缘的区域，块平均窗口内的细节点都已缓存；线性场的块平均等于直接读取的粗网格
+    region = [121, 129, 41, 44]
+    grid = cache.load("05m", region)
+    assert len(downloads) == fine_downloads
+    assert cache.last_load["derived"] == 2
+    assert cache.last_load["overview_from"] == ["01m"]
+    direct = linear_relief("05m", region).sortby("lat")
+    np.testing.assert_allclose(grid.lon.values, direct.lon.values)
+    np.testing.assert_allclose(grid.values, direct.values, atol=1e-3)
+
+
+def test_block_average_even_factor_gridline(linear_relief):
+    grid = linear_relief("01m", [0, 2, 0, 2]).sortby("lat")
+    lon = np.arange(0.5, 1.6, 0.5)
+    lat = np.arange(0.5, 1.6, 0.5)
+    values = block_average(grid, 30, lon, lat)
+    expected = grid.sel(lon=lon, lat=lat, method="nearest")
+    np.testing.assert_allclose(values, expected.values, atol=1e-3)
@@ -0,0 +1,53 @@
+"""
+分辨率选择和网格预算测试
+"""
+import math
+import warnings
+
+import numpy as np
+import pytest
+
+from src.core.resolution import (
+    auto_resolution, estimate_grid, projected_lat, projected_y, relief_tile_size, resolve_resolution
+)
+
+
+def test_tile_size_bounds_cells_per_tile():
+    assert relief_tile_size("01s") == 0.5
+    assert relief_tile_size("15s") == 5
+    assert relief_tile_size("01m") == 30
+    # 01s 的小区域只读取一个 0.5 度瓦片，而不是整块 5 度瓦片（3.24 亿个网格点）
+    estimate = estimate_grid([100.1, 100.3, 30.1, 30.3], "01s")
+    assert estimate["tiles"] == 1
+    assert estimate["tile_cells"] == 1801 ** 2
+
+
+def test_tile_fetch_counts_against_budget():
+    # 区域网格本身在预算内，但跨越四个瓦片，需要读取的网格点超过预算，降级到更粗的分辨率
+    config = {"region": [100.4, 100.6, 30.4, 30.6], "resolution": "01s", "max_grid_cells": 5_000_000}
+    assert estimate_grid(config["region"], "01s")["cells"] < config["max_grid_cells"]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        estimate = resolve_resolution(config, 12, 600)
+    assert estimate["resolution"] == "03s"
+    assert estimate["tile_cells"] <= config["max_grid_cells"]
+
+
+@pytest.mark.parametrize("mercator", [True, False])
+def test_projected_latitude_round_trip(mercator):
+    lat = np.linspace(-80, 80, 17)
+    np.testing.assert_allclose(projected_lat(projected_y(lat, mercator), mercator), lat, atol=1e-9)
+
+
+def test_miller_stretch_between_linear_and_mercator():
+    # Miller 的局部拉伸为 sec 0.8φ，60° 处约 1.37 倍，墨卡托为 2 倍
+    step = 1e-6
+    miller = (projected_y(60 + step) - projected_y(60 - step)) / math.radians(2 * step)
+    assert miller == pytest.approx(1 / math.cos(math.radians(48)), rel=1e-6)
+    mercator = (projected_y(60 + step, True) - projected_y(60 - step, True)) / math.radians(2 * step)
+    assert 1 < miller < mercator
+
+    # 每像素约 40.6 秒经度：不考虑纬度拉伸时为 30s，Miller 按 sec 48° 拉伸为 15s，墨卡托按 sec 70° 为 03s
+    region = [100, 120, 60, 70]
+    assert auto_resolution(region, 15, 300) == "15s"
+    assert auto_resolution(region, 15, 300, mercator=True) == "03s"
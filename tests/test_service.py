@@ -0,0 +1,18 @@
+"""
+出图服务统计测试
+"""
+from src.core.service import percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile([], 50) is None
+    assert percentile(values, 50) == 5
+    # 秩恰为整数时不向上多取一位：ceil(0.3 × 10) = 3、ceil(0.7 × 10) = 7
+    assert percentile(values, 30) == 3
+    assert percentile(values, 70) == 7
+    assert percentile(values, 95) == 10
+    assert percentile(values, 25) == 3
+    assert percentile(values, 0) == 1
+    assert percentile(values, 100) == 10
+    assert percentile([4, 1, 3, 2], 50) == 2